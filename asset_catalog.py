@@ -0,0 +1,119 @@
+# Каталог ресурсов приложения
+import os
+from collections import namedtuple
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QSize, pyqtSignal
+from PyQt5.QtGui import QImageReader
+from config import ASSETS_DIR, MEMES_DIR, PUNISMENT_DIR, EMOJIS_DIR
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+# Сведения об изображении, прочитанные из заголовка файла
+AssetInfo = namedtuple('AssetInfo', ['path', 'width', 'height', 'format', 'mtime'])
+
+class AssetCatalog(QObject):
+    """Индекс изображений по категориям с инкрементальным обновлением"""
+
+    assets_changed = pyqtSignal(str)  # Имя категории, в которой изменились файлы
+
+    CATEGORIES = {
+        'memes': MEMES_DIR,
+        'punishment': PUNISMENT_DIR,
+        'emojis': EMOJIS_DIR,
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = {category: {} for category in self.CATEGORIES}
+        self._paths = {category: () for category in self.CATEGORIES}
+        self._info_by_path = {}
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self.scan()
+
+    def scan(self):
+        """Полностью сканирует все категории и подписывается на их изменения"""
+        self._watch(ASSETS_DIR)
+        for category in self.CATEGORIES:
+            self.refresh_category(category)
+
+    def get_paths(self, category):
+        """Возвращает кортеж путей к файлам категории"""
+        return self._paths[category]
+
+    def get_info(self, path):
+        """Возвращает AssetInfo для файла из каталога или None"""
+        return self._info_by_path.get(os.path.abspath(path))
+
+    def get_size(self, path):
+        """Возвращает размер изображения из каталога (невалидный QSize, если неизвестен)"""
+        info = self.get_info(path)
+        if info is None:
+            return QSize()
+        return QSize(info.width, info.height)
+
+    def refresh_category(self, category):
+        """Обновляет категорию, перечитывая заголовки только у новых и измененных файлов"""
+        directory = self.CATEGORIES[category]
+        entries = self._entries[category]
+        self._watch(directory)
+
+        current = {}
+        if os.path.isdir(directory):
+            with os.scandir(directory) as it:
+                for dir_entry in it:
+                    if dir_entry.is_file() and dir_entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        current[os.path.abspath(dir_entry.path)] = dir_entry.stat().st_mtime
+
+        changed = False
+        for path in list(entries):
+            if path not in current:
+                del entries[path]
+                self._info_by_path.pop(path, None)
+                changed = True
+
+        for path, mtime in current.items():
+            info = entries.get(path)
+            if info is None or info.mtime != mtime:
+                info = self._read_info(path, mtime)
+                entries[path] = info
+                self._info_by_path[path] = info
+                changed = True
+
+        if changed:
+            self._paths[category] = tuple(sorted(entries))
+        return changed
+
+    def _on_directory_changed(self, directory):
+        directory = os.path.abspath(directory)
+        if directory == os.path.abspath(ASSETS_DIR):
+            # Могли появиться или пропасть папки категорий
+            for category in self.CATEGORIES:
+                if self.refresh_category(category):
+                    self.assets_changed.emit(category)
+            return
+
+        for category, category_dir in self.CATEGORIES.items():
+            if os.path.abspath(category_dir) == directory:
+                if self.refresh_category(category):
+                    self.assets_changed.emit(category)
+
+    def _watch(self, directory):
+        if os.path.isdir(directory) and directory not in self.watcher.directories():
+            self.watcher.addPath(directory)
+
+    @staticmethod
+    def _read_info(path, mtime):
+        reader = QImageReader(path)
+        size = reader.size()
+        image_format = bytes(reader.format()).decode('ascii', 'ignore')
+        return AssetInfo(path, size.width(), size.height(), image_format, mtime)
+
+_catalog = None
+
+def get_asset_catalog():
+    """Возвращает общий каталог ресурсов, создавая его при первом обращении"""
+    global _catalog
+    if _catalog is None:
+        _catalog = AssetCatalog()
+    return _catalog
@@ -0,0 +1,245 @@
+# Генераторы ответов питомца: правила AIChatBot и локальные модели
+import random
+import threading
+from functools import lru_cache
+from collections import defaultdict
+from config import BOT_SETTINGS, CORPUS_FILE, RETRIEVAL_INDEX_FILE
+from utils import get_available_emojis
+from chat_intents import IntentMatcher
+from chat_search import tokenize
+from profanity import get_profanity_filter
+from tfidf_index import TfidfIndex
+from response_scheduler import ResponseScheduler
+
+class AIChatBot:
+    def __init__(self, settings=BOT_SETTINGS):
+        # Намерения, ключевые слова и ответы загружаются из assets/chat/intents.json
+        self.intent_matcher = IntentMatcher.from_file()
+        
+        # Ответы на плохие слова
+        self.bad_word_responses = self.intent_matcher.bad_word_responses
+
+        # Ответы выбираются без повторов подряд, очереди переживают перезапуск
+        self.scheduler = ResponseScheduler(settings['state_file'])
+        # Одинаковые сообщения ("привет", "как дела") не разбираются заново
+        self.classify = lru_cache(maxsize=settings['classify_cache_size'])(self._classify)
+        
+    def get_response(self, user_message):
+        kind, intent = self.classify(user_message.lower())
+        # Проверяем на плохие слова
+        if kind == 'bad_words':
+            return {"type": "text", "content": self.scheduler.choice(kind, self.bad_word_responses)}
+    
+        # С вероятностью 30% отвечаем графическим эмодзи
+        if random.random() < 0.3:
+            emojis = get_available_emojis()
+            if emojis:
+                return {"type": "emoji", "content": self.scheduler.choice('emoji', emojis)}
+    
+        if intent is not None:
+            return {"type": "text", "content": self.scheduler.choice('intent:' + intent.name, intent.responses)}
+    
+        responses = self.intent_matcher.fallback_responses or ["Мяу! 🐾"]
+        return {"type": "text", "content": self.scheduler.choice('fallback', responses)}
+
+    def _classify(self, user_message_lower):
+        """Разбор сообщения: ('bad_words', None), ('intent', намерение) или ('fallback', None)"""
+        if self.bad_word_responses and self.contains_bad_words(user_message_lower):
+            return 'bad_words', None
+        # Контекстные ответы: все ключевые слова проверяются за один проход по тексту
+        intent = self.intent_matcher.best_intent(user_message_lower)
+        if intent is not None and intent.responses:
+            return 'intent', intent
+        return 'fallback', None
+
+    def save_state(self):
+        self.scheduler.save()
+    
+    def contains_bad_words(self, text):
+        # Любое слово из словаря (assets/chat/profanity.json), включая мягкие
+        return get_profanity_filter().contains(text, 'mild')
+
+_chat_bot = None
+_chat_bot_lock = threading.Lock()
+
+def get_chat_bot():
+    """Общий AIChatBot для всех генераторов, чтобы у очередей ответов было одно состояние"""
+    global _chat_bot
+    with _chat_bot_lock:
+        if _chat_bot is None:
+            _chat_bot = AIChatBot()
+        return _chat_bot
+
+def read_corpus(path):
+    """Читает корпус реплик: список диалогов, каждый - список непустых строк"""
+    dialogues = [[]]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    dialogues[-1].append(line)
+                elif dialogues[-1]:
+                    dialogues.append([])
+    except OSError as e:
+        print(f"Ошибка загрузки корпуса диалогов: {e}")
+    return [dialogue for dialogue in dialogues if dialogue]
+
+class ResponseBackend:
+    """Генератор ответов питомца.
+
+    generate() вызывается в рабочем потоке и возвращает либо готовый ответ
+    {"type": ..., "content": ...}, либо итератор кусочков текста - тогда ответ
+    выводится в ленту по мере генерации. Долгие генераторы должны проверять
+    cancel_event и прекращать работу, когда он установлен.
+    """
+
+    def generate(self, context, cancel_event):
+        raise NotImplementedError
+
+    def close(self):
+        """Сохраняет состояние генератора перед выходом"""
+
+class RuleBasedBackend(ResponseBackend):
+    """Ответы AIChatBot по ключевым словам (используется по умолчанию)"""
+
+    def __init__(self):
+        self.bot = get_chat_bot()
+
+    def generate(self, context, cancel_event):
+        return self.bot.get_response(context.user_message)
+
+    def close(self):
+        self.bot.save_state()
+
+class MarkovBackend(ResponseBackend):
+    """Локальная замена языковой модели: цепь Маркова по словам корпуса.
+
+    Цепь строится при первом ответе. Ответ выводится по словам с паузой
+    stream_delay, как у настоящей потоковой модели.
+    """
+
+    END = None
+
+    def __init__(self, corpus_file=CORPUS_FILE, settings=BOT_SETTINGS):
+        self.corpus_file = corpus_file
+        self.order = settings['markov_order']
+        self.max_words = settings['max_reply_words']
+        self.stream_delay = settings['stream_delay'] / 1000
+        self.chain = None
+        self.starts = []
+        self.lock = threading.Lock()
+
+    def build(self):
+        chain = defaultdict(list)
+        starts = []
+        for dialogue in read_corpus(self.corpus_file):
+            for position, line in enumerate(dialogue):
+                words = line.split()
+                if len(words) < self.order:
+                    continue
+                # Реплики питомца в диалогах корпуса идут через одну, начиная со второй
+                if position % 2 == 1:
+                    starts.append((tuple(words[:self.order]), frozenset(tokenize(line))))
+                for i in range(len(words) - self.order + 1):
+                    state = tuple(words[i:i + self.order])
+                    next_word = words[i + self.order] if i + self.order < len(words) else self.END
+                    chain[state].append(next_word)
+        self.chain = dict(chain)
+        self.starts = starts
+
+    def pick_start(self, user_message):
+        # Начинаем с реплики, где встречается слово из сообщения пользователя
+        words = {word for word in tokenize(user_message) if len(word) > 2}
+        related = [state for state, line_words in self.starts if not words.isdisjoint(line_words)]
+        if related:
+            return random.choice(related)
+        return random.choice(self.starts)[0]
+
+    def generate(self, context, cancel_event):
+        with self.lock:
+            if self.chain is None:
+                self.build()
+        if not self.starts:
+            return {"type": "text", "content": "Мяу! 🐾"}
+        return self.stream(self.pick_start(context.user_message), cancel_event)
+
+    def stream(self, state, cancel_event):
+        yield ' '.join(state)
+        for _ in range(self.max_words - self.order):
+            next_words = self.chain.get(state)
+            if not next_words:
+                return
+            word = random.choice(next_words)
+            if word is self.END:
+                return
+            # Ожидание прерывается сразу, если ответ отменен
+            if cancel_event.wait(self.stream_delay):
+                return
+            yield ' ' + word
+            state = state[1:] + (word,)
+
+class RetrievalBackend(ResponseBackend):
+    """Подбирает готовый ответ питомца из корпуса по TF-IDF близости к разговору.
+
+    Запрос - последние context_turns сообщений истории, более ранние с меньшим
+    весом. Если ничего похожего нет, отвечает AIChatBot.
+    """
+
+    def __init__(self, corpus_file=CORPUS_FILE, cache_file=RETRIEVAL_INDEX_FILE, settings=BOT_SETTINGS):
+        self.index = TfidfIndex(corpus_file, cache_file)
+        self.top_k = settings['retrieval_top_k']
+        self.min_score = settings['retrieval_min_score']
+        self.decay = settings['context_decay']
+        self.max_df = settings['retrieval_max_df']
+        self.fallback = RuleBasedBackend()
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def query_texts(self, context):
+        # Последнее сообщение пользователя с весом 1, каждое более раннее - в decay раз меньше
+        texts = [(context.user_message, 1.0)] if context.user_message else []
+        weight = 1.0
+        history = [message for message in context.history
+                   if message.get('content_type') == 'text' and message.get('content')]
+        if history and history[-1]['content'] == context.user_message:
+            history = history[:-1]
+        for message in reversed(history):
+            weight *= self.decay
+            texts.append((message['content'], weight))
+        return texts
+
+    def generate(self, context, cancel_event):
+        with self.lock:
+            if not self.loaded:
+                self.index.load_or_build()
+                self.loaded = True
+        results = self.index.search(self.query_texts(context), self.top_k, self.max_df)
+        # Не повторяем то, что питомец уже говорил в этом разговоре
+        said = {message.get('content') for message in context.history if not message.get('is_user')}
+        results = [(score, doc_id) for score, doc_id in results
+                   if score >= self.min_score and self.index.replies[doc_id] not in said]
+        if not results:
+            return self.fallback.generate(context, cancel_event)
+        # Случайный выбор среди почти равных по близости ответов
+        best_score = results[0][0]
+        candidates = [doc_id for score, doc_id in results if score >= best_score * 0.8]
+        return {"type": "text", "content": self.index.replies[random.choice(candidates)]}
+
+    def close(self):
+        self.fallback.close()
+
+BACKENDS = {
+    'rules': RuleBasedBackend,
+    'markov': MarkovBackend,
+    'retrieval': RetrievalBackend,
+}
+
+def create_backend(name=None):
+    """Создает генератор ответов по имени из BOT_SETTINGS['backend']"""
+    name = name or BOT_SETTINGS['backend']
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        print(f"Неизвестный генератор ответов '{name}', используется 'rules'")
+        backend_class = RuleBasedBackend
+    return backend_class()
@@ -0,0 +1,770 @@
+# История чата: журнал JSON Lines или база SQLite
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from PyQt5.QtCore import QObject, pyqtSignal
+from config import CHAT_SETTINGS
+from chat_search import InvertedIndex, is_searchable, matches_query, parse_query, tokenize
+
+class JournalHistoryStorage:
+    """Журнал сообщений: одна JSON-строка на сообщение, запись только в конец файла.
+
+    Сжатие переписывает последние сообщения во временный файл и атомарно
+    подменяет им журнал. Недописанная последняя строка (сбой при записи)
+    отрезается при загрузке.
+    """
+
+    def __init__(self, filename, fsync_policy='interval', fsync_interval=5.0):
+        self.filename = filename
+        self.fsync_policy = fsync_policy      # 'always', 'interval' или 'never'
+        self.fsync_interval = fsync_interval  # Секунды между fsync для политики 'interval'
+        self.line_count = 0
+        self._file = None
+        self._torn = False  # Последняя запись могла оставить в конце журнала половину строки
+        self._last_fsync = time.monotonic()
+
+    def load(self):
+        """Читает все сообщения журнала, восстанавливая файл после оборванной записи"""
+        messages = []
+        self.line_count = 0
+        if not os.path.exists(self.filename):
+            return messages
+
+        good_size = 0
+        seen_ids = set()
+        with open(self.filename, 'rb') as f:
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    # Хвост без перевода строки - запись оборвалась на середине
+                    print("История чата: отброшена недописанная запись в конце журнала")
+                    break
+                good_size += len(raw_line)
+                self.line_count += 1
+                if not raw_line.strip():
+                    continue
+                try:
+                    message = json.loads(raw_line.decode('utf-8'))
+                except ValueError as e:
+                    print(f"История чата: пропущена поврежденная запись: {e}")
+                    continue
+                # Пачка, записанная повторно после сбоя, может продублировать сообщения
+                if message.get('id') in seen_ids:
+                    continue
+                seen_ids.add(message.get('id'))
+                messages.append(message)
+
+        if good_size != os.path.getsize(self.filename):
+            with open(self.filename, 'r+b') as f:
+                f.truncate(good_size)
+        return messages
+
+    def append(self, message):
+        """Дописывает одно сообщение в конец журнала"""
+        self.append_many([message])
+
+    def append_many(self, messages):
+        """Дописывает пачку сообщений одной записью"""
+        if self._file is None:
+            self._file = open(self.filename, 'a', encoding='utf-8')
+        data = ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in messages)
+        if self._torn:
+            # Предыдущая запись оборвалась на середине строки - начинаем с новой
+            data = '\n' + data
+        offset = self._file.tell()
+        try:
+            self._file.write(data)
+            self._file.flush()
+        except OSError:
+            # Недописанная пачка отрезается, чтобы повторная запись не склеилась с ней.
+            # После сбоя файл открывается заново при следующей записи
+            self.close()
+            try:
+                os.truncate(self.filename, offset)
+                self._torn = False
+            except OSError:
+                self._torn = True
+            raise
+        self._torn = False
+        self.line_count += len(messages)
+        self._maybe_fsync()
+
+    def rewrite(self, messages):
+        """Атомарно заменяет журнал новым содержимым (сжатие)"""
+        self.close()
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + '\n')
+            f.flush()
+            if self.fsync_policy != 'never':
+                os.fsync(f.fileno())
+        os.replace(tmp_filename, self.filename)
+        self.line_count = len(messages)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _maybe_fsync(self):
+        if self.fsync_policy == 'always':
+            os.fsync(self._file.fileno())
+        elif self.fsync_policy == 'interval':
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+def serialize_message(message):
+    """Копия сообщения, пригодная для записи (datetime -> ISO-строка)"""
+    message = dict(message)
+    if 'timestamp' in message and isinstance(message['timestamp'], datetime):
+        message['timestamp'] = message['timestamp'].isoformat()
+    return message
+
+def bisect_by_id(messages, message_id):
+    """Позиция первого сообщения с id >= message_id в списке, упорядоченном по id.
+
+    Сообщения без id (еще не сохраненные) считаются самыми новыми.
+    """
+    low, high = 0, len(messages)
+    while low < high:
+        middle = (low + high) // 2
+        if messages[middle].get('id', float('inf')) < message_id:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+class JournalHistoryBackend:
+    """История в памяти (не больше max_history_size сообщений) поверх журнала на диске"""
+
+    def __init__(self, filename, settings):
+        self.filename = filename
+        self.settings = settings
+        self.history = []
+        self.max_history_size = settings['max_history_size']  # Максимальное количество сообщений в истории
+        self.next_id = 1
+        self.index = InvertedIndex()
+        self.storage = JournalHistoryStorage(filename, settings['fsync_policy'], settings['fsync_interval'])
+        self.load_history()
+        self.journal_lines = self.storage.line_count  # Строки журнала вместе с еще не записанными
+
+    def load_history(self):
+        """Загружает историю чата из журнала (при первом запуске переносит старый JSON-файл)"""
+        try:
+            if not os.path.exists(self.filename) and os.path.exists(self.settings['legacy_history_file']):
+                self.migrate_legacy_history(self.settings['legacy_history_file'])
+            self.history = self.storage.load()
+            # Ограничиваем размер истории
+            if len(self.history) > self.max_history_size:
+                self.history = self.history[-self.max_history_size:]
+            self.next_id = max((m.get('id', 0) for m in self.history), default=0) + 1
+            if self.storage.line_count > self.compaction_threshold():
+                self.save_history()
+        except Exception as e:
+            print(f"Ошибка загрузки истории чата: {e}")
+            self.history = []
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        self.index.clear()
+        for message in self.history:
+            if is_searchable(message):
+                self.index.add(message['id'], message['content'])
+
+    def migrate_legacy_history(self, legacy_filename):
+        """Переносит историю из старого формата (один JSON-массив) в журнал"""
+        legacy_history = load_legacy_history(legacy_filename)[-self.max_history_size:]
+        self.storage.rewrite(legacy_history)
+        os.replace(legacy_filename, legacy_filename + '.bak')
+
+    def save_history(self):
+        """Сжимает журнал до текущего содержимого истории (только при загрузке)"""
+        try:
+            self.storage.rewrite(self.history)
+        except Exception as e:
+            print(f"Ошибка сохранения истории чата: {e}")
+
+    def compaction_threshold(self):
+        return self.max_history_size * self.settings['compaction_factor']
+
+    def add(self, message):
+        message['id'] = self.next_id
+        self.next_id += 1
+
+        self.history.append(message)
+        if is_searchable(message):
+            self.index.add(message['id'], message['content'])
+
+        # Ограничиваем размер истории
+        if len(self.history) > self.max_history_size:
+            self.history = self.history[-self.max_history_size:]
+        self.journal_lines += 1
+        return message
+
+    def needs_compaction(self):
+        # Журнал сжимается, когда в нем накопилось слишком много вытесненных записей
+        return self.journal_lines > self.compaction_threshold()
+
+    def snapshot(self):
+        """Содержимое истории для сжатия журнала в фоновом потоке"""
+        self.journal_lines = len(self.history)
+        # Вытесненные из истории сообщения больше не нужны в индексе
+        self.rebuild_index()
+        return list(self.history)
+
+    def clear(self):
+        self.history = []
+        self.index.clear()
+        self.journal_lines = 0
+
+    def write_batch(self, messages):
+        self.storage.append_many(messages)
+
+    def write_compact(self, messages):
+        self.storage.rewrite(messages)
+
+    def write_clear(self):
+        self.storage.rewrite([])
+
+    def get_messages_before(self, before_id, count):
+        if before_id is None:
+            end = len(self.history)
+        else:
+            # id в истории возрастают, поэтому границу страницы ищем двоичным поиском
+            end = bisect_by_id(self.history, before_id)
+        return self.history[max(0, end - count):end]
+
+    def get_messages_after(self, after_id, count):
+        start = bisect_by_id(self.history, after_id + 1)
+        return self.history[start:start + count]
+
+    def get_messages_between(self, start, end):
+        return [m for m in self.history if start <= m['timestamp'] < end]
+
+    def search(self, query, limit):
+        min_id = self.history[0]['id'] if self.history else 0
+        ids = self.index.search(query, limit, min_id)
+        messages = []
+        for message_id in ids:
+            position = bisect_by_id(self.history, message_id)
+            messages.append(self.history[position])
+        return messages
+
+    def count(self, is_user=None):
+        if is_user is None:
+            return len(self.history)
+        return sum(1 for m in self.history if m['is_user'] == is_user)
+
+    def iter_messages(self, separate_connection=False):
+        return iter(list(self.history))
+
+    def close(self):
+        self.storage.close()
+
+class SqliteHistoryBackend:
+    """История в SQLite (режим WAL) с индексами по времени и отправителю.
+
+    Сообщения не держатся в памяти, поэтому ограничение на размер истории не нужно.
+    Для поиска используется таблица FTS5 с нормализованным текстом сообщений, а если
+    SQLite собран без FTS5 - инвертированный индекс в памяти.
+
+    Запись идет через отдельное соединение из фонового потока, чтение - через
+    соединение потока GUI; в режиме WAL они не блокируют друг друга. Сообщения,
+    которые еще ждут записи, хранятся в памяти и добавляются к результатам чтения,
+    поэтому чтение не ждет диск.
+    """
+
+    SYNCHRONOUS = {'always': 'FULL', 'interval': 'NORMAL', 'never': 'OFF'}
+
+    def __init__(self, filename, settings):
+        self.filename = filename
+        self.settings = settings
+        self.connection = self.connect()
+        self.index = None
+        self.pending = []       # Добавленные, но еще не записанные сообщения (по возрастанию id)
+        self.pending_lock = threading.Lock()
+        self.cleared_below = 0  # После очистки сообщения с меньшими id не видны, даже если еще в базе
+        self.create_schema()
+        self.has_fts = self.create_fts_table()
+        self.migrate_once()
+        self.next_id = (self.connection.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0) + 1
+        self.build_fts_once()
+        self.write_connection = self.connect(check_same_thread=False)
+
+    def connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.filename, check_same_thread=check_same_thread)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[self.settings['fsync_policy']]}")
+        return connection
+
+    def create_schema(self):
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    is_user INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
+                CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(is_user, id);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+    def create_fts_table(self):
+        try:
+            with self.connection:
+                self.connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(body)")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def build_fts_once(self):
+        """Индексирует сообщения, сохраненные до появления поиска"""
+        if not self.has_fts or self.connection.execute(
+                "SELECT 1 FROM meta WHERE key = 'fts_built'").fetchone():
+            return
+        with self.connection:
+            self.connection.execute("DELETE FROM messages_fts")
+            self.connection.executemany(
+                "INSERT INTO messages_fts (rowid, body) VALUES (?, ?)",
+                ((m['id'], self._fts_body(m)) for m in self.iter_messages() if is_searchable(m)))
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('fts_built', '1')")
+
+    def migrate_once(self):
+        """Однократно переносит историю из журнала или старого JSON-файла"""
+        if self.connection.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+            return
+
+        messages = []
+        source = None
+        try:
+            if os.path.exists(self.settings['history_file']):
+                source = self.settings['history_file']
+                messages = JournalHistoryStorage(source).load()
+            elif os.path.exists(self.settings['legacy_history_file']):
+                source = self.settings['legacy_history_file']
+                messages = load_legacy_history(source)
+        except Exception as e:
+            print(f"Ошибка переноса истории чата: {e}")
+            return
+
+        # Исходный файл остается на месте: при возврате к бэкенду 'jsonl' история не пропадет,
+        # а повторный перенос исключает отметка 'migrated'
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO messages (timestamp, is_user, content_type, content) VALUES (?, ?, ?, ?)",
+                (self._to_row(m) for m in messages))
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (source or '',))
+
+    def add(self, message):
+        # id выдается сразу, сама вставка выполняется позже в write_batch
+        message['id'] = self.next_id
+        self.next_id += 1
+        with self.pending_lock:
+            self.pending.append(message)
+        if self.index is not None and is_searchable(message):
+            self.index.add(message['id'], message['content'])
+        return message
+
+    def needs_compaction(self):
+        return False
+
+    def clear(self):
+        with self.pending_lock:
+            self.pending = []
+            self.cleared_below = self.next_id
+        if self.index is not None:
+            self.index.clear()
+
+    def write_batch(self, messages):
+        with self.write_connection:
+            self.write_connection.executemany(
+                "INSERT INTO messages (id, timestamp, is_user, content_type, content) VALUES (?, ?, ?, ?, ?)",
+                ((m['id'],) + self._to_row(m) for m in messages))
+            if self.has_fts:
+                self.write_connection.executemany(
+                    "INSERT INTO messages_fts (rowid, body) VALUES (?, ?)",
+                    ((m['id'], self._fts_body(m)) for m in messages if is_searchable(m)))
+        # Записанные сообщения теперь читаются из базы
+        written = {m['id'] for m in messages}
+        with self.pending_lock:
+            self.pending = [m for m in self.pending if m['id'] not in written]
+
+    def visible_pending(self):
+        """Снимок незаписанных сообщений и диапазон id [start, end), который читается из базы.
+
+        Сообщения пишутся по порядку id, поэтому все, что не меньше end, еще в памяти.
+        """
+        with self.pending_lock:
+            start = self.cleared_below
+            pending = [m for m in self.pending if m['id'] >= start]
+        end = pending[0]['id'] if pending else self.next_id
+        return pending, start, end
+
+    def write_clear(self):
+        with self.write_connection:
+            self.write_connection.execute("DELETE FROM messages")
+            if self.has_fts:
+                self.write_connection.execute("DELETE FROM messages_fts")
+
+    def get_messages_before(self, before_id, count):
+        pending, start, end = self.visible_pending()
+        if before_id is not None:
+            pending = [m for m in pending if m['id'] < before_id]
+            end = min(end, before_id)
+        rows = self.connection.execute(
+            "SELECT * FROM messages WHERE id >= ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (start, end, count)).fetchall()
+        messages = [self._from_row(row) for row in reversed(rows)] + pending
+        return messages[-count:] if count > 0 else []
+
+    def get_messages_after(self, after_id, count):
+        pending, start, end = self.visible_pending()
+        rows = self.connection.execute(
+            "SELECT * FROM messages WHERE id > ? AND id >= ? AND id < ? ORDER BY id LIMIT ?",
+            (after_id, start, end, count)).fetchall()
+        messages = [self._from_row(row) for row in rows] + [m for m in pending if m['id'] > after_id]
+        return messages[:count]
+
+    def get_messages_between(self, start_time, end_time):
+        pending, start, end = self.visible_pending()
+        rows = self.connection.execute(
+            "SELECT * FROM messages WHERE timestamp >= ? AND timestamp < ? AND id >= ? AND id < ? ORDER BY id",
+            (start_time, end_time, start, end)).fetchall()
+        return [self._from_row(row) for row in rows] + [
+            m for m in pending if start_time <= m['timestamp'] < end_time]
+
+    def count(self, is_user=None):
+        pending, start, end = self.visible_pending()
+        if is_user is None:
+            stored = self.connection.execute(
+                "SELECT COUNT(*) FROM messages WHERE id >= ? AND id < ?", (start, end)).fetchone()[0]
+            return stored + len(pending)
+        stored = self.connection.execute(
+            "SELECT COUNT(*) FROM messages WHERE is_user = ? AND id >= ? AND id < ?",
+            (int(is_user), start, end)).fetchone()[0]
+        return stored + sum(1 for m in pending if m['is_user'] == is_user)
+
+    def search(self, query, limit):
+        tokens = parse_query(query)
+        if not tokens:
+            return []
+        if not self.has_fts:
+            if self.index is None:
+                # Индекс строится при первом поиске и дальше обновляется в add()
+                self.index = InvertedIndex()
+                for message in self.iter_messages():
+                    if is_searchable(message):
+                        self.index.add(message['id'], message['content'])
+            pending, start, end = self.visible_pending()
+            ids = self.index.search(query, limit, start)
+            if not ids:
+                return []
+            found = {m['id']: m for m in pending if m['id'] in ids}
+            stored = [i for i in ids if i < end]
+            if stored:
+                rows = self.connection.execute(
+                    f"SELECT * FROM messages WHERE id IN ({','.join('?' * len(stored))})", stored).fetchall()
+                found.update((row['id'], self._from_row(row)) for row in rows)
+            return [found[i] for i in ids if i in found]
+
+        pending, start, end = self.visible_pending()
+        found = [m for m in reversed(pending) if is_searchable(m) and matches_query(query, m['content'])]
+        # Слова берутся в кавычки, последнее ищется по префиксу
+        match = ' '.join(f'"{token}"' for token in tokens) + '*'
+        rows = self.connection.execute(
+            "SELECT messages.* FROM messages_fts JOIN messages ON messages.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ? AND messages_fts.rowid >= ? AND messages_fts.rowid < ? "
+            "ORDER BY messages_fts.rowid DESC LIMIT ?",
+            (match, start, end, limit)).fetchall()
+        return (found + [self._from_row(row) for row in rows])[:limit]
+
+    def iter_messages(self, separate_connection=False):
+        """Читает таблицу курсором по частям, не загружая ее целиком.
+
+        С separate_connection=True соединение открывается в потоке, который
+        перебирает сообщения (например, при экспорте в фоне).
+        """
+        pending, start, end = self.visible_pending()
+        connection = self.connect() if separate_connection else self.connection
+        try:
+            for row in connection.execute(
+                    "SELECT * FROM messages WHERE id >= ? AND id < ? ORDER BY id", (start, end)):
+                yield self._from_row(row)
+        finally:
+            if separate_connection:
+                connection.close()
+        yield from pending
+
+    def close(self):
+        self.write_connection.close()
+        self.connection.close()
+
+    @staticmethod
+    def _to_row(message):
+        return (message.get('timestamp') or datetime.now().isoformat(), int(bool(message.get('is_user'))),
+                message.get('content_type', 'text'), message.get('content', ''))
+
+    @staticmethod
+    def _fts_body(message):
+        return ' '.join(tokenize(message['content']))
+
+    @staticmethod
+    def _from_row(row):
+        return {
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'is_user': bool(row['is_user']),
+            'content_type': row['content_type'],
+            'content': row['content'],
+        }
+
+def load_legacy_history(legacy_filename):
+    """Читает историю старого формата (один JSON-массив) и проставляет id"""
+    with open(legacy_filename, 'r', encoding='utf-8') as f:
+        legacy_history = json.load(f)
+    for message_id, message in enumerate(legacy_history, start=1):
+        message.setdefault('id', message_id)
+    return legacy_history
+
+class _WriterSignals(QObject):
+    write_failed = pyqtSignal(str)  # Текст ошибки; операции остаются в очереди и будут повторены
+
+class HistoryWriter(threading.Thread):
+    """Фоновая запись истории: операции копятся write_delay мс и пишутся одной пачкой.
+
+    Добавление сообщения в потоке GUI только ставит его в очередь, поэтому медленный
+    диск не подтормаживает интерфейс. flush() дожидается записи всей очереди.
+    Операции, которые не удалось записать, повторяются через write_retry_delay мс.
+    """
+
+    def __init__(self, backend, settings):
+        super().__init__(name='HistoryWriter', daemon=True)
+        self.backend = backend
+        self.write_delay = settings['write_delay'] / 1000
+        self.retry_delay = settings['write_retry_delay'] / 1000
+        self.max_batch = settings['write_max_batch']
+        self.slow_flush_warning = settings['slow_flush_warning']
+        self.signals = _WriterSignals()
+        self.pending = []
+        self.busy = False
+        self.failing = False
+        self.flush_requested = False
+        self.stopping = False
+        self.condition = threading.Condition()
+        self.stats = {'flushes': 0, 'messages': 0, 'last_ms': 0.0, 'max_ms': 0.0, 'total_ms': 0.0}
+
+    def submit(self, kind, payload=None):
+        """Ставит операцию в очередь: 'append' (сообщение), 'compact' (снимок истории) или 'clear'"""
+        with self.condition:
+            self.pending.append((kind, payload))
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Ждет, пока очередь будет записана. Возвращает False по таймауту"""
+        with self.condition:
+            if not self.pending and not self.busy:
+                return True
+            self.flush_requested = True
+            self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def stop(self, timeout=None):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.join(timeout)
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.stopping)
+                if not self.pending:
+                    return
+                # Собираем сообщения, пришедшие за время задержки, в одну запись
+                deadline = time.monotonic() + self.write_delay
+                while (not self.stopping and not self.flush_requested
+                       and len(self.pending) < self.max_batch):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                operations, self.pending = self.pending, []
+                self.busy = True
+
+            failed = self.write(operations)
+
+            with self.condition:
+                self.busy = False
+                if failed:
+                    if self.stopping:
+                        # При закрытии повторять некогда: сообщения не сохранятся
+                        self.pending = []
+                        self.condition.notify_all()
+                        return
+                    # Незаписанные операции возвращаются в начало очереди в прежнем порядке
+                    self.pending[0:0] = failed
+                    self.condition.notify_all()
+                    self.condition.wait_for(lambda: self.stopping, self.retry_delay)
+                    continue
+                if not self.pending:
+                    self.flush_requested = False
+                self.condition.notify_all()
+
+    def write(self, operations):
+        """Записывает операции по порядку. Возвращает операции, которые записать не удалось"""
+        started = time.perf_counter()
+        messages = 0
+        position = 0
+        try:
+            while position < len(operations):
+                kind, payload = operations[position]
+                if kind == 'append':
+                    # Подряд идущие сообщения пишутся одной пачкой
+                    end = position
+                    while end < len(operations) and operations[end][0] == 'append':
+                        end += 1
+                    batch = [message for _, message in operations[position:end]]
+                    self.backend.write_batch(batch)
+                    messages += len(batch)
+                    position = end
+                    continue
+                if kind == 'compact':
+                    self.backend.write_compact(payload)
+                elif kind == 'clear':
+                    self.backend.write_clear()
+                position += 1
+        except Exception as e:
+            # Сигнал отправляется один раз на серию неудачных попыток
+            if not self.failing:
+                self.failing = True
+                self.signals.write_failed.emit(str(e))
+            return operations[position:]
+
+        self.failing = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats['flushes'] += 1
+        self.stats['messages'] += messages
+        self.stats['last_ms'] = elapsed_ms
+        self.stats['max_ms'] = max(self.stats['max_ms'], elapsed_ms)
+        self.stats['total_ms'] += elapsed_ms
+        if elapsed_ms >= self.slow_flush_warning:
+            print(f"История чата: медленная запись на диск ({elapsed_ms:.0f} мс, сообщений: {messages})")
+        return []
+
+class ChatHistoryManager:
+    """Менеджер для работы с историей чата"""
+
+    BACKENDS = {
+        'jsonl': (JournalHistoryBackend, 'history_file'),
+        'sqlite': (SqliteHistoryBackend, 'sqlite_file'),
+    }
+
+    def __init__(self, filename=None, settings=CHAT_SETTINGS):
+        self.settings = settings
+        backend_class, filename_key = self.BACKENDS[settings['history_backend']]
+        self.filename = filename or settings[filename_key]
+        self.backend = backend_class(self.filename, settings)
+        self.writer = HistoryWriter(self.backend, settings)
+        self.signals = self.writer.signals  # write_failed для окна чата
+        self.writer.start()
+        self.closed = False
+
+    def add_message(self, message):
+        """Добавляет сообщение в историю и возвращает сохраненную копию с id.
+
+        Запись на диск выполняется в фоновом потоке.
+        """
+        try:
+            stored_message = self.backend.add(serialize_message(message))
+        except Exception as e:
+            print(f"Ошибка сохранения истории чата: {e}")
+            return serialize_message(message)
+        self.writer.submit('append', stored_message)
+        if self.backend.needs_compaction():
+            self.writer.submit('compact', self.backend.snapshot())
+        return stored_message
+
+    def clear_history(self):
+        """Очищает историю чата"""
+        try:
+            self.backend.clear()
+        except Exception as e:
+            print(f"Ошибка очистки истории чата: {e}")
+        self.writer.submit('clear')
+
+    def import_messages(self, messages):
+        """Добавляет в конец истории пачку импортированных сообщений. Возвращает их число"""
+        if self.closed:
+            return 0
+        for message in messages:
+            self.writer.submit('append', self.backend.add(serialize_message(message)))
+        if self.backend.needs_compaction():
+            self.writer.submit('compact', self.backend.snapshot())
+        return len(messages)
+
+    def flush(self):
+        """Дожидается записи всех сообщений на диск"""
+        if not self.writer.flush(self.settings['flush_timeout']):
+            print("История чата: запись на диск не завершилась вовремя")
+
+    def flush_stats(self):
+        """Статистика фоновой записи: число записей, сообщений и задержки в мс"""
+        stats = dict(self.writer.stats)
+        stats['avg_ms'] = stats['total_ms'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
+
+    def get_recent_messages(self, count=100):
+        """Возвращает последние сообщения из истории"""
+        return self.get_messages_before(None, count)
+
+    def get_messages_before(self, before_id, count):
+        """Возвращает до count сообщений, более старых чем before_id (None - самые новые)"""
+        return self.backend.get_messages_before(before_id, count)
+
+    def get_messages_after(self, after_id, count):
+        """Возвращает до count сообщений, более новых чем after_id"""
+        return self.backend.get_messages_after(after_id, count)
+
+    def search(self, query, limit=50):
+        """Ищет текстовые сообщения, содержащие все слова запроса, от новых к старым"""
+        try:
+            return self.backend.search(query, limit)
+        except Exception as e:
+            print(f"Ошибка поиска по истории чата: {e}")
+            return []
+
+    def get_messages_between(self, start, end):
+        """Возвращает сообщения за период [start, end)"""
+        if isinstance(start, datetime):
+            start = start.isoformat()
+        if isinstance(end, datetime):
+            end = end.isoformat()
+        return self.backend.get_messages_between(start, end)
+
+    def count_messages(self, is_user=None):
+        """Количество сообщений в истории (всех, только пользователя или только питомца)"""
+        return self.backend.count(is_user)
+
+    def iter_messages(self, separate_connection=False):
+        """Перебирает все сообщения от старых к новым (separate_connection - для другого потока)"""
+        return self.backend.iter_messages(separate_connection)
+
+    def close(self):
+        """Записывает очередь на диск и закрывает хранилище (повторный вызов ничего не делает)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.writer.stop(self.settings['flush_timeout'])
+        self.backend.close()
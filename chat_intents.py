@@ -0,0 +1,55 @@
+# Определение намерений пользователя по ключевым словам из файла данных
+import json
+from collections import namedtuple
+from config import INTENTS_FILE
+from text_matcher import AhoCorasick
+
+Intent = namedtuple('Intent', ['name', 'keywords', 'responses'])
+IntentMatch = namedtuple('IntentMatch', ['intent', 'keyword', 'start', 'end'])
+
+class IntentMatcher:
+    """Все ключевые слова всех намерений собраны в один автомат.
+
+    Намерения идут в порядке приоритета: если совпало несколько, побеждает
+    то, что раньше в списке.
+    """
+
+    def __init__(self, intents, fallback_responses=(), bad_word_responses=()):
+        self.intents = list(intents)
+        self.fallback_responses = list(fallback_responses)
+        self.bad_word_responses = list(bad_word_responses)
+        self.automaton = AhoCorasick()
+        for priority, intent in enumerate(self.intents):
+            for keyword in intent.keywords:
+                self.automaton.add(keyword.lower(), (priority, keyword))
+        self.automaton.build()
+
+    @classmethod
+    def from_file(cls, path=INTENTS_FILE):
+        """Загружает намерения и ответы из JSON-файла (при ошибке - пустой набор)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка загрузки намерений чата: {e}")
+            data = {}
+        intents = [Intent(item['name'], tuple(item['keywords']), tuple(item['responses']))
+                   for item in data.get('intents', [])]
+        return cls(intents, data.get('fallback_responses', []), data.get('bad_word_responses', []))
+
+    def match(self, text):
+        """Все совпадения ключевых слов в тексте, по позиции начала"""
+        matches = [IntentMatch(self.intents[priority], keyword, start, end)
+                   for start, end, (priority, keyword) in self.automaton.iter_matches(text.lower())]
+        matches.sort(key=lambda m: (m.start, m.end))
+        return matches
+
+    def best_intent(self, text):
+        """Намерение с наивысшим приоритетом среди найденных (None, если ничего не нашлось)"""
+        best = None
+        for _start, _end, (priority, _keyword) in self.automaton.iter_matches(text.lower()):
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return None if best is None else self.intents[best]
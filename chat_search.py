@@ -0,0 +1,73 @@
+# Полнотекстовый поиск по истории чата
+import re
+import bisect
+
+WORD_RE = re.compile(r'\w+')
+
+def normalize_text(text):
+    """Приводит текст к виду для поиска: без учета регистра, 'ё' равна 'е'"""
+    return text.casefold().replace('ё', 'е')
+
+def tokenize(text):
+    """Разбивает текст на слова (кириллица и латиница), нормализованные для поиска"""
+    return WORD_RE.findall(normalize_text(text))
+
+def parse_query(query):
+    """Слова запроса. Последнее слово ищется по префиксу, пока пользователь его дописывает"""
+    return tokenize(query)
+
+def matches_query(query, text):
+    """Содержит ли текст все слова запроса (последнее - по префиксу), как при поиске по индексу"""
+    tokens = parse_query(query)
+    if not tokens:
+        return False
+    words = set(tokenize(text))
+    return all(token in words for token in tokens[:-1]) and any(
+        word.startswith(tokens[-1]) for word in words)
+
+def is_searchable(message):
+    return message.get('content_type') == 'text' and bool(message.get('content'))
+
+class InvertedIndex:
+    """Инвертированный индекс в памяти: слово -> возрастающий список id сообщений.
+
+    Сообщения добавляются по одному в порядке возрастания id, поэтому списки
+    остаются отсортированными без пересортировки.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.terms = []  # Отсортированный словарь для поиска по префиксу
+
+    def add(self, message_id, text):
+        for token in set(tokenize(text)):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = []
+                bisect.insort(self.terms, token)
+            ids.append(message_id)
+
+    def clear(self):
+        self.postings.clear()
+        self.terms.clear()
+
+    def search(self, query, limit=50, min_id=0):
+        """id сообщений, содержащих все слова запроса, от новых к старым"""
+        tokens = parse_query(query)
+        if not tokens:
+            return []
+
+        candidates = [set(self.postings.get(token, ())) for token in tokens[:-1]]
+        candidates.append(self._prefix_ids(tokens[-1]))
+        candidates.sort(key=len)
+        found = candidates[0].intersection(*candidates[1:])
+        return sorted((i for i in found if i >= min_id), reverse=True)[:limit]
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        start = bisect.bisect_left(self.terms, prefix)
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                break
+            ids.update(self.postings[term])
+        return ids
@@ -0,0 +1,489 @@
+# Виртуализированная лента сообщений чата (model/view вместо виджета на каждое сообщение)
+from datetime import datetime
+from PyQt5 import sip
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView, QApplication, QMenu, QAction
+from PyQt5.QtCore import (Qt, QAbstractListModel, QModelIndex, QPersistentModelIndex, QRect, QRectF,
+                          QSize, QTimer)
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainterPath, QPen, QMovie
+from config import IMAGE_SIZES, CHAT_SETTINGS
+from chat_history import bisect_by_id
+from utils import pixmap_cache
+from image_loader import get_image_loader
+
+MessageRole = Qt.UserRole + 1
+
+# Геометрия пузыря сообщения (повторяет прежнюю раскладку ChatMessageWidget)
+ROW_MARGIN_H = 10
+ROW_MARGIN_V = 5
+BUBBLE_PADDING_H = 12
+BUBBLE_PADDING_V = 8
+BUBBLE_RADIUS = 15
+BUBBLE_TAIL_RADIUS = 5
+CONTENT_SPACING = 4
+TEXT_MAX_WIDTH = 300
+TEXT_FONT_SIZE = 12
+TIME_FONT_SIZE = 10
+EMOJI_FALLBACK_FONT_SIZE = 24
+GIF_SIZE = QSize(150, 100)
+
+USER_BUBBLE = (QColor(0, 123, 255, 180), QColor(255, 255, 255, 100))
+PET_BUBBLE = (QColor(255, 255, 255, 120), QColor(255, 255, 255, 80))
+HIGHLIGHT_BORDER = QColor(255, 193, 7, 230)
+
+def normalize_message(message_data):
+    """Копия сообщения из истории с восстановленным datetime"""
+    message = dict(message_data)
+    timestamp = message.get('timestamp')
+    if isinstance(timestamp, str):
+        try:
+            message['timestamp'] = datetime.fromisoformat(timestamp)
+        except ValueError:
+            message['timestamp'] = datetime.now()
+    elif not isinstance(timestamp, datetime):
+        message['timestamp'] = datetime.now()
+    return message
+
+class ChatTranscriptModel(QAbstractListModel):
+    """Сообщения, загруженные из истории страницами, плюс новые сообщения сессии.
+
+    После перехода к старому сообщению модель держит окно истории вокруг него,
+    более новые страницы подгружаются при прокрутке вниз.
+    """
+
+    def __init__(self, history_manager, parent=None):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self.rows = []
+        self.has_older = True
+        self.has_newer = False   # Загружено окно истории, а не последние сообщения
+        self.movies = {}         # Путь к GIF -> QMovie, общий для всех строк с этим файлом
+        self.media_rows = {}     # Путь к картинке -> отрисованные строки с ней (QPersistentModelIndex)
+        self.failed_paths = set()  # Картинки, которые не удалось загрузить
+        self.streaming_message = None  # Ответ питомца, который еще генерируется
+        self._pending_images = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self.rows[index.row()]
+        if role == MessageRole:
+            return message
+        if role == Qt.DisplayRole and message['content_type'] == "text":
+            return message['content']
+        return None
+
+    def load_recent(self, count):
+        """Загружает последнюю страницу истории"""
+        self.beginResetModel()
+        self.streaming_message = None
+        self.rows = [normalize_message(m) for m in self.history_manager.get_messages_before(None, count)]
+        self.has_older = len(self.rows) == count
+        self.has_newer = False
+        self.endResetModel()
+
+    def fetch_older(self, count):
+        """Подгружает страницу более старых сообщений в начало. Возвращает число добавленных строк"""
+        if not self.has_older:
+            return 0
+        # Страницы выбираются по id самого старого загруженного сообщения, а не по смещению
+        before_id = self.rows[0].get('id') if self.rows else None
+        page = self.history_manager.get_messages_before(before_id, count)
+        self.has_older = len(page) == count
+        if not page:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(page) - 1)
+        self.rows[0:0] = [normalize_message(m) for m in page]
+        self.endInsertRows()
+        return len(page)
+
+    def fetch_newer(self, count):
+        """Подгружает страницу более новых сообщений в конец окна. Возвращает число добавленных строк"""
+        if not self.has_newer:
+            return 0
+        after_id = self.rows[-1]['id'] if self.rows else 0
+        page = self.history_manager.get_messages_after(after_id, count)
+        self.has_newer = len(page) == count
+        if not page:
+            return 0
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row + len(page) - 1)
+        self.rows.extend(normalize_message(m) for m in page)
+        self.endInsertRows()
+        return len(page)
+
+    def ensure_loaded(self, message_id):
+        """Загружает сообщение message_id со страницей соседних. Возвращает его строку или -1"""
+        row = self._find_row(message_id)
+        if row >= 0:
+            return row
+
+        count = CHAT_SETTINGS['history_page_size']
+        older = self.history_manager.get_messages_before(message_id + 1, count)
+        if not older or older[-1]['id'] != message_id:
+            return -1
+        newer = self.history_manager.get_messages_after(message_id, count)
+
+        first_id = self.rows[0].get('id') if self.rows else None
+        if first_id is not None and message_id < first_id and (
+                len(newer) < count or newer[-1]['id'] >= first_id):
+            # Страница смыкается с загруженными строками - дописываем ее в начало
+            page = [m for m in older + newer if m['id'] < first_id]
+            self.beginInsertRows(QModelIndex(), 0, len(page) - 1)
+            self.rows[0:0] = [normalize_message(m) for m in page]
+            self.endInsertRows()
+            self.has_older = len(older) == count
+            return self._find_row(message_id)
+
+        # Промежуток до загруженных строк не читается целиком: лента переходит
+        # к окну вокруг сообщения, остальное подгружается при прокрутке
+        self.beginResetModel()
+        self.streaming_message = None
+        self.rows = [normalize_message(m) for m in older + newer]
+        self.has_older = len(older) == count
+        self.has_newer = len(newer) == count
+        self.endResetModel()
+        return len(older) - 1
+
+    def _find_row(self, message_id):
+        # Строки без id (например, еще генерируемый ответ) всегда в конце ленты
+        row = bisect_by_id(self.rows, message_id)
+        if row < len(self.rows) and self.rows[row].get('id') == message_id:
+            return row
+        return -1
+
+    def highlight(self, row, duration):
+        """Подсвечивает строку на duration мс"""
+        message = self.rows[row]
+        message['highlighted'] = True
+        self._refresh_row(row)
+
+        def unhighlight():
+            if sip.isdeleted(self):
+                return
+            message['highlighted'] = False
+            for current_row, current in enumerate(self.rows):
+                if current is message:
+                    self._refresh_row(current_row)
+                    break
+
+        QTimer.singleShot(duration, unhighlight)
+
+    def append_message(self, message_data):
+        if self.has_newer:
+            # Новое сообщение уже в истории: возвращаемся к последней странице
+            self.load_recent(CHAT_SETTINGS['history_page_size'])
+            return
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(normalize_message(message_data))
+        self.endInsertRows()
+
+    def set_streaming_text(self, text):
+        """Показывает последней строкой еще не законченный ответ питомца"""
+        if self.streaming_message is None:
+            if self.has_newer:
+                self.load_recent(CHAT_SETTINGS['history_page_size'])
+            self.streaming_message = {'content': text, 'is_user': False, 'content_type': 'text',
+                                      'timestamp': datetime.now()}
+            self.append_message(self.streaming_message)
+            self.streaming_message = self.rows[-1]
+            return
+        self.streaming_message['content'] = text
+        self.streaming_message.pop('bubble_size', None)
+        # Пузырь вырос - достаточно обновить одну строку, лента пересчитает ее размер
+        for row in range(len(self.rows) - 1, -1, -1):
+            if self.rows[row] is self.streaming_message:
+                self._refresh_row(row)
+                break
+
+    def clear_streaming(self):
+        if self.streaming_message is None:
+            return
+        message, self.streaming_message = self.streaming_message, None
+        for row in range(len(self.rows) - 1, -1, -1):
+            if self.rows[row] is message:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[row]
+                self.endRemoveRows()
+                break
+
+    def clear(self):
+        self.beginResetModel()
+        self.streaming_message = None
+        self.rows = []
+        self.has_older = False
+        self.has_newer = False
+        self.endResetModel()
+
+    def last_message(self):
+        return self.rows[-1] if self.rows else None
+
+    def request_image(self, path, size):
+        """Запрашивает фоновую загрузку картинки и перерисовывает строки, когда она готова"""
+        key = (path, size.width(), size.height())
+        if key in self._pending_images:
+            return
+        self._pending_images.add(key)
+
+        def on_loaded(pixmap):
+            if sip.isdeleted(self):
+                return
+            self._pending_images.discard(key)
+            if pixmap.isNull():
+                self.failed_paths.add(path)
+            self._refresh_rows_with(path)
+
+        get_image_loader().load(path, size, on_loaded)
+
+    def watch_media(self, index, path):
+        """Запоминает отрисованную строку с картинкой path, чтобы обновлять только ее"""
+        self.media_rows.setdefault(path, set()).add(QPersistentModelIndex(index))
+
+    def release_media(self, is_visible):
+        """Забывает строки, ушедшие с экрана, и останавливает GIF, которых больше не видно.
+
+        is_visible(index) сообщает, видна ли строка.
+        """
+        for path, indexes in list(self.media_rows.items()):
+            indexes -= {index for index in indexes
+                        if not index.isValid() or not is_visible(self.index(index.row()))}
+            if indexes:
+                continue
+            del self.media_rows[path]
+            movie = self.movies.pop(path, None)
+            if movie is not None:
+                movie.stop()
+                movie.deleteLater()
+
+    def movie_for(self, path):
+        """Общий QMovie для GIF-файла, кадры обновляют только видимые строки с этим файлом"""
+        movie = self.movies.get(path)
+        if movie is None:
+            movie = QMovie(path)
+            movie.setScaledSize(GIF_SIZE)
+            movie.setCacheMode(QMovie.CacheAll)
+            movie.frameChanged.connect(lambda _frame, p=path: self._refresh_rows_with(p))
+            self.movies[path] = movie
+            movie.start()
+        return movie
+
+    def stop_movies(self):
+        for movie in self.movies.values():
+            movie.stop()
+        self.movies.clear()
+        self.media_rows.clear()
+
+    def _refresh_rows_with(self, path):
+        for index in self.media_rows.get(path, ()):
+            if index.isValid():
+                self._refresh_row(index.row())
+
+    def _refresh_row(self, row):
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """Рисует пузыри сообщений, виджеты на сообщение не создаются"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text_font = QFont(QApplication.font())
+        self.text_font.setPixelSize(TEXT_FONT_SIZE)
+        self.time_font = QFont(QApplication.font())
+        self.time_font.setPixelSize(TIME_FONT_SIZE)
+        self.emoji_font = QFont(QApplication.font())
+        self.emoji_font.setPixelSize(EMOJI_FALLBACK_FONT_SIZE)
+        self.text_metrics = QFontMetrics(self.text_font)
+        self.time_metrics = QFontMetrics(self.time_font)
+        self.emoji_size = QSize(*IMAGE_SIZES['chat_emoji'])
+
+    def content_size(self, message):
+        content_type = message['content_type']
+        if content_type == "emoji":
+            return QSize(self.emoji_size)
+        if content_type == "gif":
+            return QSize(GIF_SIZE)
+        rect = self.text_metrics.boundingRect(QRect(0, 0, TEXT_MAX_WIDTH, 100000),
+                                              Qt.TextWordWrap, message['content'])
+        return rect.size()
+
+    def bubble_size(self, message):
+        """Размер пузыря, считается один раз и хранится в самом сообщении"""
+        size = message.get('bubble_size')
+        if size is None:
+            content = self.content_size(message)
+            time_width = self.time_metrics.horizontalAdvance(self.time_text(message))
+            width = max(content.width(), time_width) + 2 * BUBBLE_PADDING_H
+            height = (content.height() + CONTENT_SPACING + self.time_metrics.height()
+                      + 2 * BUBBLE_PADDING_V)
+            size = QSize(width, height)
+            message['bubble_size'] = size
+        return size
+
+    def sizeHint(self, option, index):
+        bubble = self.bubble_size(index.data(MessageRole))
+        return QSize(bubble.width() + 2 * ROW_MARGIN_H, bubble.height() + 2 * ROW_MARGIN_V)
+
+    def bubble_rect(self, option, message):
+        bubble = self.bubble_size(message)
+        top = option.rect.top() + ROW_MARGIN_V
+        if message['is_user']:
+            left = option.rect.right() - ROW_MARGIN_H - bubble.width()
+        else:
+            left = option.rect.left() + ROW_MARGIN_H
+        return QRect(left, top, bubble.width(), bubble.height())
+
+    def paint(self, painter, option, index):
+        message = index.data(MessageRole)
+        bubble = self.bubble_rect(option, message)
+        is_user = message['is_user']
+
+        painter.save()
+        painter.setRenderHint(painter.Antialiasing)
+
+        # Пузырь со "хвостиком": один нижний угол скруглен меньше остальных
+        fill, border = USER_BUBBLE if is_user else PET_BUBBLE
+        rect = QRectF(bubble).adjusted(0.5, 0.5, -0.5, -0.5)
+        path = QPainterPath()
+        path.addRoundedRect(rect, BUBBLE_RADIUS, BUBBLE_RADIUS)
+        tail_size = 2 * BUBBLE_RADIUS
+        tail_left = rect.right() - tail_size if is_user else rect.left()
+        tail = QPainterPath()
+        tail.addRoundedRect(QRectF(tail_left, rect.bottom() - tail_size, tail_size, tail_size),
+                            BUBBLE_TAIL_RADIUS, BUBBLE_TAIL_RADIUS)
+        path = path.united(tail)
+        if message.get('highlighted'):
+            painter.setPen(QPen(HIGHLIGHT_BORDER, 2))
+        else:
+            painter.setPen(QPen(border, 1))
+        painter.setBrush(fill)
+        painter.drawPath(path)
+
+        content = self.content_size(message)
+        content_rect = QRect(bubble.left() + BUBBLE_PADDING_H, bubble.top() + BUBBLE_PADDING_V,
+                             bubble.width() - 2 * BUBBLE_PADDING_H, content.height())
+        self.paint_content(painter, content_rect, message, index)
+
+        # Время отправки
+        time_rect = QRect(content_rect.left(), content_rect.bottom() + 1 + CONTENT_SPACING,
+                          content_rect.width(), self.time_metrics.height())
+        painter.setFont(self.time_font)
+        painter.setPen(QColor(255, 255, 255, 180))
+        painter.drawText(time_rect, Qt.AlignRight | Qt.AlignVCenter, self.time_text(message))
+        painter.restore()
+
+    def paint_content(self, painter, rect, message, index):
+        content_type = message['content_type']
+        model = index.model()
+        if content_type == "text":
+            painter.setFont(self.text_font)
+            painter.setPen(QColor(Qt.white) if message['is_user'] else QColor(Qt.black))
+            painter.drawText(rect, Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, message['content'])
+        elif content_type == "emoji":
+            model.watch_media(index, message['content'])
+            if message['content'] in model.failed_paths:
+                # Если не удалось загрузить, показываем текстовый эмодзи
+                painter.setFont(self.emoji_font)
+                painter.setPen(QColor(Qt.white))
+                painter.drawText(rect, Qt.AlignCenter, "😊")
+                return
+            pixmap = pixmap_cache.lookup(message['content'], self.emoji_size)
+            if pixmap is None:
+                model.request_image(message['content'], self.emoji_size)
+                pixmap = get_image_loader().placeholder(self.emoji_size)
+            self.draw_centered(painter, rect, pixmap)
+        elif content_type == "gif":
+            model.watch_media(index, message['content'])
+            movie = model.movie_for(message['content'])
+            self.draw_centered(painter, rect, movie.currentPixmap())
+
+    @staticmethod
+    def draw_centered(painter, rect, pixmap):
+        if pixmap.isNull():
+            return
+        x = rect.left() + (rect.width() - pixmap.width()) // 2
+        y = rect.top() + (rect.height() - pixmap.height()) // 2
+        painter.drawPixmap(x, y, pixmap)
+
+    @staticmethod
+    def time_text(message):
+        return message['timestamp'].strftime("%H:%M")
+
+class ChatTranscriptView(QListView):
+    """Лента чата: рисует только видимые строки и подгружает историю при прокрутке вверх"""
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setItemDelegate(ChatMessageDelegate(self))
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setUniformItemSizes(False)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(100)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+
+        # Строки, ушедшие с экрана, перестают получать кадры GIF
+        self.media_timer = QTimer(self)
+        self.media_timer.setSingleShot(True)
+        self.media_timer.setInterval(0)
+        self.media_timer.timeout.connect(self.release_hidden_media)
+        model.rowsInserted.connect(self.schedule_media_release)
+        model.rowsRemoved.connect(self.schedule_media_release)
+        model.modelReset.connect(self.schedule_media_release)
+
+    def schedule_media_release(self, *args):
+        self.media_timer.start()
+
+    def release_hidden_media(self):
+        viewport = self.viewport().rect()
+        self.model().release_media(lambda index: self.visualRect(index).intersects(viewport))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_media_release()
+
+    def on_scroll(self, value):
+        self.schedule_media_release()
+        if value == self.verticalScrollBar().minimum() and self.model().has_older:
+            # Откладываем, чтобы не менять модель прямо из обработчика прокрутки
+            QTimer.singleShot(0, self.fetch_older)
+        elif value == self.verticalScrollBar().maximum() and self.model().has_newer:
+            QTimer.singleShot(0, self.fetch_newer)
+
+    def fetch_older(self):
+        """Подгружает старые сообщения, сохраняя видимую позицию ленты"""
+        scrollbar = self.verticalScrollBar()
+        if scrollbar.value() != scrollbar.minimum():
+            return
+        old_maximum = scrollbar.maximum()
+        if self.model().fetch_older(CHAT_SETTINGS['history_page_size']):
+            self.doItemsLayout()
+            scrollbar.setValue(scrollbar.maximum() - old_maximum)
+
+    def fetch_newer(self):
+        """Подгружает более новые сообщения окна, когда лента прокручена до конца"""
+        scrollbar = self.verticalScrollBar()
+        if scrollbar.value() == scrollbar.maximum():
+            self.model().fetch_newer(CHAT_SETTINGS['history_page_size'])
+
+    def scroll_to_row(self, row):
+        self.scrollTo(self.model().index(row), QAbstractItemView.PositionAtCenter)
+
+    def show_context_menu(self, pos):
+        index = self.indexAt(pos)
+        text = index.data(Qt.DisplayRole) if index.isValid() else None
+        if not text:
+            return
+        menu = QMenu(self)
+        copy_action = QAction("📋 Копировать", self)
+        copy_action.triggered.connect(lambda: QApplication.clipboard().setText(text))
+        menu.addAction(copy_action)
+        menu.exec_(self.viewport().mapToGlobal(pos))
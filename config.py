@@ -9,6 +9,16 @@ MEMES_DIR = os.path.join(ASSETS_DIR, 'memes')
 ICONS_DIR = os.path.join(ASSETS_DIR, 'icons')
 PUNISMENT_DIR=os.path.join(ASSETS_DIR, 'punishment')
 EMOJIS_DIR = os.path.join(ASSETS_DIR, "emojis")
+CHAT_DATA_DIR = os.path.join(ASSETS_DIR, 'chat')
+INTENTS_FILE = os.path.join(CHAT_DATA_DIR, 'intents.json')
+PROFANITY_FILE = os.path.join(CHAT_DATA_DIR, 'profanity.json')
+CORPUS_FILE = os.path.join(CHAT_DATA_DIR, 'corpus.txt')  # Реплики диалогов, пустая строка - новый диалог
+
+# Пользовательский кэш (миниатюры и другие производные данные)
+CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'),
+                         'VirtualPet')
+THUMBNAILS_DIR = os.path.join(CACHE_DIR, 'thumbnails')
+RETRIEVAL_INDEX_FILE = os.path.join(CACHE_DIR, 'retrieval_index.pickle')  # TF-IDF индекс CORPUS_FILE
 
 # Настройки питомца
 PET_SETTINGS = {
@@ -16,6 +26,95 @@ PET_SETTINGS = {
     'movement_interval': 3000,
     'state_change_interval': 8000,
     'popup_interval': 1500,
+    'animation_max_fps': 30,  # Ограничение частоты кадров анимации питомца
+}
+
+# Энергосбережение: общий таймер питомца и режимы простоя
+POWER_SETTINGS = {
+    'idle_tick_interval': 2000,     # Как часто проверять состояние в простое и при приостановке (мс)
+    'check_interval': 2000,         # Как часто проверять простой, блокировку и полноэкранные окна (мс)
+    'idle_timeout': 120000,         # Бездействие пользователя до перехода в простой (мс)
+    'idle_slowdown': 4,             # Во сколько раз реже питомец двигается в простое
+    'idle_animation_fps': 5,        # Частота кадров анимации в простое
+}
+
+# Всплывающие сообщения
+POPUP_SETTINGS = {
+    'pool_size': 2,          # Сколько окон держать готовыми к повторному использованию
+    'max_visible': 1,        # Сколько сообщений может быть на экране одновременно
+    'max_queue': 3,          # Длина очереди ожидающих сообщений
+    'min_interval': 3000,    # Минимальный промежуток между показами (мс)
+    'dedup_window': 3,       # Сколько последних сообщений не повторять
+    'display_time': 4000,    # Время показа сообщения перед исчезновением (мс)
+}
+
+# Настройки кэша изображений
+CACHE_SETTINGS = {
+    'pixmap_cache_bytes': 64 * 1024 * 1024,  # Бюджет памяти под масштабированные изображения
+    'use_thumbnails': True,                   # Хранить уменьшенные копии на диске
+    'thumbnails_max_bytes': 256 * 1024 * 1024,  # Предельный размер каталога миниатюр
+}
+
+# Размеры отображения изображений
+IMAGE_SIZES = {
+    'popup_max_height': 400,
+    'chat_emoji': (80, 80),
+    'picker_emoji': (30, 30),
+    'punishment': (300, 200),
+}
+
+# Настройки чата
+CHAT_SETTINGS = {
+    'history_page_size': 50,                    # Сколько сообщений истории подгружать за раз
+    'history_backend': 'jsonl',                 # 'jsonl' или 'sqlite' (без ограничения размера)
+    'sqlite_file': 'chat_history.db',           # База истории для бэкенда 'sqlite'
+    'search_limit': 100,                        # Сколько результатов поиска показывать
+    'search_debounce': 200,                     # Задержка поиска после ввода символа (мс)
+    'search_highlight_time': 2000,              # Сколько подсвечивается найденное сообщение (мс)
+    'history_file': 'chat_history.jsonl',       # Журнал истории (одно сообщение на строку)
+    'legacy_history_file': 'chat_history.json', # Старый формат, переносится в журнал при первом запуске
+    'max_history_size': 1000,                   # Максимальное количество сообщений в журнале 'jsonl'
+    'compaction_factor': 2,                     # Журнал сжимается, когда строк больше max_history_size * factor
+    'fsync_policy': 'interval',                 # 'always', 'interval' или 'never'
+    'fsync_interval': 5.0,                      # Секунды между fsync для политики 'interval'
+    'write_delay': 500,                         # Сколько копить сообщения перед записью на диск (мс)
+    'write_retry_delay': 2000,                  # Пауза перед повтором неудачной записи (мс)
+    'write_max_batch': 200,                     # Запись начинается сразу, если в очереди столько операций
+    'flush_timeout': 5.0,                       # Сколько ждать записи очереди при закрытии (с)
+    'slow_flush_warning': 200,                  # Запись дольше этого (мс) выводится в консоль
+    'transfer_chunk_size': 500,                 # Сообщений в одной пачке при экспорте и импорте
+}
+
+# Генерация ответов питомца
+BOT_SETTINGS = {
+    'backend': 'rules',        # 'rules' (AIChatBot), 'markov' (цепь Маркова) или 'retrieval' (поиск ответа в CORPUS_FILE)
+    'reply_delay': 1000,       # Пауза перед ответом питомца (мс)
+    'reply_timeout': 5000,     # Сколько ждать ответа, потом отвечает AIChatBot (мс)
+    'context_turns': 6,        # Сколько последних сообщений истории передавать генератору
+    'state_file': 'chat_bot_state.json',  # Очереди ответов AIChatBot (рядом с историей чата)
+    'classify_cache_size': 256,  # Сколько последних сообщений помнить с уже найденным намерением
+    'markov_order': 2,         # Длина состояния цепи Маркова (слов)
+    'max_reply_words': 25,     # Максимальная длина сгенерированного ответа
+    'stream_delay': 60,        # Пауза между словами при потоковом выводе (мс)
+    'retrieval_top_k': 5,      # Сколько лучших ответов корпуса рассматривать
+    'retrieval_min_score': 0.1,  # Минимальная косинусная близость, ниже отвечает AIChatBot
+    'context_decay': 0.5,      # Вес каждого более раннего сообщения контекста относительно следующего
+    'retrieval_max_df': 0.3,   # Без NumPy пропускать слова, встречающиеся в большей доле реплик
+}
+
+# Игра "3 в ряд"
+THREE_IN_ROW_SETTINGS = {
+    'grid_size': 8,            # Клеток по каждой стороне поля
+    'gem_types': 6,            # Сколько разных камней
+    'cell_size': 60,           # Размер клетки (пикселей)
+    'points_per_gem': 10,      # Очков за каждый убранный камень
+    'animations': True,        # Анимировать обмен, исчезновение и падение камней
+    'frame_interval': 16,      # Интервал кадров анимации (мс)
+    'swap_time': 150,          # Длительность обмена камней (мс)
+    'clear_time': 200,         # Длительность исчезновения ряда (мс)
+    'fall_time': 60,           # Время падения камня на одну клетку (мс)
+    'shuffle_time': 400,       # Длительность перемешивания поля, когда нет ходов (мс)
+    'hint_time': 1500,         # Сколько подсвечивается подсказка (мс)
 }
 
 # Настройки окон
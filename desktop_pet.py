@@ -3,13 +3,15 @@ import os
 import random
 from PyQt5.QtWidgets import (QMainWindow, QLabel, QMenu, QAction, QApplication)
 from PyQt5.QtCore import Qt, QTimer, QPoint, QPropertyAnimation
-from PyQt5.QtGui import QMovie, QMouseEvent
-from config import PET_SETTINGS, ANIMATIONS_DIR
+from PyQt5.QtGui import QMouseEvent
+from config import PET_SETTINGS, POWER_SETTINGS, ANIMATIONS_DIR
 from utils import get_random_position, get_screen_geometry
-from popup_message import PopupMessage
+from popup_manager import PopupManager
 from about_window import AboutWindow
 from messenger import MessengerWindow
 from qt_three_in_row import ThreeInRowGame
+from sprite_animation import SpriteSheet, SpriteAnimator
+from pet_scheduler import PetScheduler, MODE_IDLE, MODE_SUSPENDED
 
 class DesktopPet(QMainWindow):
     def __init__(self):
@@ -17,15 +19,18 @@ class DesktopPet(QMainWindow):
         self.open_windows = []
         self.is_moving = True
         self.movement_paused = False
+        self.pausing_windows = set()  # Открытые окна, пока они есть - питомец стоит
         self.dragging = False
         self.offset = QPoint()
         self.direction = 1
         
         self.setup_ui()
         self.setup_animations()
+        self.setup_scheduler()
         self.setup_movement()
         self.setup_context_menu()
         self.setup_popups()
+        self.scheduler.start()
         
     def setup_ui(self):
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
@@ -43,7 +48,9 @@ class DesktopPet(QMainWindow):
         self.move(start_x, start_y)
         
     def setup_animations(self):
-        self.animations = {}
+        # Каждый GIF декодируется один раз, все состояния крутит один таймер
+        self.animator = SpriteAnimator(PET_SETTINGS['animation_max_fps'], self)
+        self.animator.frame_changed.connect(self.label.setPixmap)
         animation_files = {
             'idle': 'idle_animation.gif',
             'right': 'right_animation.gif', 
@@ -53,35 +60,62 @@ class DesktopPet(QMainWindow):
         for name, filename in animation_files.items():
             path = os.path.join(ANIMATIONS_DIR, filename)
             if os.path.exists(path):
-                self.animations[name] = QMovie(path)
+                sheet = SpriteSheet.from_gif(path)
+                if sheet:
+                    self.animator.add_state(name, sheet)
+        
+        # Если анимации движения в одну из сторон нет, получаем ее отражением другой
+        mirrored_pairs = [('left', 'right'), ('right', 'left')]
+        for missing, source in mirrored_pairs:
+            if not self.animator.has_state(missing) and self.animator.has_state(source):
+                self.animator.add_state(missing, self.animator.states[source].mirrored())
                 
-        if 'idle' in self.animations:
-            self.current_animation = self.animations['idle']
-            self.label.setMovie(self.current_animation)
-            self.current_animation.start()
+        if self.animator.has_state('idle'):
+            self.animator.set_state('idle')
+            self.animator.start()
             
-    def setup_movement(self):
-        self.move_timer = QTimer(self)
-        self.move_timer.timeout.connect(self.move_pet)
-        self.move_timer.start(PET_SETTINGS['movement_interval'])
+    def setup_scheduler(self):
+        # Движение, смена состояний и всплывающие сообщения работают от одного таймера
+        self.scheduler = PetScheduler(POWER_SETTINGS, is_pet_visible=self.isVisible, parent=self)
+        self.scheduler.mode_changed.connect(self.on_power_mode_changed)
         
-        self.state_timer = QTimer(self)
-        self.state_timer.timeout.connect(self.change_state)
-        self.state_timer.start(PET_SETTINGS['state_change_interval'])
+    def setup_movement(self):
+        slowdown = POWER_SETTINGS['idle_slowdown']
+        self.scheduler.add_task('move', PET_SETTINGS['movement_interval'], self.move_pet,
+                                idle_interval=PET_SETTINGS['movement_interval'] * slowdown)
+        self.scheduler.add_task('state', PET_SETTINGS['state_change_interval'], self.change_state,
+                                idle_interval=PET_SETTINGS['state_change_interval'] * slowdown)
         
         self.animation = QPropertyAnimation(self, b"geometry")
         self.animation.setDuration(2000)
         
     def setup_popups(self):
-        self.popup_timer = QTimer(self)
-        self.popup_timer.timeout.connect(self.show_popup)
-        self.popup_timer.start(PET_SETTINGS['popup_interval'])
+        # Окна сообщений берутся из пула и переиспользуются
+        self.popup_manager = PopupManager(self, parent=self)
+        self.popup_manager.popup_opened.connect(self.pause_for_window)
+        self.popup_manager.popup_closed.connect(self.resume_after_window)
+        
+        # В простое сообщения не показываются - их все равно никто не увидит
+        self.scheduler.add_task('popup', PET_SETTINGS['popup_interval'], self.show_popup)
+        
+    def on_power_mode_changed(self, mode):
+        if mode == MODE_SUSPENDED:
+            self.animator.stop()
+            if not self.movement_paused:
+                self.animation.stop()
+        elif mode == MODE_IDLE:
+            self.animator.set_max_fps(POWER_SETTINGS['idle_animation_fps'])
+            self.animator.start()
+        else:
+            self.animator.set_max_fps(PET_SETTINGS['animation_max_fps'])
+            self.animator.start()
         
     def setup_context_menu(self):
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
         
     def show_context_menu(self, pos):
+        self.scheduler.notify_activity()
         menu = QMenu(self)
         menu.setStyleSheet("""
             QMenu {
@@ -131,28 +165,28 @@ class DesktopPet(QMainWindow):
     # ... остальные методы desktop_pet.py остаются без изменений
         
     def open_messenger(self):
-        self.pause_movement()
         window = MessengerWindow(
-            on_close=self.resume_movement
+            on_close=lambda: self.resume_after_window(window)
         )
+        self.pause_for_window(window)
         self.position_window_near_pet(window)
         window.show()
         self.open_windows.append(window)
         
     def open_game(self):
-        self.pause_movement()
         window = ThreeInRowGame(
-            on_close=self.resume_movement
+            on_close=lambda: self.resume_after_window(window)
         )
+        self.pause_for_window(window)
         self.position_window_near_pet(window)
         window.show()
         self.open_windows.append(window)
         
     def open_about(self):
-        self.pause_movement()
         window = AboutWindow(
-            on_close=self.resume_movement
+            on_close=lambda: self.resume_after_window(window)
         )
+        self.pause_for_window(window)
         self.position_window_near_pet(window)
         window.show()
         self.open_windows.append(window)
@@ -182,18 +216,22 @@ class DesktopPet(QMainWindow):
         self.movement_paused = False
         self.is_moving = True
         
+    def pause_for_window(self, window):
+        self.pausing_windows.add(window)
+        self.pause_movement()
+        
+    def resume_after_window(self, window):
+        # Питомец продолжает движение, только когда закрыто последнее окно
+        self.pausing_windows.discard(window)
+        if not self.pausing_windows:
+            self.resume_movement()
+        
    # desktop_pet.py (обновленный метод show_popup)
     def show_popup(self):
         if random.random() < 0.3 and not self.movement_paused:
-            self.pause_movement()
-        
-            # Создаем popup с передачей позиции и размера питомца
-            popup = PopupMessage(
-                on_close=self.resume_movement,
-                pet_position=self.pos(),  # Текущая позиция питомца
-                pet_size=self.size()      # Размер питомца
-            )
-            popup.show()
+            # Менеджер сам ставит сообщение в очередь, отбрасывает повторы
+            # и показывает его рядом с текущей позицией питомца
+            self.popup_manager.request()
             
     def move_pet(self):
         if not self.is_moving or self.dragging or self.movement_paused:
@@ -226,14 +264,15 @@ class DesktopPet(QMainWindow):
             self.switch_animation('idle')
             
     def switch_animation(self, name):
-        if name in self.animations and self.animations[name] != self.current_animation:
-            if self.current_animation:
-                self.current_animation.stop()
-            self.current_animation = self.animations[name]
-            self.label.setMovie(self.current_animation)
-            self.current_animation.start()
+        self.animator.set_state(name)
             
+    def enterEvent(self, event):
+        # Наведение курсора на питомца - тоже взаимодействие
+        self.scheduler.notify_activity()
+        super().enterEvent(event)
+        
     def mousePressEvent(self, event: QMouseEvent):
+        self.scheduler.notify_activity()
         if event.button() == Qt.LeftButton:
             self.dragging = True
             self.pause_movement()
@@ -254,6 +293,7 @@ class DesktopPet(QMainWindow):
                 QTimer.singleShot(2000, self.move_pet)
                 
     def closeEvent(self, event):
+        self.popup_manager.close_all()
         for window in self.open_windows:
             try:
                 window.close()
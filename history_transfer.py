@@ -0,0 +1,233 @@
+# Потоковый экспорт и импорт истории чата (JSON Lines, CSV и JSON-массив)
+import os
+import csv
+import json
+import threading
+from datetime import datetime
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from config import CHAT_SETTINGS
+
+FIELDS = ('id', 'timestamp', 'is_user', 'content_type', 'content')
+CONTENT_TYPES = ('text', 'emoji', 'gif')
+FORMATS = {'.jsonl': 'jsonl', '.csv': 'csv', '.json': 'json'}
+FILE_FILTERS = "JSON (*.json);;JSON Lines (*.jsonl);;CSV (*.csv)"
+JSON_READ_SIZE = 64 * 1024  # Сколько символов JSON-массива читать за раз
+
+class TransferCancelled(Exception):
+    pass
+
+def detect_format(path):
+    """Формат файла по расширению (по умолчанию - JSON-массив, как в старом экспорте)"""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'json')
+
+def parse_record(record):
+    """Проверяет запись из импортируемого файла. Возвращает сообщение или None"""
+    if not isinstance(record, dict) or not record.get('content'):
+        return None
+
+    timestamp = record.get('timestamp')
+    try:
+        timestamp = datetime.fromisoformat(timestamp).isoformat()
+    except (TypeError, ValueError):
+        timestamp = datetime.now().isoformat()
+
+    is_user = record.get('is_user')
+    if isinstance(is_user, str):
+        is_user = is_user.strip().lower() in ('1', 'true', 'yes')
+
+    content_type = record.get('content_type')
+    return {
+        'timestamp': timestamp,
+        'is_user': bool(is_user),
+        'content_type': content_type if content_type in CONTENT_TYPES else 'text',
+        'content': str(record['content']),
+    }
+
+class JsonArrayWriter:
+    """Пишет JSON-массив по одному элементу, результат совпадает с json.dump(..., indent=2)"""
+
+    def __init__(self, f):
+        self.f = f
+        self.empty = True
+
+    def write(self, messages):
+        for message in messages:
+            self.f.write('[\n  ' if self.empty else ',\n  ')
+            self.f.write(json.dumps(message, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+            self.empty = False
+
+    def close(self):
+        self.f.write('[]' if self.empty else '\n]')
+
+class JsonLinesWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, messages):
+        self.f.write(''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in messages))
+
+    def close(self):
+        pass
+
+class CsvWriter:
+    def __init__(self, f):
+        self.writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, messages):
+        self.writer.writerows(messages)
+
+    def close(self):
+        pass
+
+WRITERS = {'json': JsonArrayWriter, 'jsonl': JsonLinesWriter, 'csv': CsvWriter}
+
+def iter_json_array(f):
+    """Разбирает JSON-массив объектов по частям, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Пропускаем пробелы, запятые и открывающую скобку между элементами
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[':
+            if buffer[position] == '[':
+                started = True
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        if position < len(buffer) and started:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield item
+                position = end
+                continue
+        if eof:
+            if started:
+                raise ValueError("JSON-массив не закрыт")
+            return
+        chunk = f.read(JSON_READ_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def iter_records(f, fmt):
+    if fmt == 'jsonl':
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == 'csv':
+        yield from csv.DictReader(f)
+    else:
+        yield from iter_json_array(f)
+
+class _TransferSignals(QObject):
+    progress = pyqtSignal(int, int)        # Сделано, всего (сообщений при экспорте, байт при импорте)
+    chunk_ready = pyqtSignal(list)         # Пачка разобранных сообщений для импорта
+    finished = pyqtSignal(bool, str, int)  # Успех, текст ошибки, число обработанных сообщений
+
+class HistoryTransferTask(QRunnable):
+    """Экспорт или импорт истории в пуле потоков пачками по chunk_size сообщений.
+
+    Экспорт пишет во временный файл и подменяет им целевой только при успехе.
+    Импорт только разбирает файл: пачки отдаются через chunk_ready в поток GUI,
+    где их добавляет ChatHistoryManager.
+    """
+
+    def __init__(self, mode, path, messages=None, total=0, chunk_size=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.mode = mode  # 'export' или 'import'
+        self.path = path
+        self.format = detect_format(path)
+        self.messages = messages
+        self.total = total
+        self.chunk_size = chunk_size or CHAT_SETTINGS['transfer_chunk_size']
+        self.signals = _TransferSignals()
+        self.cancelled = threading.Event()
+        self.processed = 0
+        self.running = True
+
+    @classmethod
+    def export_to(cls, path, messages, total):
+        return cls('export', path, messages, total)
+
+    @classmethod
+    def import_from(cls, path):
+        return cls('import', path)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            if self.mode == 'export':
+                self.export()
+            else:
+                self.import_()
+            self.signals.finished.emit(True, '', self.processed)
+        except TransferCancelled:
+            self.signals.finished.emit(False, '', self.processed)
+        except Exception as e:
+            self.signals.finished.emit(False, str(e), self.processed)
+        finally:
+            self.running = False
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise TransferCancelled()
+
+    def export(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                writer = WRITERS[self.format](f)
+                chunk = []
+                for message in self.messages:
+                    chunk.append(message)
+                    if len(chunk) >= self.chunk_size:
+                        self.write_chunk(writer, chunk)
+                        chunk = []
+                self.write_chunk(writer, chunk)
+                writer.close()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            # Генератор закрывается в этом же потоке, вместе с его соединением с базой
+            close = getattr(self.messages, 'close', None)
+            if close is not None:
+                close()
+
+    def write_chunk(self, writer, chunk):
+        self.check_cancelled()
+        writer.write(chunk)
+        self.processed += len(chunk)
+        self.signals.progress.emit(self.processed, max(self.total, self.processed))
+
+    def import_(self):
+        total_bytes = os.path.getsize(self.path)
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            chunk = []
+            for record in iter_records(f, self.format):
+                message = parse_record(record)
+                if message is not None:
+                    chunk.append(message)
+                if len(chunk) >= self.chunk_size:
+                    self.emit_chunk(chunk, f.buffer.tell(), total_bytes)
+                    chunk = []
+            self.emit_chunk(chunk, total_bytes, total_bytes)
+
+    def emit_chunk(self, chunk, done_bytes, total_bytes):
+        self.check_cancelled()
+        if chunk:
+            self.signals.chunk_ready.emit(chunk)
+            self.processed += len(chunk)
+        self.signals.progress.emit(done_bytes, total_bytes)
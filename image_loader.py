@@ -0,0 +1,119 @@
+# Фоновая загрузка изображений
+import os
+from PyQt5 import sip
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap, QColor
+from config import CACHE_SETTINGS
+from thumbnails import thumbnail_store, decode_scaled
+from utils import pixmap_cache, get_image_size
+
+class _TaskSignals(QObject):
+    finished = pyqtSignal(object, QImage, float)  # Ключ запроса, изображение, mtime исходника
+
+class ImageLoadTask(QRunnable):
+    """Декодирует изображение в пуле потоков (только QImage, без QPixmap)"""
+
+    def __init__(self, key, path, size, signals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self.signals.finished.emit(self.key, QImage(), 0.0)
+            return
+
+        if self.size is None:
+            image = QImageReader(self.path).read()
+        elif CACHE_SETTINGS['use_thumbnails']:
+            image = thumbnail_store.load_image(self.path, self.size)
+        else:
+            image = decode_scaled(self.path, self.size)
+        self.signals.finished.emit(self.key, image, mtime)
+
+class AsyncImageLoader(QObject):
+    """Асинхронный загрузчик изображений с доставкой результата через сигналы"""
+
+    image_loaded = pyqtSignal(str, object, QImage)  # Путь, запрошенный QSize (или None), изображение
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        self._callbacks = {}  # Ключ -> список callback(pixmap) ожидающих запросов
+        self._placeholders = {}
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._on_task_finished)
+
+    def load(self, path, size, callback):
+        """Запрашивает изображение нужного размера.
+
+        callback(pixmap) вызывается в GUI-потоке: сразу, если изображение уже в кэше,
+        иначе после декодирования в фоне. При ошибке передается пустой QPixmap.
+        Возвращает True, если результат был выдан синхронно.
+        """
+        pixmap = pixmap_cache.lookup(path, size)
+        if pixmap is not None:
+            callback(pixmap)
+            return True
+
+        key = (path, (size.width(), size.height()) if size is not None else None)
+        callbacks = self._callbacks.get(key)
+        if callbacks is not None:
+            # Такое же изображение уже декодируется - просто ждем его
+            callbacks.append(callback)
+            return False
+
+        self._callbacks[key] = [callback]
+        self.pool.start(ImageLoadTask(key, path, size, self._signals))
+        return False
+
+    def load_into_label(self, label, path, size, on_failed=None):
+        """Показывает в QLabel заглушку и подставляет изображение, когда оно будет готово"""
+        def apply(pixmap):
+            if sip.isdeleted(label):
+                return
+            if pixmap.isNull():
+                if on_failed:
+                    on_failed()
+                return
+            label.setPixmap(pixmap)
+
+        placeholder_size = size if size is not None else get_image_size(path)
+        if not self.load(path, size, apply) and placeholder_size.isValid():
+            label.setPixmap(self.placeholder(placeholder_size))
+
+    def placeholder(self, size):
+        """Легкая полупрозрачная заглушка заданного размера"""
+        key = (size.width(), size.height())
+        pixmap = self._placeholders.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(size)
+            pixmap.fill(QColor(255, 255, 255, 60))
+            self._placeholders[key] = pixmap
+        return pixmap
+
+    def _on_task_finished(self, key, image, mtime):
+        path, size_key = key
+        size = QSize(*size_key) if size_key is not None else None
+
+        pixmap = QPixmap()
+        if not image.isNull():
+            pixmap = QPixmap.fromImage(image)
+            pixmap_cache.insert(path, size, Qt.SmoothTransformation, pixmap, mtime)
+
+        self.image_loaded.emit(path, size, image)
+        for callback in self._callbacks.pop(key, []):
+            callback(pixmap)
+
+_loader = None
+
+def get_image_loader():
+    """Возвращает общий асинхронный загрузчик изображений"""
+    global _loader
+    if _loader is None:
+        _loader = AsyncImageLoader()
+    return _loader
@@ -3,6 +3,9 @@ import sys
 import os
 from PyQt5.QtWidgets import QApplication
 from desktop_pet import DesktopPet
+from asset_catalog import get_asset_catalog
+from thumbnails import thumbnail_store
+from config import CACHE_SETTINGS
 
 def main():
     # Создание необходимых директорий
@@ -13,6 +16,14 @@ def main():
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
     
+    # Однократное сканирование ресурсов, дальше каталог обновляется по событиям ФС
+    get_asset_catalog()
+
+    # Устаревшие миниатюры удаляются в фоне
+    if CACHE_SETTINGS['use_thumbnails']:
+        thumbnail_store.start_cleanup(CACHE_SETTINGS['thumbnails_max_bytes'])
+        app.aboutToQuit.connect(thumbnail_store.save_index)
+    
     # Создание и отображение питомца
     pet = DesktopPet()
     pet.show()
@@ -1,15 +1,24 @@
 import random
-import os
-import json
+import time
 from datetime import datetime
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QPushButton, QScrollArea, QFrame,
+                             QLabel, QLineEdit, QPushButton,
                              QApplication, QFileDialog, QGridLayout, QScrollBar,
-                             QMenu, QAction, QMessageBox)
-from PyQt5.QtCore import Qt, QPoint, QTimer, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QMouseEvent, QFont, QPixmap, QMovie, QIcon
+                             QMenu, QAction, QMessageBox, QListWidget, QListWidgetItem,
+                             QProgressDialog)
+from PyQt5.QtCore import Qt, QPoint, QTimer, QPropertyAnimation, QEasingCurve, QThreadPool
+from PyQt5.QtGui import QMouseEvent, QFont, QPixmap, QIcon
 from PyQt5.Qt import QSize
+from PyQt5 import sip
+from config import IMAGE_SIZES, CHAT_SETTINGS, BOT_SETTINGS
 from utils import get_available_punishment, get_available_emojis
+from image_loader import get_image_loader
+from chat_view import ChatTranscriptModel, ChatTranscriptView, normalize_message
+from chat_history import ChatHistoryManager
+from history_transfer import HistoryTransferTask, FILE_FILTERS
+from profanity import get_profanity_filter
+from chat_bot import create_backend
+from response_controller import ResponseController, ResponseContext
 
 class LockScreen(QMainWindow):
     def __init__(self):
@@ -33,8 +42,7 @@ class LockScreen(QMainWindow):
         punishment_path = random.choice(get_available_punishment())
         image_label = QLabel()
         
-        pixmap = self.create_punishment_image(punishment_path)
-        image_label.setPixmap(pixmap)
+        self.load_punishment_image(image_label, punishment_path)
         image_label.setAlignment(Qt.AlignCenter)
         image_label.setStyleSheet("background: transparent;")
         
@@ -71,18 +79,17 @@ class LockScreen(QMainWindow):
         self.timer.timeout.connect(self.update_timer)
         self.timer.start(1000)
    
-    def create_punishment_image(self, punishment_path):
-        """Загружает изображение из файла"""
-        pixmap = QPixmap(punishment_path)
-        if pixmap.isNull():
+    def load_punishment_image(self, image_label, punishment_path):
+        """Загружает изображение из файла в фоне"""
+        size = QSize(*IMAGE_SIZES['punishment'])
+        
+        def show_fallback():
             # Если файл не найден, создаем простую картинку
-            size = QSize(300, 200)
             fallback_pixmap = QPixmap(size)
             fallback_pixmap.fill(Qt.red)
-            return fallback_pixmap
+            image_label.setPixmap(fallback_pixmap)
         
-        # Масштабируем до нужного размера
-        return pixmap.scaled(300, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        get_image_loader().load_into_label(image_label, punishment_path, size, on_failed=show_fallback)
         
     def update_timer(self):
         self.seconds_remaining -= 1
@@ -104,96 +111,6 @@ class LockScreen(QMainWindow):
         self.animation.finished.connect(self.close)
         self.animation.start()
 
-class ChatMessageWidget(QWidget):
-    def __init__(self, content, is_user=True, timestamp=None, content_type="text"):
-        super().__init__()
-        self.content = content
-        self.is_user = is_user
-        self.content_type = content_type  # "text", "emoji", "gif"
-        self.timestamp = timestamp or datetime.now()
-        self.setup_ui()
-        
-    def setup_ui(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(10, 5, 10, 5)
-        
-        if self.is_user:
-            layout.addStretch()
-            
-        message_frame = QFrame()
-        message_frame.setObjectName("message_frame")
-        message_layout = QVBoxLayout(message_frame)
-        message_layout.setContentsMargins(12, 8, 12, 8)
-        message_layout.setAlignment(Qt.AlignCenter)
-        
-        # В зависимости от типа контента создаем разные виджеты
-        if self.content_type == "text":
-            content_widget = QLabel(self.content)
-            content_widget.setWordWrap(True)
-            content_widget.setMaximumWidth(300)
-            content_widget.setTextInteractionFlags(Qt.TextSelectableByMouse)
-            content_widget.setStyleSheet("color: white; background: transparent; font-size: 12px;")
-        elif self.content_type == "emoji":
-            content_widget = QLabel()
-            content_widget.setAlignment(Qt.AlignCenter)
-            content_widget.setMaximumSize(100, 100)
-            
-            # Загружаем изображение эмодзи
-            pixmap = QPixmap(self.content)
-            if not pixmap.isNull():
-                pixmap = pixmap.scaled(80, 80, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                content_widget.setPixmap(pixmap)
-            else:
-                # Если не удалось загрузить, показываем текстовый эмодзи
-                content_widget.setText("😊")
-                content_widget.setStyleSheet("font-size: 24px; color: white; background: transparent;")
-        elif self.content_type == "gif":
-            content_widget = QLabel()
-            content_widget.setAlignment(Qt.AlignCenter)
-            content_widget.setMaximumSize(200, 150)
-            
-            # Загружаем GIF
-            movie = QMovie(self.content)
-            movie.setScaledSize(QSize(150, 100))
-            content_widget.setMovie(movie)
-            movie.start()
-        
-        time_label = QLabel(self.timestamp.strftime("%H:%M"))
-        time_label.setAlignment(Qt.AlignRight)
-        time_label.setStyleSheet("color: rgba(255, 255, 255, 180); font-size: 10px; background: transparent;")
-        
-        message_layout.addWidget(content_widget)
-        message_layout.addWidget(time_label)
-        
-        if self.is_user:
-            message_frame.setStyleSheet("""
-                QFrame#message_frame {
-                    background: rgba(0, 123, 255, 180);
-                    border-radius: 15px;
-                    border-bottom-right-radius: 5px;
-                    border: 1px solid rgba(255, 255, 255, 100);
-                }
-            """)
-        else:
-            message_frame.setStyleSheet("""
-                QFrame#message_frame {
-                    background: rgba(255, 255, 255, 120);
-                    border-radius: 15px;
-                    border-bottom-left-radius: 5px;
-                    border: 1px solid rgba(255, 255, 255, 80);
-                }
-                QLabel {
-                    color: black;
-                }
-            """)
-        
-        layout.addWidget(message_frame)
-        
-        if not self.is_user:
-            layout.addStretch()
-            
-        self.setLayout(layout)
-
 class EmojiPicker(QMainWindow):
     def __init__(self, messenger_window):
         super().__init__()
@@ -261,13 +178,10 @@ class EmojiPicker(QMainWindow):
                 }
             """)
             
-            # Загружаем изображение эмодзи
-            pixmap = QPixmap(emoji_path)
-            if not pixmap.isNull():
-                pixmap = pixmap.scaled(30, 30, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                icon = QIcon(pixmap)
-                emoji_btn.setIcon(icon)
-                emoji_btn.setIconSize(QSize(30, 30))
+            # Загружаем изображение эмодзи в фоне
+            emoji_btn.setIconSize(QSize(*IMAGE_SIZES['picker_emoji']))
+            get_image_loader().load(emoji_path, QSize(*IMAGE_SIZES['picker_emoji']),
+                                    lambda pixmap, btn=emoji_btn: self.set_emoji_icon(btn, pixmap))
             
             emoji_btn.clicked.connect(lambda checked, path=emoji_path: self.send_emoji(path))
             emoji_grid.addWidget(emoji_btn, row, col)
@@ -293,6 +207,10 @@ class EmojiPicker(QMainWindow):
         close_btn.clicked.connect(self.close_window)
         layout.addWidget(close_btn)
         
+    def set_emoji_icon(self, emoji_btn, pixmap):
+        if not pixmap.isNull() and not sip.isdeleted(emoji_btn):
+            emoji_btn.setIcon(QIcon(pixmap))
+            
     def setup_animations(self):
         self.animation = QPropertyAnimation(self, b"windowOpacity")
         self.animation.setDuration(300)
@@ -313,171 +231,169 @@ class EmojiPicker(QMainWindow):
     def send_emoji(self, emoji_path):
         if self.messenger_window:
             self.messenger_window.add_message(emoji_path, True, "emoji")
-            QTimer.singleShot(1000, self.messenger_window.pet_response)
+            self.messenger_window.pet_response()
         self.close_window()
 
-class ChatHistoryManager:
-    """Менеджер для работы с историей чата"""
-    
-    def __init__(self, filename="chat_history.json"):
-        self.filename = filename
-        self.history = []
-        self.max_history_size = 1000  # Максимальное количество сообщений в истории
-        self.load_history()
-    
-    def load_history(self):
-        """Загружает историю чата из файла"""
-        try:
-            if os.path.exists(self.filename):
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
-                # Ограничиваем размер истории
-                if len(self.history) > self.max_history_size:
-                    self.history = self.history[-self.max_history_size:]
-            else:
-                self.history = []
-        except Exception as e:
-            print(f"Ошибка загрузки истории чата: {e}")
-            self.history = []
-    
-    def save_history(self):
-        """Сохраняет историю чата в файл"""
-        try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Ошибка сохранения истории чата: {e}")
-    
-    def add_message(self, message):
-        """Добавляет сообщение в историю"""
-        # Преобразуем datetime в строку для сериализации
-        if 'timestamp' in message and isinstance(message['timestamp'], datetime):
-            message['timestamp'] = message['timestamp'].isoformat()
-        
-        self.history.append(message)
-        
-        # Ограничиваем размер истории
-        if len(self.history) > self.max_history_size:
-            self.history = self.history[-self.max_history_size:]
-        
-        self.save_history()
-    
-    def clear_history(self):
-        """Очищает историю чата"""
-        self.history = []
-        try:
-            if os.path.exists(self.filename):
-                os.remove(self.filename)
-        except Exception as e:
-            print(f"Ошибка удаления файла истории: {e}")
-        self.save_history()
-    
-    def get_recent_messages(self, count=100):
-        """Возвращает последние сообщения из истории"""
-        return self.history[-count:] if self.history else []
+class ChatSearchWindow(QMainWindow):
+    """Поиск по истории чата: результаты обновляются по мере ввода запроса"""
+
+    def __init__(self, messenger_window):
+        super().__init__()
+        self.messenger_window = messenger_window
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(CHAT_SETTINGS['search_debounce'])
+        self.search_timer.timeout.connect(self.run_search)
+        self.setup_ui()
+        self.setup_animations()
+
+    def setup_ui(self):
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setFixedSize(350, 400)
+
+        central_widget = QWidget()
+        central_widget.setObjectName("central_widget")
+        self.setCentralWidget(central_widget)
+
+        self.setStyleSheet("""
+            QMainWindow {
+                background: transparent;
+            }
+            QWidget#central_widget {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                                            stop:0 rgba(255, 105, 180, 200), 
+                                            stop:1 rgba(186, 85, 211, 200));
+                border-radius: 15px;
+                border: 2px solid rgba(255, 105, 180, 220);
+            }
+            QLineEdit {
+                background: rgba(255, 255, 255, 150);
+                border: 1px solid rgba(255, 255, 255, 100);
+                border-radius: 10px;
+                padding: 6px;
+                font-size: 12px;
+            }
+            QListWidget {
+                background: rgba(255, 255, 255, 80);
+                border: none;
+                border-radius: 10px;
+                color: white;
+                font-size: 12px;
+            }
+            QListWidget::item {
+                padding: 4px;
+            }
+            QListWidget::item:selected {
+                background: rgba(255, 255, 255, 60);
+            }
+        """)
+
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(10, 10, 10, 10)
+
+        title_label = QLabel("Поиск по истории:")
+        title_label.setStyleSheet("""
+            color: white; 
+            font-size: 14px; 
+            font-weight: bold;
+            background: transparent;
+        """)
+        layout.addWidget(title_label)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Введите слова для поиска...")
+        self.query_input.textChanged.connect(lambda: self.search_timer.start())
+        self.query_input.returnPressed.connect(self.run_search)
+        layout.addWidget(self.query_input)
+
+        self.results_list = QListWidget()
+        self.results_list.setWordWrap(True)
+        self.results_list.itemActivated.connect(self.open_result)
+        self.results_list.itemClicked.connect(self.open_result)
+        layout.addWidget(self.results_list)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: white; font-size: 11px; background: transparent;")
+        layout.addWidget(self.status_label)
+
+        # Кнопка закрытия
+        close_btn = QPushButton("Закрыть")
+        close_btn.setStyleSheet("""
+            QPushButton {
+                background: rgba(255, 105, 180, 180);
+                color: white;
+                border: none;
+                border-radius: 10px;
+                padding: 8px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background: rgba(255, 105, 180, 220);
+                border: 1px solid white;
+            }
+        """)
+        close_btn.clicked.connect(self.close_window)
+        layout.addWidget(close_btn)
+
+    def setup_animations(self):
+        self.animation = QPropertyAnimation(self, b"windowOpacity")
+        self.animation.setDuration(300)
+        self.animation.setStartValue(0.0)
+        self.animation.setEndValue(1.0)
+        self.animation.setEasingCurve(QEasingCurve.OutCubic)
+        self.animation.start()
+
+    def close_window(self):
+        self.animation = QPropertyAnimation(self, b"windowOpacity")
+        self.animation.setDuration(300)
+        self.animation.setStartValue(1.0)
+        self.animation.setEndValue(0.0)
+        self.animation.setEasingCurve(QEasingCurve.OutCubic)
+        self.animation.finished.connect(self.close)
+        self.animation.start()
+
+    def run_search(self):
+        self.search_timer.stop()
+        self.results_list.clear()
+        query = self.query_input.text().strip()
+        if not query:
+            self.status_label.setText("")
+            return
+
+        started = time.perf_counter()
+        results = self.messenger_window.history_manager.search(query, CHAT_SETTINGS['search_limit'])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for message in results:
+            author = "Вы" if message['is_user'] else "Питомец"
+            timestamp = normalize_message(message)['timestamp'].strftime("%d.%m.%Y %H:%M")
+            item = QListWidgetItem(f"{timestamp} {author}: {message['content']}")
+            item.setData(Qt.UserRole, message['id'])
+            self.results_list.addItem(item)
+        self.status_label.setText(f"Найдено: {len(results)} ({elapsed_ms:.1f} мс)")
+
+    def open_result(self, item):
+        self.messenger_window.jump_to_message(item.data(Qt.UserRole))
 
-class AIChatBot:
-    def __init__(self):
-        self.responses = [
-            "Привет! Как твои дела? 💖",
-            "Мяу! Я так рада тебя видеть! 🐾",
-            "Расскажи мне что-нибудь интересное! 🌟",
-            "Ты сегодня особенно мил! 😊",
-            "Мурр... Я обожаю с тобой говорить! 💕",
-            "Что нового у тебя? 🎀",
-            "Ты лучший хозяин на свете! 🌈",
-            "Мне так весело с тобой! 🎉"
-        ]
-        
-        # Ответы на плохие слова
-        self.bad_word_responses = [
-            "Ой-ой, так нельзя говорить! 😾",
-            "Мяу! Не ругайся! 🚫",
-            "Фу-фу, такие слова некрасиво! 👿",
-            "Я обижусь, если ты будешь так говорить! 😿"
-        ]
-        
-    def get_response(self, user_message):
-        user_message_lower = user_message.lower()
-        # Проверяем на плохие слова
-        if self.contains_bad_words(user_message_lower):
-            return {"type": "text", "content": random.choice(self.bad_word_responses)}
-    
-        # С вероятностью 30% отвечаем графическим эмодзи
-        if random.random() < 0.3:
-            emojis = get_available_emojis()
-            if emojis:
-                return {"type": "emoji", "content": random.choice(emojis)}
-    
-        # Контекстные ответы
-        if any(word in user_message_lower for word in ['привет', 'здравствуй', 'hello', 'hi']):
-            responses = [
-                "Привет, хозяин! 💖 Как твои дела?",
-                "Мяу! Приветствую тебя! 🐾",
-                "О, ты здесь! Я так рада тебя видеть! 😊"
-            ]
-            return {"type": "text", "content": random.choice(responses)}
-    
-        elif any(word in user_message_lower for word in ['как дела', 'как ты', 'самочувствие']):
-            responses = [
-                "У меня все прекрасно, особенно когда ты рядом! 💕",
-                "Чувствую себя отлично! Готова играть и обниматься! 🎀",
-                "Мур-мур... Я счастлива, когда ты со мной говоришь! 😸"
-        ]
-            return {"type": "text", "content": random.choice(responses)}
-    
-        elif any(word in user_message_lower for word in ['красив', 'мил', 'хорош', 'люблю']):
-            responses = [
-                "Ой, ты меня смущаешь! 😳💖",
-                "Спасибо! Ты тоже самый лучший! 🌸",
-                "Мурр... Ты делаешь меня такой счастливой! 💕"
-            ]
-            return {"type": "text", "content": random.choice(responses)}
-    
-        elif any(word in user_message_lower for word in ['пока', 'до свидания', 'спокойной']):
-            responses = [
-                "Пока-пока! Возвращайся скорее! 😘",
-                "До встречи! Буду скучать! 💔",
-                "Спокойной ночи, сладких снов! 🌙✨"
-            ]
-            return {"type": "text", "content": random.choice(responses)}
-    
-        elif any(word in user_message_lower for word in ['еда', 'кушать', 'голоден', 'есть']):
-            responses = [
-                "Я уже покушала, спасибо! Но печенек никогда не бывает много! 🍪",
-                "Ммм... Я люблю рыбку и сливочки! 🐟🥛",
-                "Я не голодна, но с удовольствием составлю тебе компанию! 😊"
-            ]
-            return {"type": "text", "content": random.choice(responses)}
-    
-        else:
-            responses = [
-                "Интересно! Расскажи мне больше об этом! 💭",
-                "Мяу! Я слушаю внимательно! 🐾",
-                "Как здорово! Ты всегда рассказываешь такие интересные вещи! 🌟",
-                "Правда? Это так увлекательно! 😮",
-                "Мурр... Я думаю над твоими словами! 💖",
-                "Очень интересно! Что еще ты хочешь рассказать? 🎀"
-            ]
-            return {"type": "text", "content": random.choice(responses)}
-    
-    def contains_bad_words(self, text):
-        bad_words = [
-            'мат', 'плохоеслово', 'ругательство',
-            'бля', 'хуй', 'пизда', 'ебать', 'нахуй'
-        ]
-        text_lower = text.lower()
-        return any(bad_word in text_lower for bad_word in bad_words)
-        
 class MessengerWindow(QMainWindow):
     def __init__(self, on_close=None):
         super().__init__()
         self.on_close_callback = on_close
-        self.ai_bot = AIChatBot()
-        self.messages = []
+        # Ответы питомца генерируются в рабочем потоке и могут выводиться по частям
+        self.responder = ResponseController(create_backend(), parent=self)
+        self.responder.reply_partial.connect(self.on_reply_partial)
+        self.responder.reply_ready.connect(self.on_reply_ready)
         self.dragging = False
         self.drag_position = QPoint()
         self.history_manager = ChatHistoryManager()
+        # При выходе из приложения без закрытия окна очередь записи и очереди ответов тоже сохраняются
+        QApplication.instance().aboutToQuit.connect(self.history_manager.close)
+        self.history_manager.signals.write_failed.connect(self.on_history_write_failed)
+        QApplication.instance().aboutToQuit.connect(self.responder.close)
+        self.search_window = None
+        self.transfer_task = None
+        self.transcript_model = ChatTranscriptModel(self.history_manager, self)
         self.setup_ui()
         self.setup_animations()
         self.load_chat_history()
@@ -576,26 +492,16 @@ class MessengerWindow(QMainWindow):
         title_layout.addWidget(history_btn)
         title_layout.addWidget(close_btn)
         
-        # Область чата
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setObjectName("scroll_area")
-        self.scroll_widget = QWidget()
-        self.scroll_widget.setObjectName("scroll_widget")
-        self.scroll_layout = QVBoxLayout(self.scroll_widget)
-        self.scroll_layout.addStretch()
-        
-        self.scroll_area.setWidget(self.scroll_widget)
-        self.scroll_area.setWidgetResizable(True)
+        # Область чата: рисуются только видимые сообщения
+        self.transcript_view = ChatTranscriptView(self.transcript_model)
+        self.transcript_view.setObjectName("transcript_view")
         
         # Стили для области прокрутки
-        self.scroll_area.setStyleSheet("""
-            QScrollArea#scroll_area {
+        self.transcript_view.setStyleSheet("""
+            QListView#transcript_view {
                 background: rgba(255, 255, 255, 50);
                 border: none;
             }
-            QWidget#scroll_widget {
-                background: transparent;
-            }
             QScrollBar:vertical {
                 background: rgba(255, 255, 255, 80);
                 width: 12px;
@@ -711,7 +617,7 @@ class MessengerWindow(QMainWindow):
         input_layout.addWidget(send_btn)
         
         layout.addWidget(title_bar)
-        layout.addWidget(self.scroll_area)
+        layout.addWidget(self.transcript_view)
         layout.addWidget(input_widget)
         
     def setup_animations(self):
@@ -775,17 +681,39 @@ class MessengerWindow(QMainWindow):
         """)
         
         # Статистика истории
-        stats_action = QAction(f"📊 Сообщений в истории: {len(self.history_manager.history)}", self)
+        stats_action = QAction(f"📊 Сообщений в истории: {self.history_manager.count_messages()}", self)
         stats_action.setEnabled(False)
         menu.addAction(stats_action)
         
+        # Задержка фоновой записи истории на диск
+        flush_stats = self.history_manager.flush_stats()
+        if flush_stats['flushes']:
+            flush_action = QAction(f"💾 Запись на диск: {flush_stats['last_ms']:.1f} мс "
+                                   f"(макс. {flush_stats['max_ms']:.1f} мс)", self)
+            flush_action.setEnabled(False)
+            menu.addAction(flush_action)
+        
         menu.addSeparator()
         
+        # Поиск по истории
+        search_action = QAction("🔍 Поиск по истории", self)
+        search_action.triggered.connect(self.show_search_window)
+        menu.addAction(search_action)
+        
         # Экспорт истории
         export_action = QAction("💾 Экспорт истории", self)
         export_action.triggered.connect(self.export_history)
         menu.addAction(export_action)
         
+        # Импорт истории
+        import_action = QAction("📥 Импорт истории", self)
+        import_action.triggered.connect(self.import_history)
+        menu.addAction(import_action)
+        
+        if self.transfer_task is not None:
+            export_action.setEnabled(False)
+            import_action.setEnabled(False)
+        
         # Очистка истории
         clear_action = QAction("🗑️ Очистить историю", self)
         clear_action.triggered.connect(self.clear_history)
@@ -796,52 +724,80 @@ class MessengerWindow(QMainWindow):
         
     def load_chat_history(self):
         """Загружает историю чата и отображает последние сообщения"""
-        recent_messages = self.history_manager.get_recent_messages(50)  # Последние 50 сообщений
-        
-        for message_data in recent_messages:
-            # Восстанавливаем datetime из строки
-            if 'timestamp' in message_data and isinstance(message_data['timestamp'], str):
-                try:
-                    message_data['timestamp'] = datetime.fromisoformat(message_data['timestamp'])
-                except:
-                    message_data['timestamp'] = datetime.now()
-            
-            # Создаем виджет сообщения
-            message_widget = ChatMessageWidget(
-                message_data['content'],
-                message_data['is_user'],
-                message_data['timestamp'],
-                message_data['content_type']
-            )
-            
-            # Добавляем в интерфейс
-            if message_data['is_user']:
-                self.scroll_layout.insertWidget(self.scroll_layout.count() - 1, message_widget)
-            else:
-                self.scroll_layout.insertWidget(self.scroll_layout.count() - 1, message_widget)
-            
-            # Сохраняем в текущие сообщения
-            self.messages.append(message_data)
+        # Последняя страница истории, более старые подгружаются при прокрутке вверх
+        self.transcript_model.load_recent(CHAT_SETTINGS['history_page_size'])
         
         # Прокручиваем вниз
-        if recent_messages:
+        if self.transcript_model.rowCount():
             QTimer.singleShot(100, self.scroll_to_bottom)
 
+    def show_search_window(self):
+        if self.search_window is None or sip.isdeleted(self.search_window) or not self.search_window.isVisible():
+            self.search_window = ChatSearchWindow(self)
+            self.search_window.move(self.x() + self.width() + 10, self.y())
+        self.search_window.show()
+        self.search_window.raise_()
+        self.search_window.query_input.setFocus()
+
+    def jump_to_message(self, message_id):
+        """Прокручивает ленту к сообщению из истории и подсвечивает его"""
+        row = self.transcript_model.ensure_loaded(message_id)
+        if row < 0:
+            return
+        self.transcript_view.scroll_to_row(row)
+        self.transcript_model.highlight(row, CHAT_SETTINGS['search_highlight_time'])
+
     def export_history(self):
-        """Экспортирует историю чата в файл"""
+        """Экспортирует историю чата в файл (JSON, JSON Lines или CSV) в фоне"""
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Экспорт истории чата", "chat_history.json", "JSON Files (*.json)"
+            self, "Экспорт истории чата", "chat_history.json", FILE_FILTERS
+        )
+        
+        if file_path:
+            total = self.history_manager.count_messages()
+            messages = self.history_manager.iter_messages(separate_connection=True)
+            task = HistoryTransferTask.export_to(file_path, messages, total)
+            self.run_transfer(task, "Экспорт истории чата...", "экспортировать", "экспортирована")
+            
+    def import_history(self):
+        """Добавляет в историю сообщения из файла (JSON, JSON Lines или CSV) в фоне"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Импорт истории чата", "", FILE_FILTERS
         )
         
         if file_path:
-            try:
-                # Копируем историю в выбранный файл
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.history_manager.history, f, ensure_ascii=False, indent=2)
+            task = HistoryTransferTask.import_from(file_path)
+            task.signals.chunk_ready.connect(self.history_manager.import_messages)
+            self.run_transfer(task, "Импорт истории чата...", "импортировать", "импортирована")
+            
+    def run_transfer(self, task, label, verb, done_word):
+        """Запускает экспорт или импорт в пуле потоков с окном прогресса и отменой"""
+        progress = QProgressDialog(label, "Отмена", 0, 100, self)
+        progress.setWindowTitle("История чата")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(300)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(task.cancel)
+        
+        def on_progress(done, total):
+            progress.setValue(int(done * 100 / total) if total else 100)
+            
+        def on_finished(ok, error, count):
+            self.transfer_task = None
+            progress.close()
+            if task.mode == 'import' and count:
+                self.transcript_model.load_recent(CHAT_SETTINGS['history_page_size'])
+                QTimer.singleShot(100, self.scroll_to_bottom)
+            if ok:
+                QMessageBox.information(self, "Успех", f"История чата успешно {done_word}! Сообщений: {count}")
+            elif error:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось {verb} историю: {error}")
                 
-                QMessageBox.information(self, "Успех", "История чата успешно экспортирована!")
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Не удалось экспортировать историю: {str(e)}")
+        task.signals.progress.connect(on_progress)
+        task.signals.finished.connect(on_finished)
+        self.transfer_task = task
+        QThreadPool.globalInstance().start(task)
                 
     def clear_history(self):
         """Очищает историю чата"""
@@ -858,13 +814,7 @@ class MessengerWindow(QMainWindow):
             self.history_manager.clear_history()
             
             # Очищаем интерфейс
-            for i in reversed(range(self.scroll_layout.count() - 1)):
-                widget = self.scroll_layout.itemAt(i).widget()
-                if widget:
-                    widget.setParent(None)
-            
-            # Очищаем список сообщений
-            self.messages.clear()
+            self.transcript_model.clear()
             
             QMessageBox.information(self, "Успех", "История чата очищена!")
 
@@ -880,7 +830,7 @@ class MessengerWindow(QMainWindow):
                 
             self.add_message(text, True, "text")
             self.message_input.clear()
-            QTimer.singleShot(1000, self.pet_response)
+            self.pet_response()
             
     def show_emoji_picker(self):
         """Показывает окно выбора эмодзи"""
@@ -897,15 +847,11 @@ class MessengerWindow(QMainWindow):
         )
         if file_path:
             self.add_message(file_path, True, "gif")
-            QTimer.singleShot(1000, self.pet_response)
+            self.pet_response()
             
     def contains_very_bad_words(self, text):
-        very_bad_words = [
-            'бля', 'хуй', 'пизда', 'ебать', 'нахуй', 'еблан',
-            'сука', 'мудак', 'гондон', 'залупа', 'дрочить'
-        ]
-        text_lower = text.lower()
-        return any(bad_word in text_lower for bad_word in very_bad_words)
+        # Только слова уровня 'severe' - за них чат блокируется
+        return get_profanity_filter().contains(text, 'severe')
         
     def activate_lock_screen(self):
         """Активирует экран блокировки"""
@@ -931,42 +877,53 @@ class MessengerWindow(QMainWindow):
             'timestamp': datetime.now()
         }
         
-        # Создаем виджет сообщения
-        message_widget = ChatMessageWidget(
-            content, is_user, message_data['timestamp'], content_type
-        )
-        
-        # Добавляем в интерфейс
-        if is_user:
-            self.scroll_layout.insertWidget(self.scroll_layout.count() - 1, message_widget)
-        else:
-            self.scroll_layout.insertWidget(self.scroll_layout.count() - 1, message_widget)
-            
-        # Сохраняем в текущие сообщения
-        self.messages.append(message_data)
+        # Сохраняем в историю (сохраненная копия получает id)
+        stored_message = self.history_manager.add_message(message_data)
         
-        # Сохраняем в историю
-        self.history_manager.add_message(message_data)
+        # Добавляем в ленту (модель хранит свою копию с datetime)
+        self.transcript_model.append_message(stored_message)
         
         # Прокручиваем вниз
         QTimer.singleShot(100, self.scroll_to_bottom)
         
     def pet_response(self):
-        # Получаем последнее сообщение пользователя для контекста
+        """Запрашивает ответ питомца; он появится после паузы reply_delay"""
+        # Последние сообщения истории - контекст для генератора ответов
+        history = self.history_manager.get_recent_messages(BOT_SETTINGS['context_turns'])
         user_message = ""
-        if self.messages:
-            last_msg = self.messages[-1]
+        if history:
+            last_msg = history[-1]
             if last_msg['is_user'] and last_msg['content_type'] == "text":
                 user_message = last_msg['content']
                 
-        response = self.ai_bot.get_response(user_message)
+        self.responder.request(ResponseContext(user_message, history))
+        
+    def on_reply_partial(self, text):
+        # Часть ответа показывается в ленте, но в историю попадет только готовый ответ
+        self.transcript_model.set_streaming_text(text)
+        self.scroll_to_bottom()
+        
+    def on_reply_ready(self, response):
+        self.transcript_model.clear_streaming()
         self.add_message(response["content"], False, response["type"])
         
     def scroll_to_bottom(self):
-        scrollbar = self.scroll_area.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        self.transcript_view.scrollToBottom()
+
+    def on_history_write_failed(self, error):
+        # Сообщения остаются в очереди, запись повторяется в фоне
+        QMessageBox.warning(self, "Ошибка",
+                            f"Не удалось сохранить историю чата: {error}\n"
+                            "Запись будет повторена автоматически.")
     
     def closeEvent(self, event):
+        self.transcript_model.stop_movies()
+        self.responder.close()
+        if self.transfer_task is not None:
+            self.transfer_task.cancel()
+        if self.search_window is not None and not sip.isdeleted(self.search_window):
+            self.search_window.close()
+        self.history_manager.close()
         if self.on_close_callback:
             self.on_close_callback()
         super().closeEvent(event)
\ No newline at end of file
@@ -0,0 +1,237 @@
+# Общий планировщик периодических задач питомца с режимами энергосбережения
+import os
+import sys
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QCursor
+
+MODE_ACTIVE = 'active'        # Пользователь за компьютером
+MODE_IDLE = 'idle'            # Пользователь давно ничего не делал
+MODE_SUSPENDED = 'suspended'  # Экран заблокирован, открыто полноэкранное приложение или питомец скрыт
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+
+    class _LastInputInfo(ctypes.Structure):
+        _fields_ = [('cbSize', wintypes.UINT), ('dwTime', wintypes.DWORD)]
+
+    class _MonitorInfo(ctypes.Structure):
+        _fields_ = [('cbSize', wintypes.DWORD), ('rcMonitor', wintypes.RECT),
+                    ('rcWork', wintypes.RECT), ('dwFlags', wintypes.DWORD)]
+
+    _user32 = ctypes.windll.user32
+    _kernel32 = ctypes.windll.kernel32
+
+    # Без явных типов ctypes считает результат int и обрезает 64-битные дескрипторы
+    _HDESK = wintypes.HANDLE
+    _user32.OpenInputDesktop.restype = _HDESK
+    _user32.OpenInputDesktop.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _user32.SwitchDesktop.restype = wintypes.BOOL
+    _user32.SwitchDesktop.argtypes = [_HDESK]
+    _user32.CloseDesktop.restype = wintypes.BOOL
+    _user32.CloseDesktop.argtypes = [_HDESK]
+    _user32.GetForegroundWindow.restype = wintypes.HWND
+    _user32.GetForegroundWindow.argtypes = []
+    _user32.GetDesktopWindow.restype = wintypes.HWND
+    _user32.GetDesktopWindow.argtypes = []
+    _user32.GetShellWindow.restype = wintypes.HWND
+    _user32.GetShellWindow.argtypes = []
+    _user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+    _user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+    _user32.GetWindowRect.restype = wintypes.BOOL
+    _user32.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.RECT)]
+    _user32.MonitorFromWindow.restype = wintypes.HMONITOR
+    _user32.MonitorFromWindow.argtypes = [wintypes.HWND, wintypes.DWORD]
+    _user32.GetMonitorInfoW.restype = wintypes.BOOL
+    _user32.GetMonitorInfoW.argtypes = [wintypes.HMONITOR, ctypes.POINTER(_MonitorInfo)]
+    _user32.GetLastInputInfo.restype = wintypes.BOOL
+    _user32.GetLastInputInfo.argtypes = [ctypes.POINTER(_LastInputInfo)]
+    _kernel32.GetTickCount.restype = wintypes.DWORD
+    _kernel32.GetTickCount.argtypes = []
+    _DESKTOP_SWITCHDESKTOP = 0x0100
+    _MONITOR_DEFAULTTONEAREST = 2
+
+def get_user_idle_ms():
+    """Время бездействия пользователя в мс (None, если система не сообщает его)"""
+    if sys.platform != 'win32':
+        return None
+    info = _LastInputInfo()
+    info.cbSize = ctypes.sizeof(info)
+    if not _user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    return (_kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF
+
+def is_session_locked():
+    """Проверяет, заблокирован ли экран (только Windows)"""
+    if sys.platform != 'win32':
+        return False
+    desktop = _user32.OpenInputDesktop(0, False, _DESKTOP_SWITCHDESKTOP)
+    if not desktop:
+        return True
+    try:
+        return not _user32.SwitchDesktop(desktop)
+    finally:
+        _user32.CloseDesktop(desktop)
+
+def is_fullscreen_app_active():
+    """Проверяет, занимает ли чужое окно на переднем плане весь монитор (только Windows)"""
+    if sys.platform != 'win32':
+        return False
+    hwnd = _user32.GetForegroundWindow()
+    if not hwnd or hwnd in (_user32.GetDesktopWindow(), _user32.GetShellWindow()):
+        return False
+
+    # Собственные полноэкранные окна (например, экран блокировки) не считаются
+    pid = wintypes.DWORD()
+    _user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+    if pid.value == os.getpid():
+        return False
+
+    rect = wintypes.RECT()
+    if not _user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        return False
+    monitor_info = _MonitorInfo()
+    monitor_info.cbSize = ctypes.sizeof(monitor_info)
+    monitor = _user32.MonitorFromWindow(hwnd, _MONITOR_DEFAULTTONEAREST)
+    if not _user32.GetMonitorInfoW(monitor, ctypes.byref(monitor_info)):
+        return False
+    screen = monitor_info.rcMonitor
+    return (rect.left <= screen.left and rect.top <= screen.top and
+            rect.right >= screen.right and rect.bottom >= screen.bottom)
+
+class PetScheduler(QObject):
+    """Один таймер для всех периодических задач питомца.
+
+    Задача запускается с интервалом interval в активном режиме и idle_interval
+    в режиме простоя (None - задача в простое не выполняется). В приостановленном
+    режиме задачи не выполняются, таймер лишь изредка проверяет состояние системы.
+    Таймер однократный и заводится до ближайшего срока задачи или проверки режима,
+    поэтому лишних пробуждений между задачами нет.
+    """
+
+    mode_changed = pyqtSignal(str)
+
+    def __init__(self, settings, is_pet_visible=None, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.is_pet_visible = is_pet_visible
+        self.mode = MODE_ACTIVE
+        self.tasks = {}
+        self.running = False
+        self._next_check = 0.0
+        self._slack = 0.0  # Допуск на раннее срабатывание таймера (с)
+        self._last_cursor_pos = QCursor.pos()
+        self._last_activity = time.monotonic()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._tick)
+
+    def add_task(self, name, interval, callback, idle_interval=None):
+        self.tasks[name] = {
+            'interval': interval,
+            'idle_interval': idle_interval,
+            'callback': callback,
+            'due': None,  # Время time.monotonic(), когда задачу пора запускать
+        }
+        self._reset_deadlines(time.monotonic())
+        if self.running:
+            self._schedule()
+
+    def start(self):
+        self.running = True
+        now = time.monotonic()
+        self._next_check = now + self._check_interval() / 1000
+        self._reset_deadlines(now)
+        self._schedule()
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+
+    def notify_activity(self):
+        """Отмечает действие пользователя с питомцем и сразу выходит из простоя"""
+        self._last_activity = time.monotonic()
+        if self.mode == MODE_IDLE:
+            self._set_mode(MODE_ACTIVE)
+            if self.running:
+                self._schedule()
+
+    def _tick(self):
+        # Грубый таймер Qt может сработать на несколько процентов раньше срока;
+        # такие задачи выполняются сразу, а не через лишнее пробуждение
+        now = time.monotonic() + self._slack
+        # Проверка режима выполняется и раньше срока, если таймер все равно сработал
+        # для задачи: так она почти не добавляет своих пробуждений
+        if now >= self._next_check - self._check_interval() / 2000:
+            self._set_mode(self._detect_mode())
+            self._next_check = now + self._check_interval() / 1000
+
+        if self.mode != MODE_SUSPENDED:
+            for task in self.tasks.values():
+                interval = self._task_interval(task)
+                if interval is None or now < task['due']:
+                    continue
+                # Срок отсчитывается от прошлого срока, а не от момента срабатывания таймера,
+                # поэтому опоздания не накапливаются; после долгой паузы отсчет начинается заново
+                task['due'] += interval / 1000
+                if task['due'] <= now:
+                    task['due'] = now + interval / 1000
+                task['callback']()
+
+        if self.running:
+            self._schedule()
+
+    def _schedule(self):
+        deadline = self._next_check
+        if self.mode != MODE_SUSPENDED:
+            for task in self.tasks.values():
+                if self._task_interval(task) is not None:
+                    deadline = min(deadline, task['due'])
+        wait = max(0, int((deadline - time.monotonic()) * 1000))
+        self._slack = wait * 0.05 / 1000
+        self.timer.start(wait)
+
+    def _reset_deadlines(self, now):
+        for task in self.tasks.values():
+            interval = self._task_interval(task)
+            task['due'] = None if interval is None else now + interval / 1000
+
+    def _task_interval(self, task):
+        return task['interval'] if self.mode == MODE_ACTIVE else task['idle_interval']
+
+    def _detect_mode(self):
+        if self.is_pet_visible and not self.is_pet_visible():
+            return MODE_SUSPENDED
+        if is_session_locked() or is_fullscreen_app_active():
+            return MODE_SUSPENDED
+
+        idle_ms = get_user_idle_ms()
+        if idle_ms is None:
+            # Нет системного счетчика - считаем активностью движение курсора
+            cursor_pos = QCursor.pos()
+            if cursor_pos != self._last_cursor_pos:
+                self._last_cursor_pos = cursor_pos
+                self._last_activity = time.monotonic()
+            idle_ms = (time.monotonic() - self._last_activity) * 1000
+        else:
+            idle_ms = min(idle_ms, (time.monotonic() - self._last_activity) * 1000)
+
+        if idle_ms >= self.settings['idle_timeout']:
+            return MODE_IDLE
+        return MODE_ACTIVE
+
+    def _set_mode(self, mode):
+        if mode == self.mode:
+            return
+        self.mode = mode
+        now = time.monotonic()
+        self._reset_deadlines(now)
+        self._next_check = now + self._check_interval() / 1000
+        self.mode_changed.emit(mode)
+
+    def _check_interval(self):
+        if self.mode == MODE_ACTIVE:
+            return self.settings['check_interval']
+        return self.settings['idle_tick_interval']
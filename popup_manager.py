@@ -0,0 +1,115 @@
+# Менеджер всплывающих сообщений питомца
+import time
+import random
+from collections import deque
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from config import POPUP_MESSAGES, POPUP_SETTINGS
+from utils import get_available_memes
+from popup_message import PopupMessage
+
+class PopupManager(QObject):
+    """Показывает сообщения питомца через небольшой пул переиспользуемых окон.
+
+    Запросы ставятся в очередь, показываются не чаще min_interval и не дублируют
+    сообщения, которые уже на экране, в очереди или показывались только что.
+    """
+
+    popup_opened = pyqtSignal(object)  # окно сообщения
+    popup_closed = pyqtSignal(object)
+
+    def __init__(self, anchor_widget, settings=POPUP_SETTINGS, parent=None):
+        super().__init__(parent)
+        self.anchor_widget = anchor_widget  # Виджет питомца, рядом с которым показываются окна
+        self.settings = settings
+        self.free_popups = []
+        self.visible_popups = []
+        self.queue = deque()
+        self.recent = deque(maxlen=settings['dedup_window'])
+        self.last_shown_at = None
+
+        self.queue_timer = QTimer(self)
+        self.queue_timer.setSingleShot(True)
+        self.queue_timer.timeout.connect(self.process_queue)
+
+    def pick_content(self):
+        """Выбирает тип и содержимое для всплывающего сообщения"""
+        memes = get_available_memes()
+        if random.random() < 0.3 and memes:
+            return "image", random.choice(memes)
+        return "text", random.choice(POPUP_MESSAGES)
+
+    def request(self, content_type=None, content=None):
+        """Ставит сообщение в очередь. Возвращает False, если запрос отброшен"""
+        if content_type is None:
+            content_type, content = self.pick_content()
+        key = (content_type, content)
+
+        if self.is_duplicate(key) or len(self.queue) >= self.settings['max_queue']:
+            return False
+
+        self.queue.append(key)
+        self.process_queue()
+        return True
+
+    def is_duplicate(self, key):
+        if key in self.queue or key in self.recent:
+            return True
+        return any((popup.content_type, popup.content) == key for popup in self.visible_popups)
+
+    def has_visible(self):
+        return bool(self.visible_popups)
+
+    def process_queue(self):
+        """Показывает следующее сообщение из очереди, если позволяют лимиты"""
+        if not self.queue or len(self.visible_popups) >= self.settings['max_visible']:
+            return
+
+        if self.last_shown_at is not None:
+            wait_ms = self.settings['min_interval'] - (time.monotonic() - self.last_shown_at) * 1000
+            if wait_ms > 0:
+                if not self.queue_timer.isActive():
+                    self.queue_timer.start(int(wait_ms))
+                return
+
+        content_type, content = self.queue.popleft()
+        popup = self.acquire_popup()
+        popup.bind(content_type, content,
+                   pet_position=self.anchor_widget.pos(),
+                   pet_size=self.anchor_widget.size())
+        self.visible_popups.append(popup)
+        self.recent.append((content_type, content))
+        self.last_shown_at = time.monotonic()
+        popup.show_animated()
+        self.popup_opened.emit(popup)
+
+    def acquire_popup(self):
+        """Берет свободное окно из пула или создает новое"""
+        while self.free_popups:
+            popup = self.free_popups.pop()
+            if not sip.isdeleted(popup):
+                return popup
+        popup = PopupMessage()
+        popup.finished.connect(self.release_popup)
+        return popup
+
+    def release_popup(self, popup):
+        """Возвращает окно в пул после исчезновения сообщения"""
+        if popup in self.visible_popups:
+            self.visible_popups.remove(popup)
+        if len(self.free_popups) < self.settings['pool_size']:
+            self.free_popups.append(popup)
+        else:
+            popup.deleteLater()
+        self.popup_closed.emit(popup)
+        self.process_queue()
+
+    def close_all(self):
+        """Закрывает все окна и очищает очередь"""
+        self.queue.clear()
+        self.queue_timer.stop()
+        for popup in self.visible_popups + self.free_popups:
+            if not sip.isdeleted(popup):
+                popup.close()
+        self.visible_popups.clear()
+        self.free_popups.clear()
@@ -1,18 +1,51 @@
-import random
-from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QSize
-from PyQt5.QtGui import QPixmap
-from config import POPUP_MESSAGES
-from utils import get_available_memes, get_screen_geometry
+from functools import lru_cache
+from PyQt5 import sip
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QApplication
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QSize, QRect, pyqtSignal
+from PyQt5.QtGui import QFontMetrics
+from config import IMAGE_SIZES, POPUP_SETTINGS
+from utils import get_screen_geometry, get_display_size, get_image_size
+from image_loader import get_image_loader
+
+# Геометрия содержимого окна (совпадает со стилями и layout ниже)
+LAYOUT_MARGIN = 15
+LAYOUT_SPACING = 10
+WINDOW_MARGIN = 30  # Отступы + рамки вокруг центрального виджета
+TEXT_FONT_SIZE = 14
+TEXT_PADDING = 10
+TEXT_MIN_WIDTH = 200
+TEXT_MAX_WIDTH = 500
+CAPTION_TEXT = "Смотри какой смешной мем! 😄"
+CAPTION_FONT_SIZE = 12
+CAPTION_PADDING = 5
+
+@lru_cache(maxsize=256)
+def measure_text(text, pixel_size, padding, min_width, max_width):
+    """Размер QLabel с переносом слов для текста (результат кэшируется по строке)"""
+    font = QApplication.font()
+    font.setPixelSize(pixel_size)
+    metrics = QFontMetrics(font)
+    
+    text_width = max_width - 2 * padding
+    rect = metrics.boundingRect(QRect(0, 0, text_width, 10000), Qt.AlignCenter | Qt.TextWordWrap, text)
+    width = max(min_width, min(rect.width() + 2 * padding, max_width))
+    height = rect.height() + 2 * padding
+    return width, height
 
 class PopupMessage(QMainWindow):
-    def __init__(self, on_close=None, pet_position=None, pet_size=None):
+    """Всплывающее сообщение питомца. Окно переиспользуется: содержимое меняется через bind()"""
+    
+    finished = pyqtSignal(object)  # Сообщение исчезло, окно можно использовать снова
+    
+    def __init__(self, on_close=None):
         super().__init__()
         self.on_close_callback = on_close
-        self.pet_position = pet_position  # QPoint с позицией питомца
-        self.pet_size = pet_size          # QSize с размером питомца
+        self.pet_position = None  # QPoint с позицией питомца
+        self.pet_size = None      # QSize с размером питомца
         self.content_type = None
         self.content = None
+        self.image_size = QSize()
+        self._bind_token = 0
         self.setup_ui()
         self.setup_animation()
         
@@ -20,9 +53,6 @@ class PopupMessage(QMainWindow):
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setAttribute(Qt.WA_TranslucentBackground)
         
-        # Определяем тип контента
-        self.determine_content()
-        
         # Создаем центральный виджет
         central_widget = QWidget()
         central_widget.setObjectName("central_widget")
@@ -38,59 +68,49 @@ class PopupMessage(QMainWindow):
         self.setCentralWidget(central_widget)
         
         layout = QVBoxLayout(central_widget)
-        layout.setContentsMargins(15, 15, 15, 15)
-        layout.setSpacing(10)
+        layout.setContentsMargins(LAYOUT_MARGIN, LAYOUT_MARGIN, LAYOUT_MARGIN, LAYOUT_MARGIN)
+        layout.setSpacing(LAYOUT_SPACING)
+        
+        # Виджеты для обоих типов контента создаются один раз, bind() только переключает их
+        self.setup_image_content(layout)
+        self.setup_text_content(layout)
+        
+    def bind(self, content_type, content, pet_position=None, pet_size=None):
+        """Подставляет новое содержимое в окно без пересоздания виджетов"""
+        self._bind_token += 1
+        self.content_type = content_type
+        self.content = content
+        self.pet_position = pet_position
+        self.pet_size = pet_size
         
-        # Добавляем контент в зависимости от типа
         if self.content_type == "image":
-            self.setup_image_content(layout)
+            self.text_label.hide()
+            self.image_label.setText("")
+            self.image_label.setStyleSheet("background: transparent;")
+            self.image_label.show()
+            self.caption_label.show()
+            self.load_image()
         else:
-            self.setup_text_content(layout)
+            self.image_label.hide()
+            self.caption_label.hide()
+            self.text_label.setText(self.content)
+            self.text_label.show()
             
         # Автоматически подстраиваем размер окна под содержимое
         self.adjust_size()
-        
-    def determine_content(self):
-        """Определяет тип контента для всплывающего сообщения"""
-        if random.random() < 0.3 and get_available_memes():
-            self.content_type = "image"
-            self.content = random.choice(get_available_memes())
-        else:
-            self.content_type = "text"
-            self.content = random.choice(POPUP_MESSAGES)
             
     def setup_image_content(self, layout):
         """Настраивает содержимое с изображением"""
         image_label = QLabel()
-        pixmap = QPixmap(self.content)
-        
-        if not pixmap.isNull():
-            # Масштабируем изображение, чтобы высота не превышала 400px
-            original_size = pixmap.size()
-            max_height = 400
-            
-            if original_size.height() > max_height:
-                # Вычисляем новую ширину с сохранением пропорций
-                scaled_width = int(original_size.width() * max_height / original_size.height())
-                scaled_pixmap = pixmap.scaled(scaled_width, max_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                image_label.setPixmap(scaled_pixmap)
-            else:
-                # Используем оригинальный размер, если он меньше максимального
-                image_label.setPixmap(pixmap)
-        else:
-            # Если изображение не загрузилось, показываем текст
-            self.content_type = "text"
-            self.content = "Не удалось загрузить изображение 😢"
-            self.setup_text_content(layout)
-            return
-            
+        self.image_label = image_label
         image_label.setAlignment(Qt.AlignCenter)
         image_label.setStyleSheet("background: transparent;")
         image_label.setMinimumSize(1, 1)  # Минимальный размер для корректного отображения
         layout.addWidget(image_label)
         
         # Добавляем подпись к изображению
-        caption_label = QLabel("Смотри какой смешной мем! 😄")
+        caption_label = QLabel(CAPTION_TEXT)
+        self.caption_label = caption_label
         caption_label.setAlignment(Qt.AlignCenter)
         caption_label.setStyleSheet("""
             QLabel {
@@ -104,9 +124,45 @@ class PopupMessage(QMainWindow):
         caption_label.setWordWrap(True)
         layout.addWidget(caption_label)
         
+    def load_image(self):
+        """Загружает картинку в фоне, пока она декодируется, показывается заглушка"""
+        # Размер берем из заголовка файла, чтобы сразу запросить из кэша нужный масштаб:
+        # высота не превышает 400px, маленькие изображения показываются как есть
+        display_size = get_display_size(self.content, IMAGE_SIZES['popup_max_height'])
+        self.image_size = display_size or get_image_size(self.content)
+        token = self._bind_token
+        
+        def apply(pixmap):
+            # Окно могли удалить или уже привязать к другому сообщению
+            if sip.isdeleted(self) or token != self._bind_token:
+                return
+            if pixmap.isNull():
+                self.show_image_error()
+                return
+            self.image_label.setPixmap(pixmap)
+            if pixmap.size() != self.image_size:
+                # Заголовок файла не дал точного размера - пересчитываем окно один раз
+                self.image_size = pixmap.size()
+                self.adjust_size()
+        
+        loader = get_image_loader()
+        if not loader.load(self.content, display_size, apply) and self.image_size.isValid():
+            self.image_label.setPixmap(loader.placeholder(self.image_size))
+        
+    def show_image_error(self):
+        """Заменяет картинку текстом, если изображение не загрузилось"""
+        self.content_type = "text"
+        self.content = "Не удалось загрузить изображение 😢"
+        self.image_label.hide()
+        self.caption_label.hide()
+        self.text_label.setText(self.content)
+        self.text_label.show()
+        self.adjust_size()
+        
     def setup_text_content(self, layout):
         """Настраивает текстовое содержимое"""
-        text_label = QLabel(self.content)
+        text_label = QLabel()
+        self.text_label = text_label
         text_label.setAlignment(Qt.AlignCenter)
         text_label.setStyleSheet("""
             QLabel {
@@ -118,22 +174,30 @@ class PopupMessage(QMainWindow):
             }
         """)
         text_label.setWordWrap(True)
-        text_label.setMinimumWidth(200)  # Минимальная ширина для текстовых сообщений
-        text_label.setMaximumWidth(500)  # Максимальная ширина для текстовых сообщений
+        text_label.setMinimumWidth(TEXT_MIN_WIDTH)  # Минимальная ширина для текстовых сообщений
+        text_label.setMaximumWidth(TEXT_MAX_WIDTH)  # Максимальная ширина для текстовых сообщений
         layout.addWidget(text_label)
         
-    def adjust_size(self):
-        """Автоматически подстраивает размер окна под содержимое"""
-        # Даем время на отрисовку виджетов
-        QTimer.singleShot(50, self._perform_adjust_size)
+    def content_size(self):
+        """Размер содержимого по метрикам шрифта и размеру картинки, без раскладки виджетов"""
+        if self.content_type == "image":
+            image_width = max(self.image_size.width(), 1)
+            image_height = max(self.image_size.height(), 1)
+            caption_width, caption_height = measure_text(
+                CAPTION_TEXT, CAPTION_FONT_SIZE, CAPTION_PADDING, 0, max(image_width, TEXT_MIN_WIDTH))
+            return QSize(max(image_width, caption_width),
+                         image_height + LAYOUT_SPACING + caption_height)
+        
+        text_width, text_height = measure_text(
+            self.content, TEXT_FONT_SIZE, TEXT_PADDING, TEXT_MIN_WIDTH, TEXT_MAX_WIDTH)
+        return QSize(text_width, text_height)
         
-    def _perform_adjust_size(self):
-        """Выполняет подстройку размера после отрисовки виджетов"""
-        # Получаем размер содержимого
-        content_size = self.centralWidget().sizeHint()
+    def adjust_size(self):
+        """Сразу задает итоговый размер окна и ставит его рядом с питомцем"""
+        content_size = self.content_size()
         
-        # Добавляем отступы и рамки
-        margin = 30  # Отступы + рамки
+        # Добавляем отступы layout и рамки
+        margin = 2 * LAYOUT_MARGIN + WINDOW_MARGIN
         new_width = content_size.width() + margin
         new_height = content_size.height() + margin
         
@@ -187,29 +251,48 @@ class PopupMessage(QMainWindow):
         self.move(target_x, target_y)
         
     def setup_animation(self):
-        # Анимация появления
+        # Одна анимация прозрачности на все показы окна
         self.animation = QPropertyAnimation(self, b"windowOpacity")
         self.animation.setDuration(800)
+        self.animation.finished.connect(self.on_animation_finished)
+        
+        # Таймер показа перед исчезновением
+        self.hold_timer = QTimer(self)
+        self.hold_timer.setSingleShot(True)
+        self.hold_timer.timeout.connect(self.fade_out)
+        
+    def show_animated(self):
+        """Показывает окно с анимацией появления"""
+        self.hold_timer.stop()
+        self.animation.stop()
+        self.setWindowOpacity(0.0)
+        self.show()
+        
+        # Анимация появления
         self.animation.setStartValue(0.0)
         self.animation.setEndValue(1.0)
         self.animation.setEasingCurve(QEasingCurve.OutBack)
         self.animation.start()
         
-        # После появления запускаем таймер для исчезновения
-        self.animation.finished.connect(
-            lambda: QTimer.singleShot(4000, self.fade_out)
-        )
-        
     def fade_out(self):
-        self.animation = QPropertyAnimation(self, b"windowOpacity")
-        self.animation.setDuration(800)
-        self.animation.setStartValue(1.0)
+        self.animation.stop()
+        self.animation.setStartValue(self.windowOpacity())
         self.animation.setEndValue(0.0)
         self.animation.setEasingCurve(QEasingCurve.InBack)
-        self.animation.finished.connect(self.close)
         self.animation.start()
         
+    def on_animation_finished(self):
+        if self.animation.endValue() > 0:
+            # После появления запускаем таймер для исчезновения
+            self.hold_timer.start(POPUP_SETTINGS['display_time'])
+        else:
+            # Окно не закрывается, а прячется и возвращается в пул
+            self.hide()
+            self.finished.emit(self)
+        
     def closeEvent(self, event):
+        self.hold_timer.stop()
+        self.animation.stop()
         if self.on_close_callback:
             self.on_close_callback()
         super().closeEvent(event)
\ No newline at end of file
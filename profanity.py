@@ -0,0 +1,92 @@
+# Фильтр нецензурных слов с нормализацией текста и уровнями строгости
+import re
+import json
+import unicodedata
+from collections import namedtuple
+from config import PROFANITY_FILE
+from text_matcher import trie_regex
+
+SEVERITY_MILD = 1    # Питомец делает замечание
+SEVERITY_SEVERE = 2  # Чат блокируется
+SEVERITY_LEVELS = {'mild': SEVERITY_MILD, 'severe': SEVERITY_SEVERE}
+
+ProfanityMatch = namedtuple('ProfanityMatch', ['word', 'severity', 'start', 'end'])
+
+REPEATS_RE = re.compile(r'([а-я])\1+')
+
+class ProfanityFilter:
+    """Один проход скомпилированного регулярного выражения-дерева по нормализованному тексту.
+
+    Нормализация убирает регистр и диакритику, знаки препинания внутри слов
+    ("х.у.й"), повторы букв и заменяет латинские буквы-двойники кириллическими в
+    словах, где уже есть кириллица. Слова из белого списка ("математика")
+    поглощают совпадения внутри себя.
+    """
+
+    def __init__(self, tiers, whitelist=(), homoglyphs=None):
+        self.homoglyphs = str.maketrans(homoglyphs or {})
+        lookalikes = re.escape(''.join(homoglyphs or {}))
+        # Диакритика после NFKD - отдельные символы, они удаляются вместе с пунктуацией
+        self.separators_re = re.compile(rf'[^\w\s{lookalikes}]|_')
+        # Слово, в котором есть и кириллица, и латинский двойник, например "xуй"
+        self.mixed_pair_re = re.compile(rf'[а-я][{lookalikes}]|[{lookalikes}][а-я]')
+        self.mixed_word_re = re.compile(
+            rf'(?<![\w{lookalikes}])(?=[\w{lookalikes}]*[а-я])(?=[\w{lookalikes}]*[{lookalikes}])[\w{lookalikes}]+')
+
+        self.severity = {}
+        for level, words in tiers.items():
+            for word in words:
+                word = self.normalize(word)
+                self.severity[word] = max(self.severity.get(word, 0), SEVERITY_LEVELS[level])
+        allowed = [self.normalize(word) for word in whitelist]
+
+        # Белый список стоит первым: с одной позиции он побеждает запрещенное слово.
+        # Опережающая проверка первой буквы быстро пропускает остальные позиции
+        branches = []
+        if allowed:
+            branches.append(f'(?P<allowed>{trie_regex(allowed)})')
+        if self.severity:
+            branches.append(f'(?P<bad>{trie_regex(self.severity)})')
+        first_chars = re.escape(''.join(sorted({word[0] for word in list(self.severity) + allowed})))
+        self.pattern = re.compile(f'(?=[{first_chars}])(?:' + '|'.join(branches) + ')') if self.severity else None
+
+    @classmethod
+    def from_file(cls, path=PROFANITY_FILE):
+        """Загружает словари из JSON-файла (при ошибке фильтр ничего не находит)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка загрузки словаря фильтра: {e}")
+            data = {}
+        return cls(data.get('tiers', {}), data.get('whitelist', []), data.get('homoglyphs', {}))
+
+    def normalize(self, text):
+        text = unicodedata.normalize('NFKD', text).casefold()
+        text = self.separators_re.sub('', text)
+        if self.mixed_pair_re.search(text):
+            text = self.mixed_word_re.sub(lambda m: m.group().translate(self.homoglyphs), text)
+        return REPEATS_RE.sub(r'\1', text)
+
+    def find(self, text):
+        """Все найденные слова (позиции - в нормализованном тексте)"""
+        if self.pattern is None:
+            return []
+        return [ProfanityMatch(m.group(), self.severity[m.group()], m.start(), m.end())
+                for m in self.pattern.finditer(self.normalize(text)) if m.lastgroup == 'bad']
+
+    def max_severity(self, text):
+        """Наибольший уровень строгости среди найденных слов (0 - текст чистый)"""
+        return max((match.severity for match in self.find(text)), default=0)
+
+    def contains(self, text, min_severity='mild'):
+        return self.max_severity(text) >= SEVERITY_LEVELS[min_severity]
+
+_profanity_filter = None
+
+def get_profanity_filter():
+    """Общий фильтр для бота и окна чата, словари загружаются один раз"""
+    global _profanity_filter
+    if _profanity_filter is None:
+        _profanity_filter = ProfanityFilter.from_file()
+    return _profanity_filter
@@ -1,53 +1,415 @@
-import random
 import math
+from collections import Counter, deque
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QPushButton, QGridLayout, QFrame)
-from PyQt5.QtCore import Qt, QTimer, QPoint, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QPainter, QColor, QPen, QBrush, QFont, QMouseEvent
+                             QLabel, QPushButton, QFrame)
+from PyQt5.QtCore import (Qt, QTimer, QPoint, QRect, QRectF, QPropertyAnimation, QEasingCurve,
+                          QElapsedTimer, pyqtSignal)
+from PyQt5.QtGui import QPainter, QColor, QPen, QBrush, QFont, QMouseEvent, QPixmap, QRegion
+from config import THREE_IN_ROW_SETTINGS
+from three_in_row_board import Board, EMPTY, is_adjacent, score_steps
 
-class GemButton(QPushButton):
-    def __init__(self, gem_type, size, row, col):
-        super().__init__()
+class GemTween:
+    """Движение одного камня из клетки source в клетку target с изменением масштаба.
+
+    Пока движение идет, клетка target не рисуется из поля - вместо нее
+    рисуется камень в промежуточном положении.
+    """
+
+    __slots__ = ('gem_type', 'source', 'target', 'duration', 'easing', 'scale_from', 'scale_to')
+
+    def __init__(self, gem_type, source, target, duration, easing, scale_from=1.0, scale_to=1.0):
         self.gem_type = gem_type
-        self.size = size
-        self.row = row
-        self.col = col
-        self.selected = False
-        
-        self.colors = [
-            "#ff595e", "#ffca3a", "#8ac926", 
-            "#1982c4", "#6a4c93", "#ff9d81"
-        ]
-        
-        self.setFixedSize(size, size)
-        self.update_style()
-        
-    def update_style(self):
-        color = self.colors[self.gem_type]
-        if self.selected:
-            self.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {color};
-                    border: 3px solid white;
-                    border-radius: {self.size//2}px;
-                }}
-                QPushButton:hover {{
-                    background-color: {color};
-                    border: 4px solid #ffeb3b;
-                }}
-            """)
+        self.source = source
+        self.target = target
+        self.duration = duration
+        self.easing = easing
+        self.scale_from = scale_from
+        self.scale_to = scale_to
+
+    def state(self, elapsed):
+        """Положение (строка, столбец) и масштаб через elapsed мс от начала"""
+        progress = self.easing.valueForProgress(min(1.0, elapsed / self.duration)) if self.duration > 0 else 1.0
+        row = self.source[0] + (self.target[0] - self.source[0]) * progress
+        col = self.source[1] + (self.target[1] - self.source[1]) * progress
+        return row, col, self.scale_from + (self.scale_to - self.scale_from) * progress
+
+class AnimationTimeline:
+    """Анимация одного хода: фазы (обмен, исчезновение, падение...) идут друг за другом.
+
+    Фаза - функция, которая применяет свои изменения к показываемому полю и
+    возвращает движения камней. Ход ждет завершения ранее начатых ходов,
+    если у них есть общие клетки.
+    """
+
+    def __init__(self, phases, cells, blockers):
+        self.phases = deque(phases)
+        self.cells = cells
+        self.blockers = blockers
+        self.tweens = []
+        self.phase_start = None
+        self.phase_duration = 0
+
+class GemBoardWidget(QWidget):
+    """Игровое поле, нарисованное одним виджетом.
+
+    Камни рисуются из заранее отрисованных картинок (по одной на тип и
+    состояние), клики и перетаскивание камня на соседнюю клетку определяются
+    по координатам, перерисовываются только изменившиеся клетки.
+
+    Виджет показывает собственную копию поля display: модель меняется сразу,
+    а копия догоняет ее по шагам каскада, пока идут анимации. Все анимации
+    двигает один таймер кадров, за кадр поле перерисовывается один раз.
+    Пока ход анимируется, клики по его клеткам игнорируются.
+    """
+
+    cell_clicked = pyqtSignal(int, int)            # Строка, столбец
+    swap_requested = pyqtSignal(int, int, int, int)  # Клетка, которую тянули, и соседняя клетка
+
+    COLORS = ["#ff595e", "#ffca3a", "#8ac926", "#1982c4", "#6a4c93", "#ff9d81"]
+    MARGIN = 20
+
+    # Обводка камня по состояниям: (цвет, толщина)
+    BORDERS = {
+        'normal': ("#cccccc", 2),
+        'hover': ("#ffffff", 3),
+        'selected': ("#ffffff", 3),
+        'selected_hover': ("#ffeb3b", 4),
+        'hint': ("#ffeb3b", 4),
+    }
+
+    def __init__(self, max_cell_size, settings=THREE_IN_ROW_SETTINGS, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.board = None
+        self.display = None
+        self.max_cell_size = max_cell_size
+        self.cell_size = max_cell_size
+        self.origin = QPoint(self.MARGIN, self.MARGIN)
+        self.sprites = {}
+        self.selected = None
+        self.hovered = None
+        self.hint_cells = ()
+        self.press_cell = None
+        self.press_pos = None
+        self.setMouseTracking(True)
+
+        self.timelines = []
+        self.locked = Counter()  # Клетки, занятые анимациями ходов
+        self.hidden = Counter()  # Клетки, вместо которых рисуется движущийся камень
+        self.frame_time = 0
+        self.swap_easing = QEasingCurve(QEasingCurve.InOutQuad)
+        self.clear_easing = QEasingCurve(QEasingCurve.InBack)
+        self.fall_easing = QEasingCurve(QEasingCurve.InQuad)
+        self.elapsed = QElapsedTimer()
+        self.elapsed.start()
+        self.frame_clock = QTimer(self)
+        self.frame_clock.setTimerType(Qt.PreciseTimer)
+        self.frame_clock.setInterval(settings['frame_interval'])
+        self.frame_clock.timeout.connect(self.advance_animations)
+        self.hint_timer = QTimer(self)
+        self.hint_timer.setSingleShot(True)
+        self.hint_timer.timeout.connect(lambda: self.show_hint(None))
+
+    def set_board(self, board):
+        self.frame_clock.stop()
+        self.timelines.clear()
+        self.locked.clear()
+        self.hidden.clear()
+        self.board = board
+        self.display = board.grid.copy()
+        self.selected = None
+        self.update_layout()
+        self.update()
+
+    def resizeEvent(self, event):
+        self.update_layout()
+        super().resizeEvent(event)
+
+    def update_layout(self):
+        """Подбирает размер клетки под виджет и центрирует поле"""
+        if self.board is None:
+            return
+        available = min(self.width(), self.height()) - 2 * self.MARGIN
+        cell_size = max(8, min(self.max_cell_size, available // max(self.board.rows, self.board.cols)))
+        if cell_size != self.cell_size or not self.sprites:
+            self.cell_size = cell_size
+            self.sprites.clear()
+        self.origin = QPoint((self.width() - cell_size * self.board.cols) // 2,
+                             (self.height() - cell_size * self.board.rows) // 2)
+
+    def sprite(self, gem_type, state):
+        """Картинка камня; рисуется один раз для каждого размера клетки"""
+        key = (gem_type, state)
+        pixmap = self.sprites.get(key)
+        if pixmap is None:
+            ratio = self.devicePixelRatioF()
+            size = self.cell_size
+            pixmap = QPixmap(int(size * ratio), int(size * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            border_color, border_width = self.BORDERS[state]
+            inset = max(2, size // 12) + border_width / 2
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(QColor(border_color), border_width))
+            painter.setBrush(QBrush(QColor(self.COLORS[gem_type % len(self.COLORS)])))
+            painter.drawEllipse(QRectF(inset, inset, size - 2 * inset, size - 2 * inset))
+            painter.end()
+            self.sprites[key] = pixmap
+        return pixmap
+
+    def cell_rect(self, row, col):
+        return QRect(self.origin.x() + col * self.cell_size, self.origin.y() + row * self.cell_size,
+                     self.cell_size, self.cell_size)
+
+    def cell_at(self, pos):
+        """Клетка (строка, столбец) под точкой виджета или None"""
+        if self.board is None:
+            return None
+        col = (pos.x() - self.origin.x()) // self.cell_size
+        row = (pos.y() - self.origin.y()) // self.cell_size
+        if 0 <= row < self.board.rows and 0 <= col < self.board.cols:
+            return row, col
+        return None
+
+    def update_cells(self, cells):
+        """Помечает клетки для перерисовки"""
+        for row, col in cells:
+            self.update(self.cell_rect(int(row), int(col)))
+
+    def is_locked(self, cell):
+        return self.locked[cell] > 0
+
+    def animate_move(self, first, second, steps):
+        """Показывает ход: обмен камней и шаги каскада (steps=None - ряд не собрался)"""
+        phases = [self.swap_phase(first, second)]
+        cells = {first, second}
+        if steps is None:
+            # Камни меняются местами и возвращаются обратно
+            phases.append(self.swap_phase(first, second))
         else:
-            self.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {color};
-                    border: 2px solid #cccccc;
-                    border-radius: {self.size//2}px;
-                }}
-                QPushButton:hover {{
-                    background-color: {color};
-                    border: 3px solid white;
-                }}
-            """)
+            for step in steps:
+                phases.append(self.clear_phase(step))
+                phases.append(self.fall_phase(step))
+                cells.update((row, col) for row, col in step.cleared.tolist())
+                for from_row, to_row, col in step.falls.tolist():
+                    cells.update(((from_row, col), (to_row, col)))
+                cells.update((row, col) for row, col, _gem_type in step.spawns.tolist())
+        self.start_timeline(phases, cells)
+
+    def animate_reshuffle(self, sources):
+        """Показывает перемешанное поле: камни летят со старых мест на новые.
+
+        sources - для каждой клетки номер клетки, откуда пришел камень
+        (None - поле заполнено заново, камни просто появляются).
+        """
+        grid = self.board.grid.copy()
+        rows, cols = grid.shape
+
+        def start():
+            self.display[:] = grid
+            if sources is None:
+                self.update()
+                return []
+            return [GemTween(int(grid[row, col]), divmod(int(sources[row, col]), cols), (row, col),
+                             self.settings['shuffle_time'], self.swap_easing)
+                    for row in range(rows) for col in range(cols)]
+
+        self.start_timeline([start], {(row, col) for row in range(rows) for col in range(cols)})
+
+    def start_timeline(self, phases, cells):
+        """Запускает анимацию хода, занимающего клетки cells"""
+        if not self.settings['animations']:
+            for phase in phases:
+                phase()
+            self.update_cells(cells)
+            return
+
+        blockers = {timeline for timeline in self.timelines if not timeline.cells.isdisjoint(cells)}
+        self.timelines.append(AnimationTimeline(phases, cells, blockers))
+        self.locked.update(cells)
+        if not self.frame_clock.isActive():
+            self.frame_clock.start()
+            self.advance_animations()
+
+    def swap_phase(self, first, second):
+        def start():
+            display = self.display
+            display[first], display[second] = display[second], display[first]
+            duration = self.settings['swap_time']
+            return [GemTween(int(display[second]), first, second, duration, self.swap_easing),
+                    GemTween(int(display[first]), second, first, duration, self.swap_easing)]
+        return start
+
+    def clear_phase(self, step):
+        def start():
+            rows, cols = step.cleared[:, 0], step.cleared[:, 1]
+            tweens = [GemTween(int(self.display[row, col]), (row, col), (int(row), int(col)),
+                               self.settings['clear_time'], self.clear_easing, 1.0, 0.0)
+                      for row, col in zip(rows.tolist(), cols.tolist())]
+            self.display[rows, cols] = EMPTY
+            return tweens
+        return start
+
+    def fall_phase(self, step):
+        def start():
+            from_rows, to_rows, cols = step.falls[:, 0], step.falls[:, 1], step.falls[:, 2]
+            self.display[to_rows, cols] = self.display[from_rows, cols]
+            self.display[step.spawns[:, 0], step.spawns[:, 1]] = step.spawns[:, 2]
+
+            fall_time = self.settings['fall_time']
+            tweens = [GemTween(int(self.display[to_row, col]), (from_row, col), (to_row, col),
+                               fall_time * (to_row - from_row), self.fall_easing)
+                      for from_row, to_row, col in step.falls.tolist()]
+            # Новые камни падают из-за верхнего края поля
+            spawned = Counter(step.spawns[:, 1].tolist())
+            tweens.extend(GemTween(gem_type, (row - spawned[col], col), (row, col),
+                                   fall_time * spawned[col], self.fall_easing)
+                          for row, col, gem_type in step.spawns.tolist())
+            return tweens
+        return start
+
+    def advance_animations(self):
+        """Один кадр: продвигает все ходы и перерисовывает задетые клетки одним вызовом"""
+        now = self.frame_time = self.elapsed.elapsed()
+        dirty = QRegion()
+        for timeline in list(self.timelines):
+            if timeline.blockers:
+                continue
+            if timeline.phase_start is None:
+                self.begin_phase(timeline, now)
+            while now - timeline.phase_start >= timeline.phase_duration:
+                for tween in timeline.tweens:
+                    self.hidden[tween.target] -= 1
+                    dirty += self.cell_rect(*tween.target)
+                timeline.tweens = []
+                if not timeline.phases:
+                    self.finish_timeline(timeline)
+                    break
+                self.begin_phase(timeline, now)
+            for tween in timeline.tweens:
+                dirty += self.tween_path_rect(tween)
+        self.hidden += Counter()  # Убирает клетки с нулевым счетчиком
+        if not dirty.isEmpty():
+            self.update(dirty)
+        if not self.timelines:
+            self.frame_clock.stop()
+
+    def begin_phase(self, timeline, now):
+        timeline.tweens = timeline.phases.popleft()()
+        timeline.phase_start = now
+        timeline.phase_duration = max((tween.duration for tween in timeline.tweens), default=0)
+        self.hidden.update(tween.target for tween in timeline.tweens)
+
+    def finish_timeline(self, timeline):
+        self.timelines.remove(timeline)
+        self.locked.subtract(timeline.cells)
+        self.locked += Counter()
+        for other in self.timelines:
+            other.blockers.discard(timeline)
+
+    def tween_path_rect(self, tween):
+        """Прямоугольник, который камень проходит за всю анимацию"""
+        source = self.cell_rect(math.floor(tween.source[0]), math.floor(tween.source[1]))
+        return source.united(self.cell_rect(*tween.target))
+
+    def show_hint(self, move):
+        """Подсвечивает пару клеток хода на hint_time мс (None - убрать подсказку)"""
+        self.update_cells(self.hint_cells)
+        self.hint_cells = tuple(move) if move is not None else ()
+        self.update_cells(self.hint_cells)
+        if move is not None:
+            self.hint_timer.start(self.settings['hint_time'])
+
+    def set_selected(self, cell):
+        changed = [c for c in (self.selected, cell) if c is not None]
+        self.selected = cell
+        self.update_cells(changed)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(255, 105, 180, 128), 1))
+        painter.setBrush(QColor(255, 255, 255, 25))
+        painter.drawRoundedRect(QRectF(self.rect()).adjusted(0.5, 0.5, -0.5, -0.5), 10, 10)
+        if self.board is None:
+            return
+
+        # Рисуются только клетки, попавшие в область перерисовки
+        dirty = event.rect()
+        first_row = max(0, (dirty.top() - self.origin.y()) // self.cell_size)
+        last_row = min(self.board.rows - 1, (dirty.bottom() - self.origin.y()) // self.cell_size)
+        first_col = max(0, (dirty.left() - self.origin.x()) // self.cell_size)
+        last_col = min(self.board.cols - 1, (dirty.right() - self.origin.x()) // self.cell_size)
+        grid = self.display
+        hidden = self.hidden
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                gem_type = int(grid[row, col])
+                cell = (row, col)
+                if gem_type == EMPTY or cell in hidden:
+                    continue
+                state = 'selected' if cell == self.selected else 'hint' if cell in self.hint_cells else 'normal'
+                if cell == self.hovered:
+                    state = 'selected_hover' if state == 'selected' else 'hover'
+                painter.drawPixmap(self.cell_rect(row, col).topLeft(), self.sprite(gem_type, state))
+
+        # Движущиеся камни поверх поля, в положении на текущий кадр
+        size = self.cell_size
+        for timeline in self.timelines:
+            if timeline.phase_start is None:
+                continue
+            elapsed = self.frame_time - timeline.phase_start
+            for tween in timeline.tweens:
+                row, col, scale = tween.state(elapsed)
+                target = QRectF(self.origin.x() + col * size, self.origin.y() + row * size, size, size)
+                if not target.intersects(QRectF(dirty)) or scale <= 0:
+                    continue
+                if scale != 1.0:
+                    inset = size * (1.0 - scale) / 2
+                    target.adjust(inset, inset, -inset, -inset)
+                pixmap = self.sprite(tween.gem_type, 'normal')
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.press_cell = self.cell_at(event.pos())
+            self.press_pos = event.pos()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        cell = self.cell_at(event.pos())
+        if cell != self.hovered:
+            self.update_cells([c for c in (self.hovered, cell) if c is not None])
+            self.hovered = cell
+
+        # Камень перетащили больше чем на полклетки - меняем его с соседним в этом направлении
+        if self.press_cell is not None and event.buttons() & Qt.LeftButton:
+            delta = event.pos() - self.press_pos
+            if max(abs(delta.x()), abs(delta.y())) > self.cell_size // 2:
+                row, col = self.press_cell
+                if abs(delta.x()) > abs(delta.y()):
+                    col += 1 if delta.x() > 0 else -1
+                else:
+                    row += 1 if delta.y() > 0 else -1
+                first = self.press_cell
+                self.press_cell = None
+                if 0 <= row < self.board.rows and 0 <= col < self.board.cols:
+                    self.swap_requested.emit(first[0], first[1], row, col)
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self.press_cell is not None:
+            if self.cell_at(event.pos()) == self.press_cell:
+                self.cell_clicked.emit(*self.press_cell)
+            self.press_cell = None
+        super().mouseReleaseEvent(event)
+
+    def leaveEvent(self, event):
+        if self.hovered is not None:
+            self.update_cells([self.hovered])
+            self.hovered = None
+        super().leaveEvent(event)
 
 class SimpleThreeInRowGame(QMainWindow):
     def __init__(self, on_close=None):
@@ -57,8 +419,9 @@ class SimpleThreeInRowGame(QMainWindow):
         self.drag_position = QPoint()
         self.score = 0
         self.selected_gem = None
-        self.grid_size = 8
-        self.cell_size = 60
+        self.grid_size = THREE_IN_ROW_SETTINGS['grid_size']
+        self.cell_size = THREE_IN_ROW_SETTINGS['cell_size']
+        self.points_per_gem = THREE_IN_ROW_SETTINGS['points_per_gem']
         
         self.setup_ui()
         self.setup_game()
@@ -175,18 +538,10 @@ class SimpleThreeInRowGame(QMainWindow):
         content_layout.addWidget(title_bar)
         
         # Игровое поле
-        self.grid_widget = QWidget()
-        self.grid_layout = QGridLayout(self.grid_widget)
-        self.grid_layout.setSpacing(5)
-        self.grid_layout.setContentsMargins(20, 20, 20, 20)
-        
-        self.grid_widget.setStyleSheet("""
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            border: 1px solid rgba(255, 105, 180, 0.5);
-        """)
-        
-        content_layout.addWidget(self.grid_widget)
+        self.board_view = GemBoardWidget(self.cell_size)
+        self.board_view.cell_clicked.connect(self.handle_gem_click)
+        self.board_view.swap_requested.connect(self.handle_gem_drag)
+        content_layout.addWidget(self.board_view)
         
         # Нижняя панель
         bottom_widget = QWidget()
@@ -212,6 +567,25 @@ class SimpleThreeInRowGame(QMainWindow):
         """)
         instruction.setAlignment(Qt.AlignCenter)
         bottom_layout.addWidget(instruction)
+
+        hint_btn = QPushButton("💡 Подсказка")
+        hint_btn.setFixedHeight(28)
+        hint_btn.setStyleSheet("""
+            QPushButton {
+                background: rgba(255, 105, 180, 0.8);
+                color: white;
+                font-size: 12px;
+                border: none;
+                border-radius: 14px;
+                padding: 0 10px;
+            }
+            QPushButton:hover {
+                background: rgba(255, 105, 180, 1);
+                border: 1px solid white;
+            }
+        """)
+        hint_btn.clicked.connect(self.show_hint)
+        bottom_layout.addWidget(hint_btn)
         
         content_layout.addWidget(bottom_widget)
         
@@ -225,99 +599,55 @@ class SimpleThreeInRowGame(QMainWindow):
         self.animation.start()
         
     def setup_game(self):
-        self.gems = []
-        self.create_grid()
-        
-    def create_grid(self):
-        # Очищаем сетку
-        for i in reversed(range(self.grid_layout.count())): 
-            self.grid_layout.itemAt(i).widget().setParent(None)
-        
-        self.gems = []
-        
-        # Создаем камни
-        for row in range(self.grid_size):
-            row_gems = []
-            for col in range(self.grid_size):
-                gem = GemButton(random.randint(0, 5), self.cell_size - 10, row, col)
-                gem.clicked.connect(lambda checked, r=row, c=col: self.handle_gem_click(r, c))
-                self.grid_layout.addWidget(gem, row, col)
-                row_gems.append(gem)
-            self.gems.append(row_gems)
+        # Состояние игры хранится в модели, виджет поля только рисует его
+        self.board = Board(self.grid_size, self.grid_size, THREE_IN_ROW_SETTINGS['gem_types'])
+        self.board_view.set_board(self.board)
         
     def handle_gem_click(self, row, col):
+        if self.board_view.is_locked((row, col)):
+            return
         if self.selected_gem is None:
             # Выбираем первый камень
             self.selected_gem = (row, col)
-            self.gems[row][col].selected = True
-            self.gems[row][col].update_style()
+            self.board_view.set_selected(self.selected_gem)
         else:
-            # Проверяем, является ли клик соседним камнем
-            prev_row, prev_col = self.selected_gem
-            
-            if ((abs(row - prev_row) == 1 and col == prev_col) or 
-                (abs(col - prev_col) == 1 and row == prev_row)):
-                
-                # Меняем камни местами
-                self.swap_gems(prev_row, prev_col, row, col)
-                
-                # Проверяем совпадения
-                if not self.find_matches():
-                    # Если нет совпадений, возвращаем обратно
-                    self.swap_gems(row, col, prev_row, prev_col)
+            # Обмен засчитывается, только если соседние камни собирают ряд
+            self.try_move(self.selected_gem, (row, col))
             
             # Снимаем выделение
-            self.gems[prev_row][prev_col].selected = False
-            self.gems[prev_row][prev_col].update_style()
             self.selected_gem = None
-    
-    def swap_gems(self, row1, col1, row2, col2):
-        # Обмен типами камней
-        type1 = self.gems[row1][col1].gem_type
-        type2 = self.gems[row2][col2].gem_type
-        
-        self.gems[row1][col1].gem_type = type2
-        self.gems[row2][col2].gem_type = type1
-        
-        self.gems[row1][col1].update_style()
-        self.gems[row2][col2].update_style()
-    
-    def find_matches(self):
-        found_matches = False
-        
-        # Проверка горизонтальных совпадений
-        for row in range(self.grid_size):
-            for col in range(self.grid_size - 2):
-                if (self.gems[row][col].gem_type == self.gems[row][col+1].gem_type == 
-                    self.gems[row][col+2].gem_type):
-                    # Увеличиваем счет
-                    self.score += 30
-                    self.score_label.setText(f"Счет: {self.score}")
-                    
-                    # Заменяем совпадающие камни
-                    for i in range(3):
-                        self.gems[row][col+i].gem_type = random.randint(0, 5)
-                        self.gems[row][col+i].update_style()
-                    
-                    found_matches = True
-        
-        # Проверка вертикальных совпадений
-        for row in range(self.grid_size - 2):
-            for col in range(self.grid_size):
-                if (self.gems[row][col].gem_type == self.gems[row+1][col].gem_type == 
-                    self.gems[row+2][col].gem_type):
-                    # Увеличиваем счет
-                    self.score += 30
-                    self.score_label.setText(f"Счет: {self.score}")
-                    
-                    # Заменяем совпадающие камни
-                    for i in range(3):
-                        self.gems[row+i][col].gem_type = random.randint(0, 5)
-                        self.gems[row+i][col].update_style()
-                    
-                    found_matches = True
-        
-        return found_matches
+            self.board_view.set_selected(None)
+
+    def handle_gem_drag(self, row, col, target_row, target_col):
+        self.selected_gem = None
+        self.board_view.set_selected(None)
+        self.try_move((row, col), (target_row, target_col))
+
+    def try_move(self, first, second):
+        if not is_adjacent(first, second):
+            return
+        if self.board_view.is_locked(first) or self.board_view.is_locked(second):
+            return
+        self.board_view.show_hint(None)
+        # Допустимость хода проверяется по индексу ходов модели, без пробного обмена
+        if not self.board.is_valid_move(first, second):
+            self.board_view.animate_move(first, second, None)
+            return
+        matches = self.board.try_swap(first, second)
+        # Каскад: ряды исчезают, камни падают, сверху досыпаются новые
+        steps = self.board.resolve(matches)
+        # Каждый следующий шаг цепочки приносит больше очков
+        self.score += score_steps(steps, self.points_per_gem)
+        self.score_label.setText(f"Счет: {self.score}")
+        self.board_view.animate_move(first, second, steps)
+        if not self.board.moves:
+            # Ходов не осталось - камни перемешиваются
+            self.board_view.animate_reshuffle(self.board.shuffle())
+
+    def show_hint(self):
+        move = self.board.hint()
+        if move is not None:
+            self.board_view.show_hint(move)
     
     def title_mouse_press_event(self, event):
         if event.button() == Qt.LeftButton:
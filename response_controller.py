@@ -0,0 +1,144 @@
+# Асинхронная генерация ответов питомца в рабочем потоке
+import threading
+from collections import namedtuple
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from config import BOT_SETTINGS
+from chat_bot import RuleBasedBackend
+
+# user_message - последний текст пользователя, history - последние сообщения истории
+ResponseContext = namedtuple('ResponseContext', ['user_message', 'history'])
+
+class _ResponseSignals(QObject):
+    partial = pyqtSignal(int, str)     # Номер запроса, текст ответа на данный момент
+    finished = pyqtSignal(int, dict)   # Номер запроса, готовый ответ
+    failed = pyqtSignal(int, str)      # Номер запроса, текст ошибки
+
+class ResponseTask(QRunnable):
+    """Вызывает backend.generate() в пуле потоков и пересылает части ответа сигналами"""
+
+    def __init__(self, request_id, backend, context, cancel_event, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.backend = backend
+        self.context = context
+        self.cancel_event = cancel_event
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.backend.generate(self.context, self.cancel_event)
+            if isinstance(result, dict):
+                response = result
+            else:
+                text = ''
+                for chunk in result:
+                    if self.cancel_event.is_set():
+                        return
+                    text += chunk
+                    self.signals.partial.emit(self.request_id, text)
+                response = {"type": "text", "content": text}
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        if not self.cancel_event.is_set():
+            self.signals.finished.emit(self.request_id, response)
+
+class ResponseController(QObject):
+    """Запускает генерацию ответа после паузы, следит за таймаутом и отменой.
+
+    Одновременно генерируется не больше одного ответа: новый запрос отменяет
+    предыдущий. Сигналы устаревших запросов отбрасываются по номеру запроса.
+    Если генератор не уложился в reply_timeout или упал, отвечает fallback
+    (правила AIChatBot), а уже выведенная часть ответа сохраняется как есть.
+    """
+
+    reply_partial = pyqtSignal(str)  # Ответ на данный момент (для потокового вывода)
+    reply_ready = pyqtSignal(dict)   # Готовый ответ {"type": ..., "content": ...}
+
+    def __init__(self, backend, fallback=None, settings=BOT_SETTINGS, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.fallback = fallback if fallback is not None else (
+            backend if isinstance(backend, RuleBasedBackend) else RuleBasedBackend())
+        self.settings = settings
+        self.request_id = 0
+        self.context = None
+        self.cancel_event = None
+        self.partial_text = ''
+
+        # Отдельный пул, чтобы медленный генератор не занимал потоки загрузки картинок
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.signals = _ResponseSignals()
+        self.signals.partial.connect(self._on_partial)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+
+        self.delay_timer = QTimer(self)
+        self.delay_timer.setSingleShot(True)
+        self.delay_timer.timeout.connect(self._start)
+        self.timeout_timer = QTimer(self)
+        self.timeout_timer.setSingleShot(True)
+        self.timeout_timer.timeout.connect(self._on_timeout)
+
+    def request(self, context):
+        """Просит ответ на context; ответ придет через reply_ready"""
+        self.cancel()
+        self.context = context
+        self.delay_timer.start(self.settings['reply_delay'])
+
+    def cancel(self):
+        """Отменяет ожидаемый ответ (например, при закрытии окна)"""
+        self.request_id += 1
+        self.delay_timer.stop()
+        self.timeout_timer.stop()
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_event = None
+        self.partial_text = ''
+
+    def close(self):
+        """Отменяет ответ и сохраняет состояние генераторов"""
+        self.cancel()
+        self.backend.close()
+        if self.fallback is not self.backend:
+            self.fallback.close()
+
+    def _start(self):
+        self.cancel_event = threading.Event()
+        self.partial_text = ''
+        self.pool.start(ResponseTask(self.request_id, self.backend, self.context,
+                                     self.cancel_event, self.signals))
+        self.timeout_timer.start(self.settings['reply_timeout'])
+
+    def _on_partial(self, request_id, text):
+        if request_id != self.request_id:
+            return
+        self.partial_text = text
+        self.reply_partial.emit(text)
+
+    def _on_finished(self, request_id, response):
+        if request_id != self.request_id:
+            return
+        self._finish(response)
+
+    def _on_failed(self, request_id, error):
+        if request_id != self.request_id:
+            return
+        print(f"Ошибка генерации ответа: {error}")
+        self._finish(self._fallback_response())
+
+    def _on_timeout(self):
+        print("Генерация ответа не уложилась в отведенное время")
+        if self.partial_text:
+            self._finish({"type": "text", "content": self.partial_text})
+        else:
+            self._finish(self._fallback_response())
+
+    def _fallback_response(self):
+        return self.fallback.generate(self.context, threading.Event())
+
+    def _finish(self, response):
+        self.cancel()
+        self.reply_ready.emit(response)
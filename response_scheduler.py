@@ -0,0 +1,90 @@
+# Выбор ответов питомца без повторов подряд
+import os
+import json
+import random
+import threading
+
+class ShuffleBag:
+    """Выдает варианты в случайном порядке, каждый по разу за круг.
+
+    Порядок хранится одним списком номеров и перемешивается на месте, когда
+    круг закончился; первый вариант нового круга не совпадает с последним
+    выданным, так что один ответ не повторяется два раза подряд.
+    """
+
+    def __init__(self, size, order=None, position=None):
+        self.order = list(order) if order is not None else list(range(size))
+        self.position = len(self.order) if position is None else position
+        self.last = None
+
+    def draw(self):
+        """Номер следующего варианта"""
+        order = self.order
+        if self.position >= len(order):
+            random.shuffle(order)
+            if len(order) > 1 and order[0] == self.last:
+                swap = random.randrange(1, len(order))
+                order[0], order[swap] = order[swap], order[0]
+            self.position = 0
+        self.last = order[self.position]
+        self.position += 1
+        return self.last
+
+class ResponseScheduler:
+    """Мешки ответов по ключу (имя намерения, 'fallback', 'emoji' ...).
+
+    Состояние мешков сохраняется в JSON-файл, чтобы после перезапуска питомец
+    не начинал с тех же ответов. Если число вариантов в данных изменилось,
+    мешок этого ключа начинается заново.
+    """
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file
+        self.bags = {}
+        self.lock = threading.Lock()  # Ответы выбираются и из рабочего потока, и из GUI
+        self.changed = False
+        if state_file:
+            self.load()
+
+    def choice(self, key, options):
+        """Следующий вариант из options для ключа key"""
+        if len(options) == 1:
+            return options[0]
+        with self.lock:
+            bag = self.bags.get(key)
+            if bag is None or len(bag.order) != len(options):
+                bag = self.bags[key] = ShuffleBag(len(options))
+            self.changed = True
+            return options[bag.draw()]
+
+    def load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            bags = {}
+            for key, state in data.get('bags', {}).items():
+                bag = ShuffleBag(len(state['order']), state['order'], state['position'])
+                bag.last = state.get('last')
+                bags[key] = bag
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Ошибка загрузки состояния ответов: {e}")
+            return
+        self.bags = bags
+
+    def save(self):
+        """Записывает состояние мешков, если с прошлой записи были ответы"""
+        if not self.state_file or not self.changed:
+            return
+        with self.lock:
+            data = {'bags': {key: {'order': bag.order, 'position': bag.position, 'last': bag.last}
+                             for key, bag in self.bags.items()}}
+            self.changed = False
+        tmp_file = self.state_file + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            print(f"Ошибка сохранения состояния ответов: {e}")
@@ -0,0 +1,114 @@
+# Покадровая анимация спрайтов питомца
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QImageReader, QPixmap
+
+DEFAULT_FRAME_DELAY = 100  # Задержка кадра, если GIF ее не задает (мс)
+
+class SpriteSheet:
+    """Кадры анимации, декодированные один раз, с задержками каждого кадра"""
+
+    def __init__(self, frames, delays):
+        self.frames = frames  # Список QPixmap
+        self.delays = delays  # Задержки кадров в мс
+
+    @classmethod
+    def from_gif(cls, path):
+        """Декодирует все кадры GIF-файла. Возвращает None, если файл не читается"""
+        reader = QImageReader(path)
+        frames = []
+        delays = []
+        while True:
+            image = reader.read()
+            if image.isNull():
+                break
+            frames.append(QPixmap.fromImage(image))
+            delay = reader.nextImageDelay()
+            delays.append(delay if delay > 0 else DEFAULT_FRAME_DELAY)
+            if not reader.canRead():
+                break
+        if not frames:
+            return None
+        return cls(frames, delays)
+
+    def mirrored(self):
+        """Возвращает зеркально отраженную по горизонтали копию анимации"""
+        frames = [QPixmap.fromImage(frame.toImage().mirrored(True, False)) for frame in self.frames]
+        return SpriteSheet(frames, list(self.delays))
+
+    def __len__(self):
+        return len(self.frames)
+
+class SpriteAnimator(QObject):
+    """Проигрывает состояния-анимации от одного общего таймера"""
+
+    frame_changed = pyqtSignal(QPixmap)
+
+    def __init__(self, max_fps=30, parent=None):
+        super().__init__(parent)
+        self.states = {}
+        self.current_state = None
+        self.frame_index = 0
+        self.running = False
+        self._time_debt = 0  # Сколько мс "проспал" таймер сверх задержки текущего кадра
+        self._last_interval = 0
+        self.set_max_fps(max_fps)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._advance)
+
+    def add_state(self, name, sheet):
+        self.states[name] = sheet
+
+    def has_state(self, name):
+        return name in self.states
+
+    def set_max_fps(self, max_fps):
+        """Ограничивает частоту смены кадров (0 - без ограничения)"""
+        self.min_interval = int(1000 / max_fps) if max_fps else 0
+
+    def set_state(self, name):
+        """Мгновенно переключает анимацию, кадры уже декодированы"""
+        if name not in self.states or name == self.current_state:
+            return
+        self.current_state = name
+        self.frame_index = 0
+        self._time_debt = 0
+        self._show_frame()
+        if self.running:
+            self._schedule()
+
+    def start(self):
+        if self.running or self.current_state is None:
+            return
+        self.running = True
+        self._show_frame()
+        self._schedule()
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+
+    def _advance(self):
+        sheet = self.states[self.current_state]
+        # При ограничении FPS пропускаем кадры, чтобы скорость анимации не менялась
+        self._time_debt += self._last_interval
+        while self._time_debt >= sheet.delays[self.frame_index]:
+            self._time_debt -= sheet.delays[self.frame_index]
+            self.frame_index = (self.frame_index + 1) % len(sheet)
+        self._show_frame()
+        self._schedule()
+
+    def _schedule(self):
+        sheet = self.states[self.current_state]
+        if len(sheet) < 2:
+            # Статичной картинке таймер не нужен, таймер прежнего листа останавливается
+            self.timer.stop()
+            return
+        remaining = sheet.delays[self.frame_index] - self._time_debt
+        self._last_interval = max(remaining, self.min_interval, 1)
+        self.timer.start(self._last_interval)
+
+    def _show_frame(self):
+        sheet = self.states[self.current_state]
+        self.frame_changed.emit(sheet.frames[self.frame_index])
@@ -0,0 +1,87 @@
+# Поиск множества подстрок за один проход (автомат Ахо-Корасик и регулярное выражение-дерево)
+import re
+from collections import deque
+
+class AhoCorasick:
+    """Автомат для одновременного поиска всех шаблонов в тексте.
+
+    Шаблоны добавляются через add(), после чего build() один раз строит
+    ссылки неудач. Поиск линеен по длине текста и не зависит от числа шаблонов.
+    """
+
+    def __init__(self):
+        self.goto = [{}]     # Переходы состояний по символу
+        self.fail = [0]      # Ссылки неудач
+        self.outputs = [[]]  # Найденные в состоянии шаблоны: (длина, значение)
+        self.built = False
+
+    def add(self, pattern, value):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        self.outputs[state].append((len(pattern), value))
+        self.built = False
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                # Шаблоны, заканчивающиеся в суффиксе, тоже найдены в этом состоянии
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+        self.built = True
+        return self
+
+    def iter_matches(self, text):
+        """Перебирает вхождения (начало, конец, значение) в порядке их окончания"""
+        if not self.built:
+            self.build()
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                end = position + 1
+                for length, value in outputs[state]:
+                    yield end - length, end, value
+
+def trie_regex(words):
+    """Регулярное выражение из префиксного дерева слов: общие префиксы проверяются один раз,
+    а из нескольких слов с одного места выбирается самое длинное"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if '' in node else body
+
+    return emit(trie)
@@ -0,0 +1,205 @@
+# TF-IDF индекс реплик корпуса для подбора ответа по смыслу
+import os
+import math
+import pickle
+import hashlib
+from array import array
+from config import RETRIEVAL_INDEX_FILE
+from chat_search import tokenize
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен, без него работает медленнее чистый Python
+    np = None
+
+INDEX_VERSION = 1
+TAIL_HASH_SIZE = 4096  # Сколько байт перед концом проиндексированной части сверять при дозаписи
+
+class TfidfIndex:
+    """Разреженный TF-IDF индекс пар "реплика -> ответ питомца" из корпуса диалогов.
+
+    Документ - реплика пользователя, к нему привязан следующий за ней ответ
+    питомца. Индекс хранится в кэше: при запуске он только загружается, а если
+    корпус дописали в конец, индексируются только новые строки.
+    """
+
+    def __init__(self, corpus_file, cache_file=RETRIEVAL_INDEX_FILE):
+        self.corpus_file = corpus_file
+        self.cache_file = cache_file
+        self.reset()
+
+    def reset(self):
+        self.vocab = {}          # Слово -> номер
+        self.postings = []       # Номер слова -> (array номеров документов, array весов tf)
+        self.replies = []        # Номер документа -> текст ответа
+        self.norms = None        # Нормы векторов документов (пересчитываются при изменениях)
+        self.source = {'offset': 0, 'tail_hash': '', 'last_line': None, 'position': 0}
+
+    @property
+    def size(self):
+        return len(self.replies)
+
+    def load_or_build(self):
+        """Загружает индекс из кэша и дописывает в него новые строки корпуса"""
+        if not self.load():
+            self.reset()
+        if self.update():
+            self.save()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError):
+            return False
+        if data.get('version') != INDEX_VERSION or data.get('corpus_file') != self.corpus_file:
+            return False
+        self.vocab = data['vocab']
+        self.postings = data['postings']
+        self.replies = data['replies']
+        self.norms = data['norms']
+        self.source = data['source']
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        data = {
+            'version': INDEX_VERSION,
+            'corpus_file': self.corpus_file,
+            'vocab': self.vocab,
+            'postings': self.postings,
+            'replies': self.replies,
+            'norms': self.norms,
+            'source': self.source,
+        }
+        tmp_file = self.cache_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.cache_file)
+
+    def update(self):
+        """Индексирует строки, дописанные в корпус. Возвращает True, если индекс изменился"""
+        try:
+            size = os.path.getsize(self.corpus_file)
+        except OSError as e:
+            print(f"Ошибка загрузки корпуса диалогов: {e}")
+            return False
+
+        offset = self.source['offset']
+        if size < offset or self._tail_hash(offset) != self.source['tail_hash']:
+            # Корпус изменен не дозаписью - строим индекс заново
+            self.reset()
+            offset = 0
+        if size == offset:
+            return self.norms is None
+
+        with open(self.corpus_file, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # Недописанная последняя строка будет проиндексирована в следующий раз
+        end = data.rfind(b'\n') + 1
+        last_line = self.source['last_line']
+        position = self.source['position']
+        for raw_line in data[:end].decode('utf-8-sig' if offset == 0 else 'utf-8').splitlines():
+            line = raw_line.strip()
+            if not line:
+                last_line, position = None, 0
+                continue
+            # Реплики питомца идут через одну, начиная со второй строки диалога
+            if last_line is not None and position % 2 == 1:
+                self.add_document(last_line, line)
+            last_line, position = line, position + 1
+
+        self.source = {'offset': offset + end, 'tail_hash': self._tail_hash(offset + end),
+                       'last_line': last_line, 'position': position}
+        self.compute_norms()
+        return True
+
+    def _tail_hash(self, offset):
+        if offset == 0:
+            return ''
+        with open(self.corpus_file, 'rb') as f:
+            start = max(0, offset - TAIL_HASH_SIZE)
+            f.seek(start)
+            return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+    def add_document(self, prompt, reply):
+        doc_id = len(self.replies)
+        self.replies.append(reply)
+        counts = {}
+        for token in tokenize(prompt):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term_id = self.vocab.get(token)
+            if term_id is None:
+                term_id = self.vocab[token] = len(self.postings)
+                self.postings.append((array('i'), array('f')))
+            doc_ids, weights = self.postings[term_id]
+            doc_ids.append(doc_id)
+            weights.append(1.0 + math.log(count))
+
+    def idf(self, term_id):
+        return math.log((1 + self.size) / (1 + len(self.postings[term_id][0]))) + 1.0
+
+    def compute_norms(self):
+        """Нормы векторов документов при текущих idf"""
+        if np is not None:
+            squares = np.zeros(self.size, dtype=np.float64)
+            for term_id, (doc_ids, weights) in enumerate(self.postings):
+                ids = np.frombuffer(doc_ids, dtype=np.int32)
+                values = np.frombuffer(weights, dtype=np.float32) * self.idf(term_id)
+                squares[ids] += values * values
+            self.norms = array('d', np.sqrt(squares).tobytes())
+            return
+        squares = [0.0] * self.size
+        for term_id, (doc_ids, weights) in enumerate(self.postings):
+            idf = self.idf(term_id)
+            for doc_id, weight in zip(doc_ids, weights):
+                squares[doc_id] += (weight * idf) ** 2
+        self.norms = array('d', (math.sqrt(value) for value in squares))
+
+    def query_vector(self, texts):
+        """Вектор запроса {номер слова: вес}: слова текстов с весами этих текстов"""
+        vector = {}
+        for text, text_weight in texts:
+            for token in tokenize(text):
+                term_id = self.vocab.get(token)
+                if term_id is not None:
+                    vector[term_id] = vector.get(term_id, 0.0) + text_weight
+        return {term_id: weight * self.idf(term_id) for term_id, weight in vector.items()}
+
+    def search(self, texts, top_k=5, max_df=0.3):
+        """Лучшие по косинусной близости ответы: список (сходство, номер документа).
+
+        texts - пары (текст, вес). Без NumPy очень частые слова (встречаются больше
+        чем в max_df доле документов) пропускаются, чтобы не перебирать огромные списки.
+        """
+        vector = self.query_vector(texts)
+        if not vector or not self.size:
+            return []
+        query_norm = math.sqrt(sum(value * value for value in vector.values()))
+
+        if np is not None:
+            scores = np.zeros(self.size, dtype=np.float64)
+            for term_id, query_weight in vector.items():
+                doc_ids, weights = self.postings[term_id]
+                ids = np.frombuffer(doc_ids, dtype=np.int32)
+                scores[ids] += np.frombuffer(weights, dtype=np.float32) * (self.idf(term_id) * query_weight)
+            norms = np.frombuffer(self.norms, dtype=np.float64)
+            np.divide(scores, norms * query_norm, out=scores, where=norms > 0)
+            count = min(top_k, self.size)
+            best = np.argpartition(-scores, count - 1)[:count]
+            return sorted(((float(scores[i]), int(i)) for i in best if scores[i] > 0), reverse=True)
+
+        scores = {}
+        max_postings = max(1, int(max_df * self.size))
+        for term_id, query_weight in vector.items():
+            doc_ids, weights = self.postings[term_id]
+            if len(doc_ids) > max_postings and len(vector) > 1:
+                continue
+            factor = self.idf(term_id) * query_weight
+            for doc_id, weight in zip(doc_ids, weights):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * factor
+        ranked = sorted(((score / (self.norms[doc_id] * query_norm), doc_id)
+                         for doc_id, score in scores.items() if self.norms[doc_id] > 0), reverse=True)
+        return ranked[:top_k]
@@ -0,0 +1,234 @@
+# Модель поля игры "3 в ряд" на массиве NumPy, без виджетов
+from collections import namedtuple
+import numpy as np
+
+EMPTY = -1  # Пустая клетка (камень убран, новый еще не упал)
+
+# Один шаг каскада как разница между полями до и после него:
+# chain - номер шага (с 1), cleared - убранные клетки (n, 2): строка, столбец;
+# falls - упавшие камни (n, 3): строка откуда, строка куда, столбец;
+# spawns - новые камни сверху (n, 3): строка, столбец, камень
+CascadeStep = namedtuple('CascadeStep', ['chain', 'cleared', 'falls', 'spawns'])
+
+def match_mask(grid):
+    """Клетки, входящие в ряды из трех и более одинаковых камней.
+
+    Ряды длиннее трех, а также фигуры "Г" и "Т" получаются объединением
+    горизонтальных и вертикальных троек. grid - одно поле (строки, столбцы)
+    или пачка полей (n, строки, столбцы); пустые клетки рядов не образуют.
+    """
+    mask = np.zeros(grid.shape, dtype=bool)
+    left, middle, right = grid[..., :, :-2], grid[..., :, 1:-1], grid[..., :, 2:]
+    horizontal = (left == middle) & (middle == right) & (left != EMPTY)
+    mask[..., :, :-2] |= horizontal
+    mask[..., :, 1:-1] |= horizontal
+    mask[..., :, 2:] |= horizontal
+    top, middle, bottom = grid[..., :-2, :], grid[..., 1:-1, :], grid[..., 2:, :]
+    vertical = (top == middle) & (middle == bottom) & (top != EMPTY)
+    mask[..., :-2, :] |= vertical
+    mask[..., 1:-1, :] |= vertical
+    mask[..., 2:, :] |= vertical
+    return mask
+
+def collapse(grid):
+    """Роняет камни вниз на пустые клетки (для поля или пачки полей).
+
+    Возвращает новое поле и для каждой его клетки номер строки, откуда
+    пришел камень; пустые клетки оказываются наверху столбцов.
+    """
+    # Устойчивая сортировка по признаку "не пусто" сдвигает пустые клетки вверх,
+    # сохраняя порядок камней в столбце
+    source_rows = np.argsort(grid != EMPTY, axis=-2, kind='stable')
+    return np.take_along_axis(grid, source_rows, axis=-2), source_rows
+
+def is_adjacent(first, second):
+    """Соседние ли клетки (row, col) по горизонтали или вертикали"""
+    return abs(first[0] - second[0]) + abs(first[1] - second[1]) == 1
+
+def move_key(first, second):
+    """Обмен как ключ индекса ходов: пара клеток в порядке возрастания"""
+    first, second = (int(first[0]), int(first[1])), (int(second[0]), int(second[1]))
+    return (first, second) if first < second else (second, first)
+
+def swaps_touching(region):
+    """Все обмены соседних клеток, у которых хотя бы одна клетка в region"""
+    horizontal = np.argwhere(region[:, :-1] | region[:, 1:]).tolist()
+    vertical = np.argwhere(region[:-1, :] | region[1:, :]).tolist()
+    return ([((row, col), (row, col + 1)) for row, col in horizontal] +
+            [((row, col), (row + 1, col)) for row, col in vertical])
+
+def check_swaps(grid, swaps):
+    """Обмены из списка, которые собирают ряд на поле grid.
+
+    Все обмены проверяются одной пачкой копий поля.
+    """
+    if not swaps:
+        return []
+    cells = np.array(swaps).reshape(len(swaps), 4)
+    index = np.arange(len(swaps))
+    boards = np.broadcast_to(grid, (len(swaps),) + grid.shape).copy()
+    first = (index, cells[:, 0], cells[:, 1])
+    second = (index, cells[:, 2], cells[:, 3])
+    boards[first], boards[second] = boards[second], boards[first]
+    mask = match_mask(boards)
+    valid = mask[first] | mask[second]
+    return [swaps[i] for i in np.flatnonzero(valid)]
+
+def score_steps(steps, points_per_gem):
+    """Очки за ход: каждый убранный камень, умноженный на номер шага цепочки"""
+    return sum(len(step.cleared) * points_per_gem * step.chain for step in steps)
+
+def dilate(mask, radius):
+    """Расширяет маску на radius клеток во все стороны (включая диагонали)"""
+    result = mask.copy()
+    for _ in range(radius):
+        grown = result.copy()
+        grown[1:, :] |= result[:-1, :]
+        grown[:-1, :] |= result[1:, :]
+        grown[:, 1:] |= result[:, :-1]
+        grown[:, :-1] |= result[:, 1:]
+        grown[1:, 1:] |= result[:-1, :-1]
+        grown[1:, :-1] |= result[:-1, 1:]
+        grown[:-1, 1:] |= result[1:, :-1]
+        grown[:-1, :-1] |= result[1:, 1:]
+        result = grown
+    return result
+
+class Board:
+    """Состояние поля: массив int8 с типами камней (0..gem_types-1).
+
+    Не зависит от Qt, поэтому годится и для окна игры, и для прогонов без
+    интерфейса. Случайность берется из собственного генератора, с seed
+    партия воспроизводится.
+
+    moves - индекс всех обменов, которые собирают ряд. После хода он
+    пересчитывается только рядом с изменившимися клетками: обмен читает
+    клетки не дальше двух от своих, так что остальные обмены не меняются.
+    """
+
+    # Сколько раз пробовать получить поле с ходами (перемешиванием или заново)
+    SHUFFLE_ATTEMPTS = 100
+
+    def __init__(self, rows=8, cols=8, gem_types=6, seed=None):
+        self.rows = rows
+        self.cols = cols
+        self.gem_types = gem_types
+        self.rng = np.random.default_rng(seed)
+        self.grid = np.empty((rows, cols), dtype=np.int8)
+        self.dirty = np.zeros((rows, cols), dtype=bool)  # Клетки, изменившиеся с пересчета индекса
+        self.moves = set()
+        self.fill()
+
+    def random_gems(self, count):
+        return self.rng.integers(0, self.gem_types, count, dtype=np.int8)
+
+    def fill(self):
+        """Заполняет поле случайными камнями без готовых рядов и хотя бы с одним ходом"""
+        for _ in range(self.SHUFFLE_ATTEMPTS):
+            self.grid[:] = self.random_gems(self.grid.size).reshape(self.grid.shape)
+            mask = match_mask(self.grid)
+            while mask.any():
+                self.grid[mask] = self.random_gems(int(mask.sum()))
+                mask = match_mask(self.grid)
+            self.rebuild_moves()
+            if self.moves:
+                return
+
+    def find_matches(self):
+        return match_mask(self.grid)
+
+    def swap(self, first, second):
+        self.grid[first], self.grid[second] = self.grid[second], self.grid[first]
+        self.dirty[first] = self.dirty[second] = True
+
+    def is_valid_move(self, first, second):
+        return is_adjacent(first, second) and move_key(first, second) in self.moves
+
+    def try_swap(self, first, second):
+        """Меняет соседние камни местами, если это собирает ряд.
+
+        Возвращает маску совпавших клеток; если ряда нет, поле не меняется
+        и маска пустая.
+        """
+        if not self.is_valid_move(first, second):
+            return np.zeros(self.grid.shape, dtype=bool)
+        self.swap(first, second)
+        return self.find_matches()
+
+    def rebuild_moves(self):
+        """Полный пересчет индекса ходов"""
+        self.moves = set(check_swaps(self.grid, swaps_touching(np.ones(self.grid.shape, dtype=bool))))
+        self.dirty[:] = False
+
+    def update_moves(self):
+        """Пересчитывает ходы рядом с изменившимися клетками"""
+        if not self.dirty.any():
+            return
+        swaps = swaps_touching(dilate(self.dirty, 2))
+        self.moves.difference_update(swaps)
+        self.moves.update(check_swaps(self.grid, swaps))
+        self.dirty[:] = False
+
+    def hint(self):
+        """Случайный ход, собирающий ряд (None, если ходов нет)"""
+        if not self.moves:
+            return None
+        moves = sorted(self.moves)
+        return moves[self.rng.integers(len(moves))]
+
+    def shuffle(self):
+        """Перемешивает камни так, чтобы не было готовых рядов и был хотя бы один ход.
+
+        Возвращает для каждой клетки номер клетки (в порядке строк), откуда
+        пришел ее камень, или None, если поле пришлось заполнить заново.
+        """
+        gems = self.grid.ravel().copy()
+        for _ in range(self.SHUFFLE_ATTEMPTS):
+            sources = self.rng.permutation(gems.size)
+            # Камни из получившихся рядов меняются местами со случайными, пока ряды не исчезнут
+            for _ in range(self.SHUFFLE_ATTEMPTS):
+                grid = gems[sources].reshape(self.grid.shape)
+                matched = np.flatnonzero(match_mask(grid))
+                if not len(matched):
+                    break
+                for cell, other in zip(matched.tolist(), self.rng.integers(0, gems.size, len(matched)).tolist()):
+                    sources[cell], sources[other] = sources[other], sources[cell]
+            else:
+                continue
+            self.grid[:] = grid
+            self.rebuild_moves()
+            if self.moves:
+                return sources.reshape(self.grid.shape)
+        self.fill()
+        return None
+
+    def resolve(self, mask=None):
+        """Доводит поле до устойчивого состояния и возвращает шаги каскада.
+
+        Шаг: убрать все совпавшие клетки разом (перекрывающиеся ряды считаются
+        один раз), уронить камни, досыпать новые сверху; повторять, пока
+        находятся ряды. В конце обновляется индекс ходов.
+        """
+        steps = []
+        if mask is None:
+            mask = self.find_matches()
+        while mask.any():
+            cleared = np.argwhere(mask)
+            self.grid[mask] = EMPTY
+            self.grid, source_rows = collapse(self.grid)
+
+            rows = np.arange(self.rows)[:, None]
+            moved = (self.grid != EMPTY) & (source_rows != rows)
+            target_rows, cols = np.nonzero(moved)
+            falls = np.column_stack((source_rows[moved], target_rows, cols))
+
+            empty = self.grid == EMPTY
+            self.grid[empty] = self.random_gems(int(empty.sum()))
+            spawn_rows, spawn_cols = np.nonzero(empty)
+            spawns = np.column_stack((spawn_rows, spawn_cols, self.grid[empty]))
+
+            self.dirty |= mask | moved | empty
+            steps.append(CascadeStep(len(steps) + 1, cleared, falls, spawns))
+            mask = self.find_matches()
+        self.update_moves()
+        return steps
@@ -0,0 +1,192 @@
+# Игра "3 в ряд" без интерфейса: прогон партий стратегиями и замер скорости движка
+import os
+import time
+import argparse
+import statistics
+import multiprocessing
+from collections import Counter, namedtuple
+import numpy as np
+from config import THREE_IN_ROW_SETTINGS
+from three_in_row_board import (Board, EMPTY, match_mask, collapse, check_swaps, swaps_touching,
+                                score_steps)
+
+# cascade_depths - сколько ходов дали каскад из 1, 2, ... шагов
+GameResult = namedtuple('GameResult', ['score', 'moves', 'cascade_depths', 'reshuffles', 'seconds'])
+
+def settle_known(grids, points_per_gem):
+    """Убирает ряды и роняет камни, не досыпая новых (для поля или пачки полей).
+
+    Новые камни заранее неизвестны, поэтому пустые клетки остаются пустыми.
+    Возвращает очки (как в игре: камни, умноженные на номер шага) и поля.
+    """
+    scores = np.zeros(grids.shape[:-2], dtype=np.int64)
+    chain = 0
+    mask = match_mask(grids)
+    while mask.any():
+        chain += 1
+        scores += mask.sum(axis=(-2, -1)) * points_per_gem * chain
+        grids = np.where(mask, EMPTY, grids).astype(grids.dtype)
+        grids, _ = collapse(grids)
+        mask = match_mask(grids)
+    return scores, grids
+
+def apply_swaps(grid, swaps):
+    """Пачка копий поля, в каждой сделан свой обмен"""
+    cells = np.array(swaps).reshape(len(swaps), 4)
+    index = np.arange(len(swaps))
+    boards = np.broadcast_to(grid, (len(swaps),) + grid.shape).copy()
+    first = (index, cells[:, 0], cells[:, 1])
+    second = (index, cells[:, 2], cells[:, 3])
+    boards[first], boards[second] = boards[second], boards[first]
+    return boards
+
+class RandomStrategy:
+    """Случайный допустимый ход"""
+
+    def __init__(self, settings):
+        pass
+
+    def choose(self, board):
+        return board.hint()
+
+class GreedyStrategy:
+    """Ход с наибольшими очками за известную часть каскада (все ходы оцениваются пачкой)"""
+
+    def __init__(self, settings):
+        self.points_per_gem = settings['points_per_gem']
+
+    def choose(self, board):
+        moves = sorted(board.moves)
+        scores, _ = settle_known(apply_swaps(board.grid, moves), self.points_per_gem)
+        best = np.flatnonzero(scores == scores.max())
+        return moves[best[board.rng.integers(len(best))]]
+
+class LookaheadStrategy:
+    """Перебор ходов на depth вперед по известной части поля.
+
+    Оценка позиции запоминается по байтам поля: после разных ходов часто
+    получается одно и то же поле.
+    """
+
+    def __init__(self, settings, depth=2, memo_size=200000):
+        self.points_per_gem = settings['points_per_gem']
+        self.depth = depth
+        self.memo_size = memo_size
+        self.memo = {}
+
+    def choose(self, board):
+        moves = sorted(board.moves)
+        values = self.move_values(board.grid, moves, self.depth)
+        best = np.flatnonzero(values == values.max())
+        return moves[best[board.rng.integers(len(best))]]
+
+    def move_values(self, grid, moves, depth):
+        scores, children = settle_known(apply_swaps(grid, moves), self.points_per_gem)
+        if depth > 1:
+            scores = scores + np.array([self.position_value(child, depth - 1) for child in children])
+        return scores
+
+    def position_value(self, grid, depth):
+        """Лучшие очки, которые можно набрать из позиции за depth ходов"""
+        key = (grid.tobytes(), depth)
+        value = self.memo.get(key)
+        if value is not None:
+            return value
+        filled = grid != EMPTY
+        moves = [(first, second) for first, second in swaps_touching(filled)
+                 if filled[first] and filled[second]]
+        moves = check_swaps(grid, moves)
+        value = int(self.move_values(grid, moves, depth).max()) if moves else 0
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        self.memo[key] = value
+        return value
+
+STRATEGIES = {
+    'random': RandomStrategy,
+    'greedy': GreedyStrategy,
+    'lookahead': LookaheadStrategy,
+}
+
+def play_game(strategy_name, seed, moves=30, settings=THREE_IN_ROW_SETTINGS):
+    """Одна партия из moves ходов на новом поле"""
+    started = time.perf_counter()
+    board = Board(settings['grid_size'], settings['grid_size'], settings['gem_types'], seed=seed)
+    strategy = STRATEGIES[strategy_name](settings)
+    score = 0
+    depths = Counter()
+    reshuffles = 0
+    for _ in range(moves):
+        first, second = strategy.choose(board)
+        steps = board.resolve(board.try_swap(first, second))
+        score += score_steps(steps, settings['points_per_gem'])
+        depths[len(steps)] += 1
+        if not board.moves:
+            board.shuffle()
+            reshuffles += 1
+    return GameResult(score, moves, depths, reshuffles, time.perf_counter() - started)
+
+def _play_game_task(task):
+    return play_game(*task)
+
+def run_simulation(strategy_name, games, moves=30, workers=None, seed=0, settings=THREE_IN_ROW_SETTINGS):
+    """Играет games партий в пуле процессов, возвращает результаты и общее время"""
+    tasks = [(strategy_name, seed + i, moves, settings) for i in range(games)]
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_play_game_task(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            chunk_size = max(1, games // (workers * 8))
+            results = list(pool.imap_unordered(_play_game_task, tasks, chunk_size))
+    return results, time.perf_counter() - started
+
+def benchmark_engine(boards=100000, settings=THREE_IN_ROW_SETTINGS):
+    """Сколько полей в минуту проверяет на ряды match_mask (одной пачкой)"""
+    size = settings['grid_size']
+    grids = np.random.default_rng(0).integers(0, settings['gem_types'], (boards, size, size), dtype=np.int8)
+    started = time.perf_counter()
+    match_mask(grids)
+    return boards / (time.perf_counter() - started) * 60
+
+def print_report(strategy_name, results, seconds, workers):
+    total_moves = sum(result.moves for result in results)
+    scores = [result.score for result in results]
+    depths = Counter()
+    for result in results:
+        depths.update(result.cascade_depths)
+
+    print(f"Стратегия: {strategy_name}, партий: {len(results)}, ходов: {total_moves}, процессов: {workers}")
+    print(f"Ходов в секунду: {total_moves / seconds:.0f} (время {seconds:.2f} с)")
+    print(f"Средний счет: {statistics.mean(scores):.1f} "
+          f"(медиана {statistics.median(scores):.0f}, мин {min(scores)}, макс {max(scores)}, "
+          f"σ {statistics.pstdev(scores):.1f})")
+    print("Глубина каскадов (шагов за ход):")
+    for depth in sorted(depths):
+        print(f"  {depth}: {depths[depth] / total_moves:6.1%} ({depths[depth]})")
+    print(f"Перемешиваний поля: {sum(result.reshuffles for result in results)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Прогон партий "3 в ряд" без интерфейса')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='greedy')
+    parser.add_argument('--games', type=int, default=1000, help='Сколько партий сыграть')
+    parser.add_argument('--moves', type=int, default=30, help='Ходов в партии')
+    parser.add_argument('--workers', type=int, default=None, help='Процессов (по умолчанию по числу ядер)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed первой партии')
+    parser.add_argument('--grid-size', type=int, default=THREE_IN_ROW_SETTINGS['grid_size'])
+    parser.add_argument('--gem-types', type=int, default=THREE_IN_ROW_SETTINGS['gem_types'])
+    parser.add_argument('--points-per-gem', type=int, default=THREE_IN_ROW_SETTINGS['points_per_gem'])
+    parser.add_argument('--engine', action='store_true', help='Также замерить скорость проверки полей')
+    args = parser.parse_args()
+
+    settings = dict(THREE_IN_ROW_SETTINGS, grid_size=args.grid_size, gem_types=args.gem_types,
+                    points_per_gem=args.points_per_gem)
+    workers = args.workers or os.cpu_count() or 1
+    results, seconds = run_simulation(args.strategy, args.games, args.moves, workers, args.seed, settings)
+    print_report(args.strategy, results, seconds, workers)
+    if args.engine:
+        print(f"Проверка полей на ряды: {benchmark_engine(settings=settings) / 1e6:.1f} млн полей в минуту")
+
+if __name__ == "__main__":
+    main()
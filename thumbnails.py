@@ -0,0 +1,248 @@
+# Дисковый кэш уменьшенных копий изображений
+import os
+import sys
+import json
+import hashlib
+import threading
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QImage, QImageReader
+from config import THUMBNAILS_DIR
+
+INDEX_SAVE_DELAY = 2.0  # Изменения индекса копятся столько секунд и сохраняются одной записью
+
+class ThumbnailStore:
+    """Хранилище PNG-миниатюр, ключ - хэш содержимого исходника и целевой размер"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self._sources = None  # путь -> [mtime_ns, размер файла, sha1 содержимого], хранится в index.json
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+
+    def source_hash(self, path):
+        """Возвращает хэш содержимого файла, пересчитывая его только при изменении файла.
+
+        Миниатюры прежней версии измененного файла удаляются.
+        """
+        stat = os.stat(path)
+        source = os.path.abspath(path)
+        with self._lock:
+            entry = self._load_index().get(source)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+
+        with self._lock:
+            sources = self._load_index()
+            old = sources.get(source)
+            sources[source] = [stat.st_mtime_ns, stat.st_size, digest]
+            self._mark_dirty()
+            stale = old is not None and old[2] != digest and not self._is_used(old[2])
+        if stale:
+            self._remove_digest(old[2])
+        return digest
+
+    def thumbnail_path(self, path, size):
+        """Путь к миниатюре файла для заданного размера"""
+        digest = self.source_hash(path)
+        filename = f"{digest}_{size.width()}x{size.height()}.png"
+        return os.path.join(self.directory, digest[:2], filename)
+
+    def load_image(self, path, size):
+        """Загружает миниатюру с диска или создает ее из исходника.
+
+        Можно вызывать из рабочих потоков: используется только QImage.
+        При ошибке возвращает пустой QImage.
+        """
+        try:
+            thumb_path = self.thumbnail_path(path, size)
+        except OSError:
+            return QImage()
+
+        if os.path.exists(thumb_path):
+            image = QImage(thumb_path)
+            if not image.isNull():
+                self._touch(thumb_path)
+                return image
+
+        image = decode_scaled(path, size)
+        if not image.isNull():
+            self._save(image, thumb_path)
+        return image
+
+    def _save(self, image, thumb_path):
+        # Запись через временный файл, чтобы параллельные загрузки не видели недописанный PNG
+        try:
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            tmp_path = f"{thumb_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if image.save(tmp_path, 'PNG'):
+                os.replace(tmp_path, thumb_path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except OSError as e:
+            print(f"Ошибка сохранения миниатюры: {e}")
+
+    def cleanup(self, max_bytes):
+        """Удаляет миниатюры удаленных и измененных исходников и ограничивает размер кэша.
+
+        При превышении max_bytes удаляются давно не использованные миниатюры.
+        """
+        with self._lock:
+            sources = self._load_index()
+            changed = False
+            for source, (mtime_ns, size, _) in list(sources.items()):
+                try:
+                    stat = os.stat(source)
+                except OSError:
+                    stat = None
+                if stat is None or stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                    del sources[source]
+                    changed = True
+            if changed:
+                self._dirty = True
+            used = {entry[2] for entry in sources.values()}
+
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.png'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    if name.split('_', 1)[0] not in used:
+                        os.remove(file_path)
+                        continue
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file_path))
+                total += stat.st_size
+
+        # Сначала удаляются миниатюры, которые дольше всего не загружались
+        files.sort()
+        for _, size, file_path in files:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(file_path)
+                total -= size
+            except OSError:
+                pass
+        self.save_index()
+
+    def save_index(self):
+        """Сохраняет индекс исходников, если он менялся (вызывается и при выходе из приложения)"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._save_index()
+                self._dirty = False
+
+    def start_cleanup(self, max_bytes):
+        """Запускает cleanup в фоновом потоке, чтобы не задерживать старт приложения"""
+        threading.Thread(target=self.cleanup, args=(max_bytes,), daemon=True).start()
+
+    def _load_index(self):
+        # Вызывается под self._lock
+        if self._sources is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._sources = json.load(f)
+            except (OSError, ValueError):
+                self._sources = {}
+        return self._sources
+
+    def _mark_dirty(self):
+        # Вызывается под self._lock. Запись откладывается, чтобы пачка новых миниатюр
+        # (например, при prewarm) сохранялась одной записью, а не файлом на каждую
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(INDEX_SAVE_DELAY, self.save_index)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_index(self):
+        # Вызывается под self._lock
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._sources, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Ошибка сохранения индекса миниатюр: {e}")
+
+    def _is_used(self, digest):
+        # Один и тот же файл может лежать по нескольким путям
+        return any(entry[2] == digest for entry in self._sources.values())
+
+    def _remove_digest(self, digest):
+        folder = os.path.join(self.directory, digest[:2])
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(digest + '_'):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+    def _touch(self, thumb_path):
+        # Время изменения служит отметкой последнего использования для cleanup
+        try:
+            os.utime(thumb_path)
+        except OSError:
+            pass
+
+def decode_scaled(path, size):
+    """Декодирует изображение сразу в уменьшенном виде (с сохранением пропорций)"""
+    reader = QImageReader(path)
+    original_size = reader.size()
+    if original_size.isValid():
+        reader.setScaledSize(original_size.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if not image.isNull() and not original_size.isValid():
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+thumbnail_store = ThumbnailStore(THUMBNAILS_DIR)
+
+def prewarm():
+    """Заранее создает миниатюры всех ресурсов во всех используемых размерах"""
+    from PyQt5.QtCore import QCoreApplication
+    from config import IMAGE_SIZES
+    from utils import (get_available_memes, get_available_punishment,
+                       get_available_emojis, get_display_size)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    jobs = []
+    for path in get_available_memes():
+        size = get_display_size(path, IMAGE_SIZES['popup_max_height'])
+        if size is not None:
+            jobs.append((path, size))
+    for path in get_available_punishment():
+        jobs.append((path, QSize(*IMAGE_SIZES['punishment'])))
+    for path in get_available_emojis():
+        jobs.append((path, QSize(*IMAGE_SIZES['chat_emoji'])))
+        jobs.append((path, QSize(*IMAGE_SIZES['picker_emoji'])))
+
+    for path, size in jobs:
+        thumbnail_store.load_image(path, size)
+    thumbnail_store.save_index()
+    print(f"Подготовлено миниатюр: {len(jobs)} ({THUMBNAILS_DIR})")
+
+if __name__ == "__main__":
+    prewarm()
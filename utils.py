@@ -1,10 +1,141 @@
 # Вспомогательные функции
 import os
 import random
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import QRect
+from collections import OrderedDict
+from PyQt5.QtGui import QPixmap, QImageReader
+from PyQt5.QtCore import Qt, QRect, QSize
 from PyQt5.QtWidgets import QApplication
-from config import ANIMATIONS_DIR, MEMES_DIR, PUNISMENT_DIR, EMOJIS_DIR
+from config import CACHE_SETTINGS
+from asset_catalog import get_asset_catalog
+from thumbnails import thumbnail_store
+
+class PixmapCache:
+    """Общий LRU-кэш масштабированных изображений с ограничением по памяти"""
+
+    def __init__(self, max_bytes, use_thumbnails=True):
+        self.max_bytes = max_bytes
+        self.use_thumbnails = use_thumbnails
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Ключ -> (pixmap, mtime исходного файла, размер в байтах)
+        self._entries = OrderedDict()
+
+    def get(self, path, size=None, transform_mode=Qt.SmoothTransformation):
+        """Возвращает изображение из кэша, при промахе загружает и масштабирует его.
+
+        size - QSize целевого размера (с сохранением пропорций) или None для оригинала.
+        При ошибке загрузки возвращает пустой QPixmap.
+        """
+        # Файл проверяется один раз, mtime нужен и для поиска, и для новой записи
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return QPixmap()
+        pixmap = self._lookup(path, size, transform_mode, mtime)
+        if pixmap is not None:
+            return pixmap
+
+        if size is not None and transform_mode == Qt.SmoothTransformation and self.use_thumbnails:
+            # Уменьшенная копия читается с диска вместо декодирования исходника
+            pixmap = QPixmap.fromImage(thumbnail_store.load_image(path, size))
+        else:
+            pixmap = QPixmap(path)
+            if not pixmap.isNull() and size is not None:
+                pixmap = pixmap.scaled(size, Qt.KeepAspectRatio, transform_mode)
+        if pixmap.isNull():
+            return pixmap
+
+        self.insert(path, size, transform_mode, pixmap, mtime)
+        return pixmap
+
+    def lookup(self, path, size=None, transform_mode=Qt.SmoothTransformation):
+        """Возвращает изображение, только если оно уже есть в кэше и не устарело, иначе None"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        return self._lookup(path, size, transform_mode, mtime)
+
+    def _lookup(self, path, size, transform_mode, mtime):
+        key = self._make_key(path, size, transform_mode)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] == mtime:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            # Файл изменился на диске - запись устарела
+            self._remove(key)
+
+        self.misses += 1
+        return None
+
+    def insert(self, path, size, transform_mode, pixmap, mtime):
+        """Кладет готовое изображение в кэш и вытесняет самые старые записи"""
+        key = self._make_key(path, size, transform_mode)
+        if key in self._entries:
+            self._remove(key)
+
+        cost = self._pixmap_cost(pixmap)
+        if cost > self.max_bytes:
+            return
+
+        self._entries[key] = (pixmap, mtime, cost)
+        self.current_bytes += cost
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def clear(self):
+        """Очищает кэш"""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        """Возвращает статистику использования кэша"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _remove(self, key):
+        _, _, cost = self._entries.pop(key)
+        self.current_bytes -= cost
+
+    @staticmethod
+    def _make_key(path, size, transform_mode):
+        size_key = (size.width(), size.height()) if size is not None else None
+        return (os.path.abspath(path), size_key, int(transform_mode))
+
+    @staticmethod
+    def _pixmap_cost(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+pixmap_cache = PixmapCache(CACHE_SETTINGS['pixmap_cache_bytes'], CACHE_SETTINGS['use_thumbnails'])
+
+def get_cached_pixmap(path, size=None, transform_mode=Qt.SmoothTransformation):
+    """Получить изображение через общий кэш"""
+    return pixmap_cache.get(path, size, transform_mode)
+
+def get_image_size(path):
+    """Получить размер изображения из заголовка файла без полного декодирования"""
+    size = get_asset_catalog().get_size(path)
+    if size.isValid():
+        return size
+    return QImageReader(path).size()
+
+def get_display_size(path, max_height):
+    """Получить размер показа изображения с ограничением по высоте (None - оригинальный размер)"""
+    original_size = get_image_size(path)
+    if original_size.height() > max_height:
+        # Вычисляем новую ширину с сохранением пропорций
+        scaled_width = int(original_size.width() * max_height / original_size.height())
+        return QSize(scaled_width, max_height)
+    return None
 
 def get_screen_geometry():
     """Получить геометрию экрана"""
@@ -22,35 +153,19 @@ def load_pixmap(filename, directories, default_size=(150, 150)):
     for directory in directories:
         filepath = os.path.join(directory, filename)
         if os.path.exists(filepath):
-            pixmap = QPixmap(filepath)
+            pixmap = get_cached_pixmap(filepath, QSize(*default_size))
             if not pixmap.isNull():
-                return pixmap.scaled(default_size[0], default_size[1], 
-                                   aspectRatioMode=1, transformMode=1)
+                return pixmap
     return None
 
 def get_available_memes():
     """Получить список доступных мемов"""
-    memes = []
-    if os.path.exists(MEMES_DIR):
-        for file in os.listdir(MEMES_DIR):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                memes.append(os.path.join(MEMES_DIR, file))
-    return memes
+    return get_asset_catalog().get_paths('memes')
     
 def get_available_punishment():
     """Получить список доступных блокировок"""
-    punishment = []
-    if os.path.exists(PUNISMENT_DIR):
-        for file in os.listdir(PUNISMENT_DIR):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                punishment.append(os.path.join(PUNISMENT_DIR, file))
-    return punishment
+    return get_asset_catalog().get_paths('punishment')
 
 def get_available_emojis():
     """Получить список доступных графических эмодзи"""
-    emojis = []
-    if os.path.exists(EMOJIS_DIR):
-        for file in os.listdir(EMOJIS_DIR):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                emojis.append(os.path.join(EMOJIS_DIR, file))
-    return emojis
\ No newline at end of file
+    return get_asset_catalog().get_paths('emojis')
\ No newline at end of file